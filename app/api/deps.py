@@ -1,4 +1,5 @@
-from fastapi import HTTPException, Security, status
+from typing import Optional
+from fastapi import Header, HTTPException, Security, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.config import settings
 
@@ -17,3 +18,16 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Security(security))
             headers={"WWW-Authenticate": "Bearer"},
         )
     return credentials.credentials
+
+
+def verify_admin_token(x_admin_token: Optional[str] = Header(None)) -> str:
+    """
+    Verifica el header X-Admin-Token para endpoints de diagnóstico.
+    Lanza 403 si no hay token de administrador configurado o si no coincide.
+    """
+    if not settings.PROFILING_ADMIN_TOKEN or x_admin_token != settings.PROFILING_ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Token de administrador inválido",
+        )
+    return x_admin_token
@@ -0,0 +1,345 @@
+"""
+HTTP middlewares for the PPTX API
+"""
+import asyncio
+import hashlib
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+
+from app.config import settings
+from app.services.file_service import FileService
+from app.services.idempotency import get_idempotency_store
+from app.services.metrics import metrics
+from app.services.profile_service import ProfileService, ProfileSession, current_session
+from app.services.tracing import span
+
+
+# Only one profiler can be active per thread, so profiled requests run one at a time
+_profile_lock = asyncio.Lock()
+
+
+def _wants_profile(request: Request) -> bool:
+    """A request is profiled only with the flag AND a valid admin token"""
+    flag = request.headers.get("x-profile") or request.query_params.get("profile")
+    if flag not in ("1", "true"):
+        return False
+    return bool(settings.PROFILING_ADMIN_TOKEN) and \
+        request.headers.get("x-admin-token") == settings.PROFILING_ADMIN_TOKEN
+
+
+async def profiling_middleware(request: Request, call_next):
+    """
+    Profile the handler and service calls of admin-flagged requests.
+
+    The profile is stored and its ID returned in the X-Profile-Id header.
+    Registered only when PROFILING_ENABLED is set.
+
+    The request-level profiler runs on the event loop thread, so it also
+    records the coroutines of other requests served while this one awaits.
+    Only the threadpool and worker calls (profile_section) are exclusive to
+    the profiled request; read event-loop frames with that in mind.
+    """
+    if not _wants_profile(request):
+        return await call_next(request)
+
+    async with _profile_lock:
+        session = ProfileSession()
+        token = current_session.set(session)
+        try:
+            with session.profile():
+                response = await call_next(request)
+        finally:
+            current_session.reset(token)
+
+    profile_service = ProfileService(FileService().outputs_dir, max_profiles=settings.PROFILING_MAX_PROFILES)
+    profile_id = profile_service.save_profile(session)
+    if profile_id:
+        response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+# Responses that are not stored: the client should retry them for real
+_RETRYABLE_STATUSES = {401, 403, 408, 409, 429}
+
+# Responses larger than this are not stored (mutating endpoints answer with small JSON)
+_MAX_STORED_BODY = 1024 * 1024
+
+
+class IdempotencyMiddleware:
+    """
+    Makes POST requests under `path_prefix` that carry an Idempotency-Key
+    header safe to retry: the first one runs and its response is stored
+    for IDEMPOTENCY_TTL seconds; a duplicate arriving while it runs waits
+    for it, and later duplicates get the stored response (with an
+    Idempotent-Replayed header) without doing the work again.
+
+    A key reused for a different request (method, path, JSON body, or the
+    fields and files of a multipart body) gets 422. Server errors and
+    401/403/408/409/429 are not stored.
+
+    Written as a plain ASGI middleware: it needs the request body to
+    fingerprint the request and still pass it on to the endpoint. JSON
+    bodies are buffered; multipart bodies (uploads) are fingerprinted part
+    by part while they stream (see _MultipartFingerprint).
+    """
+
+    def __init__(self, app, path_prefix: str):
+        self.app = app
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.path_prefix):
+            return await self.app(scope, receive, send)
+        headers = Headers(scope=scope)
+        key = headers.get("idempotency-key")
+        if not key:
+            return await self.app(scope, receive, send)
+
+        if len(key) > 255:
+            response = JSONResponse(status_code=400, content={"detail": "Idempotency-Key must be at most 255 characters"})
+            return await response(scope, receive, send)
+
+        # Multipart bodies can be large uploads: their fingerprint is computed
+        # from the parts as the endpoint (or a replay check) reads them
+        content_type = headers.get("content-type", "")
+        parts = None
+        if content_type.startswith("multipart/"):
+            parts = _MultipartFingerprint(content_type)
+            receive = parts.tee(receive)
+        else:
+            body, receive = await _buffer_body(receive)
+            fingerprint = _fingerprint(scope, body)
+
+        store = await run_in_threadpool(get_idempotency_store)
+        record_id = store.record_id(key, headers.get("authorization", ""))
+        try:
+            lock = await store.acquire(record_id, settings.IDEMPOTENCY_WAIT_TIMEOUT)
+        except TimeoutError:
+            response = JSONResponse(
+                status_code=409,
+                content={"detail": "A request with this Idempotency-Key is still in progress"},
+                headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)}
+            )
+            return await response(scope, receive, send)
+
+        try:
+            record = await run_in_threadpool(store.get, record_id)
+            if record is not None:
+                if parts is not None:
+                    await parts.drain(receive)
+                    fingerprint = _fingerprint(scope, parts.digest())
+                if record["fingerprint"] != fingerprint:
+                    response = JSONResponse(
+                        status_code=422,
+                        content={"detail": "Idempotency-Key was already used for a different request"}
+                    )
+                    return await response(scope, receive, send)
+                metrics.inc("pptx_idempotent_replays_total")
+                await send({
+                    "type": "http.response.start",
+                    "status": record["status"],
+                    "headers": [
+                        (name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]
+                    ] + [(b"idempotent-replayed", b"true")],
+                })
+                await send({"type": "http.response.body", "body": record["body"]})
+                return
+
+            response_start = {}
+            chunks = []
+            size = 0
+
+            async def capture(message):
+                nonlocal size
+                if message["type"] == "http.response.start":
+                    response_start.update(message)
+                elif message["type"] == "http.response.body" and size <= _MAX_STORED_BODY:
+                    chunks.append(message.get("body", b""))
+                    size += len(chunks[-1])
+                await send(message)
+
+            await self.app(scope, receive, capture)
+
+            if parts is not None:
+                # The endpoint may not have read the whole body (e.g. on a 4xx)
+                if not await parts.drain(receive):
+                    return
+                fingerprint = _fingerprint(scope, parts.digest())
+
+            status = response_start.get("status", 500)
+            if status < 500 and status not in _RETRYABLE_STATUSES and size <= _MAX_STORED_BODY:
+                await run_in_threadpool(
+                    store.put,
+                    record_id,
+                    fingerprint,
+                    status,
+                    [[name.decode("latin-1"), value.decode("latin-1")] for name, value in response_start["headers"]],
+                    b"".join(chunks)
+                )
+        finally:
+            lock.release()
+
+
+def _fingerprint(scope, body: bytes) -> str:
+    return hashlib.sha256(
+        b"\0".join([scope["method"].encode(), scope["path"].encode(), scope["query_string"], body])
+    ).hexdigest()
+
+
+class _MultipartFingerprint:
+    """
+    Fingerprint of a multipart body computed while it streams: the name,
+    filename and content type of every part and the SHA-256 of its data.
+    The boundary, which clients pick anew on every retry, is left out, and
+    nothing is buffered.
+    """
+
+    def __init__(self, content_type: str):
+        _, params = parse_options_header(content_type)
+        self.complete = False
+        self._failed = False
+        self._digest = hashlib.sha256()
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._part_digest = None
+        self._parser = MultipartParser(params.get(b"boundary", b""), callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._part_digest = hashlib.sha256()
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        self._part_digest.update(data[start:end])
+
+    def _on_part_end(self):
+        _, disposition = parse_options_header(self._headers.get(b"content-disposition", b""))
+        for value in (
+            disposition.get(b"name", b""),
+            disposition.get(b"filename", b""),
+            self._headers.get(b"content-type", b""),
+            self._part_digest.hexdigest().encode(),
+        ):
+            self._digest.update(value + b"\0")
+
+    def _feed(self, message):
+        if message["type"] != "http.request":
+            return
+        if not self._failed:
+            try:
+                self._parser.write(message.get("body", b""))
+            except Exception:
+                # Malformed body: the endpoint rejects it; keep a stable fingerprint
+                self._failed = True
+                self._digest.update(b"malformed")
+        if not message.get("more_body", False):
+            self.complete = True
+
+    def tee(self, receive):
+        """receive callable that feeds the body to the fingerprint as it is read"""
+        async def teed_receive():
+            message = await receive()
+            self._feed(message)
+            return message
+        return teed_receive
+
+    async def drain(self, receive) -> bool:
+        """Read what is left of the body through `receive`; returns whether it was complete"""
+        while not self.complete:
+            message = await receive()
+            if message["type"] != "http.request":
+                return False
+        return True
+
+    def digest(self) -> bytes:
+        return b"multipart:" + self._digest.hexdigest().encode()
+
+
+async def _buffer_body(receive):
+    """Read the whole request body; returns it and a receive callable that replays it"""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            # Client disconnected: let the endpoint see it
+            return b"", _replay([message], receive)
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    body = b"".join(chunks)
+    return body, _replay([{"type": "http.request", "body": body, "more_body": False}], receive)
+
+
+def _replay(messages, receive):
+    async def replayed_receive():
+        if messages:
+            return messages.pop(0)
+        return await receive()
+    return replayed_receive
+
+
+class TracingMiddleware:
+    """
+    Wraps every HTTP request in a server span named after its route
+    ("POST /api/v1/presentations/{presentation_id}/text"), continuing the
+    caller's trace when it sends a W3C traceparent header. The trace ID is
+    returned in the X-Trace-Id header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = Headers(scope=scope)
+
+        with span(
+            f"{scope['method']} {scope['path']}",
+            kind="server",
+            traceparent=headers.get("traceparent"),
+            **{
+                "http.method": scope["method"],
+                "http.target": scope["path"],
+                "http.request_id": headers.get("x-request-id"),
+            }
+        ) as server_span:
+            async def send_with_trace(message):
+                if message["type"] == "http.response.start":
+                    server_span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        server_span.set_error(f"HTTP {message['status']}")
+                    if server_span.traceparent:
+                        trace_id = server_span.traceparent.split("-")[1]
+                        message = {**message, "headers": [*message["headers"], (b"x-trace-id", trace_id.encode())]}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace)
+            finally:
+                # The router stores the matched route in the scope
+                route = scope.get("route")
+                if route is not None and hasattr(server_span, "name"):
+                    server_span.name = f"{scope['method']} {route.path}"
+                    server_span.set_attribute("http.route", route.path)
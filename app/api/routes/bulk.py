@@ -0,0 +1,103 @@
+"""
+Bulk upload endpoints for the PPTX API
+"""
+from typing import Optional
+
+import anyio
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+
+from app.models.schemas import BulkUploadResponse
+from app.services.bulk_service import BulkUploadService
+from app.services.file_service import FileService
+
+
+router = APIRouter(prefix="/api/v1/bulk", tags=["bulk"])
+
+_ARCHIVE_BODY = {"schema": {"type": "string", "format": "binary"}}
+
+
+class _RequestBody:
+    """Blocking file object over the request body, for parsing it as it arrives in a worker thread"""
+
+    def __init__(self, request: Request):
+        self._chunks = request.stream()
+        self._buffer = b""
+
+    async def _next_chunk(self) -> bytes:
+        try:
+            return await self._chunks.__anext__()
+        except (StopAsyncIteration, ClientDisconnect):
+            # A dropped connection reads as a truncated archive; the manifest keeps what was registered
+            return b""
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._buffer:
+            self._buffer = anyio.from_thread.run(self._next_chunk)
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+@router.post(
+    "/upload",
+    response_model=BulkUploadResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Upload templates and images in one archive",
+    description="Send a zip or tar (.tar, .tar.gz) archive as the request body; every .pptx becomes a template "
+                "and every image an uploaded image. The archive is extracted as it arrives.",
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/zip": _ARCHIVE_BODY,
+        "application/x-tar": _ARCHIVE_BODY,
+        "application/gzip": _ARCHIVE_BODY,
+    }}}
+)
+async def bulk_upload(
+    request: Request,
+    upload_id: Optional[str] = Query(None, description="upload_id of an incomplete upload to resume")
+):
+    """
+    Upload an archive of templates and images
+
+    - **body**: zip or tar archive (optionally gzip, bzip2 or xz compressed)
+    - **upload_id**: To resume an upload that did not complete, send the same archive with its upload_id
+
+    Returns the manifest: one entry per member with its template_id/image_id, SHA-256 and status.
+    `complete` is false when the archive could not be read to the end.
+    """
+    try:
+        bulk_service = BulkUploadService(FileService())
+        return await run_in_threadpool(bulk_service.upload, _RequestBody(request), upload_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process bulk upload: {str(e)}"
+        )
+
+
+@router.get(
+    "/upload/{upload_id}",
+    response_model=BulkUploadResponse,
+    summary="Get the manifest of a bulk upload",
+    description="Get the ids registered by a bulk upload, e.g. after the connection dropped"
+)
+async def get_bulk_upload(upload_id: str):
+    """
+    Get the manifest of a bulk upload
+
+    - **upload_id**: ID returned by the bulk upload
+    """
+    try:
+        bulk_service = BulkUploadService(FileService())
+        return bulk_service.get_manifest(upload_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get bulk upload: {str(e)}"
+        )
@@ -0,0 +1,69 @@
+"""
+Debug endpoints for the PPTX API (admin only)
+"""
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from app.config import settings
+from app.models.schemas import ProfileListResponse
+from app.services.file_service import FileService
+from app.services.profile_service import ProfileService
+
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+@router.get(
+    "/profiles",
+    response_model=ProfileListResponse,
+    summary="List stored request profiles",
+    description="Get the request profiles captured with the X-Profile header, newest first"
+)
+async def list_profiles():
+    """
+    List stored profiles
+    """
+    try:
+        profile_service = ProfileService(FileService().outputs_dir, max_profiles=settings.PROFILING_MAX_PROFILES)
+        return ProfileListResponse(profiles=profile_service.list_profiles())
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to list profiles: {str(e)}"
+        )
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    summary="Get a stored request profile",
+    description="Download a profile in pstats format, or render it as text with format=text"
+)
+async def get_profile(
+    profile_id: str,
+    format: str = Query("pstats", pattern="^(pstats|text)$", description="pstats or text"),
+    limit: int = Query(50, ge=1, le=1000, description="Rows in the text report")
+):
+    """
+    Get a stored profile
+
+    - **profile_id**: ID returned in the X-Profile-Id response header
+    - **format**: `pstats` (load with `python -m pstats` or snakeviz) or `text`
+    """
+    try:
+        profile_service = ProfileService(FileService().outputs_dir, max_profiles=settings.PROFILING_MAX_PROFILES)
+
+        if format == "text":
+            return PlainTextResponse(profile_service.render_text(profile_id, limit))
+
+        return FileResponse(
+            path=str(profile_service.get_profile_path(profile_id)),
+            media_type="application/octet-stream",
+            filename=f"{profile_id}.prof"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get profile: {str(e)}"
+        )
@@ -0,0 +1,172 @@
+"""
+Media library endpoints for the PPTX API
+"""
+from typing import Optional
+
+from fastapi import APIRouter, File, HTTPException, Response, UploadFile, status
+from fastapi.responses import FileResponse
+
+from app.models.enums import MediaKind
+from app.models.schemas import ContentInsertResponse, MediaInfo, MediaListResponse, MediaUploadResponse
+from app.services.admission import run_admitted
+from app.services.file_service import FileService
+
+
+router = APIRouter(prefix="/api/v1/media", tags=["media"])
+
+
+@router.post(
+    "/upload",
+    response_model=MediaUploadResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Upload an image or video to the media library",
+    description="Store an image or video once and reference it by media_id in image and video inserts"
+)
+async def upload_media(
+    response: Response,
+    file: UploadFile = File(..., description="Image (PNG, JPEG, GIF, BMP, TIFF, WEBP) or video (.mp4, .mov, .avi, .wmv)"),
+    poster: Optional[UploadFile] = File(None, description="Optional poster frame image (videos only)")
+):
+    """
+    Upload an image or video to the media library
+
+    - **file**: Image or video file
+    - **poster**: Optional poster frame for a video. If not provided, it is extracted from the video.
+
+    Uploading content that is already stored returns its existing media_id (200, `created: false`).
+    """
+    try:
+        file_service = FileService()
+        media, created = await file_service.save_media(file, poster)
+
+        if created and media.kind == MediaKind.VIDEO and not media.poster_filename:
+            try:
+                await run_admitted("poster", None, file_service.create_media_poster, media.media_id)
+                media = file_service.get_media_info(media.media_id)
+            except HTTPException:
+                # Retried when the video is inserted
+                pass
+
+        if not created:
+            response.status_code = status.HTTP_200_OK
+        return MediaUploadResponse(
+            created=created,
+            message="Media uploaded successfully" if created else "Media already stored",
+            media=media
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to upload media: {str(e)}"
+        )
+
+
+@router.get(
+    "/",
+    response_model=MediaListResponse,
+    summary="List the media library",
+    description="Get every image and video stored in the media library"
+)
+async def list_media():
+    """
+    List the media library
+    """
+    try:
+        file_service = FileService()
+        return MediaListResponse(media=file_service.list_media())
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to list media: {str(e)}"
+        )
+
+
+@router.get(
+    "/{media_id}",
+    response_model=MediaInfo,
+    summary="Get a media item",
+    description="Get the metadata (kind, dimensions, duration, poster, hash) of a media item"
+)
+async def get_media(media_id: str):
+    """
+    Get a media item
+
+    - **media_id**: ID returned by the upload
+    """
+    try:
+        file_service = FileService()
+        return file_service.get_media_info(media_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get media: {str(e)}"
+        )
+
+
+@router.get(
+    "/{media_id}/poster",
+    summary="Download the poster frame of a video",
+    description="Get the poster frame image used when the video is inserted"
+)
+async def get_media_poster(media_id: str):
+    """
+    Download the poster frame of a video
+
+    - **media_id**: ID of a video in the media library
+    """
+    try:
+        file_service = FileService()
+        poster_path = file_service.get_media_poster_path(media_id)
+        if poster_path is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Media '{media_id}' has no poster frame"
+            )
+        return FileResponse(path=str(poster_path))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get poster: {str(e)}"
+        )
+
+
+@router.delete(
+    "/{media_id}",
+    response_model=ContentInsertResponse,
+    summary="Delete a media item",
+    description="Delete a media item; presentations that already use it are not affected"
+)
+async def delete_media(media_id: str):
+    """
+    Delete a media item
+
+    - **media_id**: ID of the media item to delete
+    """
+    try:
+        file_service = FileService()
+
+        success = file_service.delete_media(media_id)
+
+        if not success:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Media with ID '{media_id}' not found or could not be deleted"
+            )
+
+        return ContentInsertResponse(
+            success=True,
+            message=f"Media '{media_id}' deleted successfully"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to delete media: {str(e)}"
+        )
@@ -1,8 +1,9 @@
 """
 Presentation endpoints for the PPTX API
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, status, Form, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
 from typing import Optional
 
@@ -10,13 +11,24 @@ from app.models.schemas import (
     PresentationCreateRequest,
     PresentationCreateResponse,
     PresentationListResponse,
+    PresentationMergeRequest,
+    PresentationMergeResponse,
     TextInsertRequest,
     ImageInsertRequest,
     VideoInsertRequest,
+    TableInsertRequest,
+    ChartBindRequest,
+    CompactionResponse,
+    RepeatSlidesRequest,
+    RepeatSlidesResponse,
+    PresentationValidation,
     ContentInsertResponse
 )
+from app.models.enums import ImageFit, MediaKind
+from app.services.admission import run_admitted
 from app.services.file_service import FileService
 from app.services.pptx_service import PPTXService
+from app.services.preview_service import PreviewService
 
 
 router = APIRouter(prefix="/api/v1/presentations", tags=["presentations"])
@@ -68,7 +80,8 @@ async def create_presentation(request: PresentationCreateRequest):
         presentation_id = file_service.generate_id()
         
         # Create presentation from template
-        pptx_service.create_presentation(request.template_id, presentation_id)
+        cost = await run_in_threadpool(pptx_service.estimate_cost, "create", template_id=request.template_id)
+        await run_admitted("create", cost, pptx_service.create_presentation, request.template_id, presentation_id)
         
         return PresentationCreateResponse(
             presentation_id=presentation_id,
@@ -84,6 +97,55 @@ async def create_presentation(request: PresentationCreateRequest):
         )
 
 
+@router.post(
+    "/merge",
+    response_model=PresentationMergeResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Merge presentations",
+    description="Create a new presentation with the slides of several presentations, in order"
+)
+async def merge_presentations(request: PresentationMergeRequest):
+    """
+    Merge presentations into a new one
+    
+    - **presentation_ids**: Presentations to merge, in order. The first one is the base:
+      its slide size, properties and masters are kept.
+    
+    Each slide keeps its own layout and master. Identical media, charts, masters and layouts
+    are stored once. The source presentations are not modified.
+    """
+    try:
+        file_service = FileService()
+        pptx_service = PPTXService(file_service)
+        
+        # Build operation-log sources first (no-op for file presentations)
+        for source_id in request.presentation_ids:
+            cost = await run_in_threadpool(pptx_service.estimate_cost, "materialize", source_id)
+            await run_admitted("materialize", cost, pptx_service.materialize, source_id)
+        
+        presentation_id = file_service.generate_id()
+        cost = max([
+            await run_in_threadpool(pptx_service.estimate_cost, "merge", source_id)
+            for source_id in request.presentation_ids
+        ])
+        report = await run_admitted(
+            "merge", cost, pptx_service.merge_presentations, request.presentation_ids, presentation_id
+        )
+        
+        return PresentationMergeResponse(
+            presentation_id=presentation_id,
+            message=f"{len(request.presentation_ids)} presentations merged ({report.slides} slides)",
+            report=report
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to merge presentations: {str(e)}"
+        )
+
+
 @router.post(
     "/{presentation_id}/text",
     response_model=ContentInsertResponse,
@@ -106,7 +168,10 @@ async def insert_text(presentation_id: str, request: TextInsertRequest):
         pptx_service = PPTXService(file_service)
         
         # Insert text
-        pptx_service.insert_text(
+        cost = await run_in_threadpool(pptx_service.estimate_cost, "text", presentation_id)
+        await run_admitted(
+            "text", cost,
+            pptx_service.insert_text,
             presentation_id=presentation_id,
             variable_name=request.variable_name,
             text=request.text,
@@ -135,7 +200,9 @@ async def insert_text(presentation_id: str, request: TextInsertRequest):
 async def insert_image(
     presentation_id: str,
     variable_name: str = Form(..., description="Variable name to replace (without {{}})"),
-    image: UploadFile = File(..., description="Image file to insert")
+    image: Optional[UploadFile] = File(None, description="Image file to insert"),
+    media_id: Optional[str] = Form(None, description="Image from the media library (instead of uploading one)"),
+    fit: ImageFit = Form(ImageFit.STRETCH, description="cover (crop to fill), contain (letterbox) or stretch")
 ):
     """
     Replace an image identifying it by its Alt Text variable.
@@ -143,24 +210,42 @@ async def insert_image(
     - **presentation_id**: ID of the presentation
     - **variable_name**: Name of the variable (will search for {{variable_name}} or {{image:variable_name}} in Alt Text)
     - **image**: Image file to insert (PNG, JPG, JPEG, GIF, BMP, TIFF)
+    - **media_id**: Alternatively, an image uploaded to /api/v1/media
+    - **fit**: How the image fills the shape: `cover` crops it to fill the shape, `contain`
+      fits it inside keeping its aspect ratio, `stretch` (default) fills the shape exactly
     """
     try:
         file_service = FileService()
         pptx_service = PPTXService(file_service)
         
-        # Save image
-        image_id, image_filename = await file_service.save_image(image)
-        image_path = str(file_service.get_image_path(image_id))
+        if (image is None) == (media_id is None):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Send either an image file or a media_id"
+            )
+        
+        if media_id:
+            image_path = str(file_service.get_media_path(media_id, MediaKind.IMAGE))
+        else:
+            # Save image
+            image_id, image_filename = await file_service.save_image(image)
+            image_path = str(file_service.get_image_path(image_id))
         
         # Insert image
-        pptx_service.insert_image(
+        cost = await run_in_threadpool(pptx_service.estimate_cost, "image", presentation_id, media_paths=(image_path,))
+        await run_admitted(
+            "image", cost,
+            pptx_service.insert_image,
             presentation_id=presentation_id,
             variable_name=variable_name,
-            image_path=image_path
+            image_path=None if media_id else image_path,
+            fit=fit,
+            media_id=media_id
         )
         
         # Cleanup temporary image file
-        file_service.cleanup_image(image_id)
+        if not media_id:
+            file_service.cleanup_image(image_id)
         
         return ContentInsertResponse(
             success=True,
@@ -175,6 +260,125 @@ async def insert_image(
         )
 
 
+@router.post(
+    "/{presentation_id}/table",
+    response_model=ContentInsertResponse,
+    summary="Fill a table variable in the presentation",
+    description="Append rows to the table whose Alt Text matches {{table:variable_name}}, optionally continuing on cloned slides."
+)
+async def insert_table(presentation_id: str, request: TableInsertRequest):
+    """
+    Fill a table identifying it by its Alt Text variable.
+    
+    - **presentation_id**: ID of the presentation
+    - **variable_name**: Name of the variable (will search for {{table:variable_name}} in Alt Text)
+    - **rows**: Rows of values; each row is stamped from the first row after the header
+    - **header_rows**: Number of header rows to keep (default 1)
+    - **auto_continue**: Continue overflowing rows on copies of the slide
+    """
+    try:
+        file_service = FileService()
+        pptx_service = PPTXService(file_service)
+        
+        cost = await run_in_threadpool(pptx_service.estimate_cost, "table", presentation_id)
+        await run_admitted(
+            "table", cost,
+            pptx_service.insert_table,
+            presentation_id=presentation_id,
+            variable_name=request.variable_name,
+            rows=request.rows,
+            header_rows=request.header_rows,
+            auto_continue=request.auto_continue
+        )
+        
+        return ContentInsertResponse(
+            success=True,
+            message=f"Table variable '{{{{table:{request.variable_name}}}}}' filled with {len(request.rows)} rows"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fill table variable: {str(e)}"
+        )
+
+
+@router.post(
+    "/{presentation_id}/finalize",
+    response_model=ContentInsertResponse,
+    summary="Build a presentation",
+    description="Apply the pending operations of an operation-log presentation and cache the resulting file."
+)
+async def finalize_presentation(presentation_id: str):
+    """
+    Finalize a presentation
+    
+    - **presentation_id**: ID of the presentation
+    
+    Only needed in `oplog` storage mode, to build the deck ahead of the download.
+    For file presentations it just checks that the presentation exists.
+    """
+    try:
+        file_service = FileService()
+        pptx_service = PPTXService(file_service)
+        
+        cost = await run_in_threadpool(pptx_service.estimate_cost, "materialize", presentation_id)
+        presentation_path = await run_admitted("materialize", cost, pptx_service.materialize, presentation_id)
+        
+        return ContentInsertResponse(
+            success=True,
+            message=f"Presentation '{presentation_id}' built ({presentation_path.stat().st_size} bytes)"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to finalize presentation: {str(e)}"
+        )
+
+
+@router.post(
+    "/{presentation_id}/compact",
+    response_model=CompactionResponse,
+    summary="Remove unused parts from a presentation",
+    description="Drop relationships and media no longer referenced and, optionally, unused slide layouts and masters."
+)
+async def compact_presentation(
+    presentation_id: str,
+    remove_unused_layouts: bool = Query(False, description="Also remove layouts no slide uses")
+):
+    """
+    Compact a presentation
+    
+    - **presentation_id**: ID of the presentation
+    - **remove_unused_layouts**: Also remove unused layouts (and masters left without used layouts)
+    
+    Unreferenced media is already dropped on every save unless PACKAGE_COMPACTION is off;
+    this endpoint reports what was removed and the bytes saved.
+    """
+    try:
+        file_service = FileService()
+        pptx_service = PPTXService(file_service)
+        
+        cost = await run_in_threadpool(pptx_service.estimate_cost, "compact", presentation_id)
+        report = await run_admitted("compact", cost, pptx_service.compact, presentation_id, remove_unused_layouts)
+        
+        return CompactionResponse(
+            success=True,
+            message=f"Presentation '{presentation_id}' compacted",
+            report=report
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to compact presentation: {str(e)}"
+        )
+
+
 @router.get(
     "/{presentation_id}/download",
     summary="Download a presentation",
@@ -190,9 +394,19 @@ async def download_presentation(presentation_id: str):
     """
     try:
         file_service = FileService()
+        pptx_service = PPTXService(file_service)
         
-        # Get presentation path
-        presentation_path = file_service.get_presentation_path(presentation_id)
+        # Remote storage: stream the stored file instead of caching it on this node
+        if not file_service.storage.is_local and not pptx_service.oplog.exists(presentation_id):
+            return StreamingResponse(
+                file_service.stream_presentation(presentation_id),
+                media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+                headers={"Content-Disposition": f'attachment; filename="{presentation_id}.pptx"'}
+            )
+        
+        # Get presentation path (operation-log presentations are built here)
+        cost = await run_in_threadpool(pptx_service.estimate_cost, "materialize", presentation_id)
+        presentation_path = await run_admitted("materialize", cost, pptx_service.materialize, presentation_id)
         
         # Return file
         return FileResponse(
@@ -209,6 +423,168 @@ async def download_presentation(presentation_id: str):
         )
 
 
+@router.get(
+    "/{presentation_id}/validate",
+    response_model=PresentationValidation,
+    summary="Check for unfilled variables",
+    description="Scan the presentation (slides, notes, layouts and masters) for {{variables}} that were not replaced."
+)
+async def validate_presentation(presentation_id: str):
+    """
+    Validate a filled presentation
+    
+    - **presentation_id**: ID of the presentation
+    
+    Returns `valid: true` when no variables remain, otherwise the list of unresolved variables with their location.
+    """
+    try:
+        file_service = FileService()
+        pptx_service = PPTXService(file_service)
+        
+        cost = await run_in_threadpool(pptx_service.estimate_cost, "materialize", presentation_id)
+        return await run_admitted("materialize", cost, pptx_service.validate_presentation, presentation_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to validate presentation: {str(e)}"
+        )
+
+
+@router.post(
+    "/{presentation_id}/repeat",
+    response_model=RepeatSlidesResponse,
+    summary="Repeat a slide block once per item",
+    description="Clone the slides between {{#each variable_name}} and {{/each}} once per item and fill each copy with the item's values."
+)
+async def repeat_slides(presentation_id: str, request: RepeatSlidesRequest):
+    """
+    Repeat a block of slides (e.g. one slide per product or region).
+    
+    - **presentation_id**: ID of the presentation
+    - **variable_name**: Name of the block (will search for {{#each variable_name}} in slide text)
+    - **items**: One object per copy, e.g. `{"nombre": "Producto A", "precio": 10}`
+    
+    The block ends at the next slide containing {{/each}} (or is just the marker slide).
+    Copies share images and layouts with the original slides. An empty `items` list removes the block.
+    """
+    try:
+        file_service = FileService()
+        pptx_service = PPTXService(file_service)
+        
+        cost = await run_in_threadpool(pptx_service.estimate_cost, "repeat", presentation_id)
+        slides_generated = await run_admitted(
+            "repeat", cost,
+            pptx_service.repeat_slides,
+            presentation_id=presentation_id,
+            variable_name=request.variable_name,
+            items=request.items
+        )
+        
+        return RepeatSlidesResponse(
+            success=True,
+            message=f"Block '{{{{#each {request.variable_name}}}}}' repeated for {len(request.items)} items",
+            slides_generated=slides_generated
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to repeat slide block: {str(e)}"
+        )
+
+
+@router.post(
+    "/{presentation_id}/chart",
+    response_model=ContentInsertResponse,
+    summary="Bind data to a chart variable",
+    description="Replace the categories and series of charts whose Alt Text matches {{chart:variable_name}}."
+)
+async def bind_chart(presentation_id: str, request: ChartBindRequest):
+    """
+    Replace chart data identifying the chart by its Alt Text variable.
+    
+    - **presentation_id**: ID of the presentation
+    - **variable_name**: Name of the variable (will search for {{chart:variable_name}} in Alt Text)
+    - **categories**: Category labels (X values for scatter charts)
+    - **series**: List of `{name, values}` aligned with the categories
+    - **number_format**: Optional Excel number format for the values
+    
+    Series are added (copying the style of the last one) or removed to match the payload.
+    """
+    try:
+        file_service = FileService()
+        pptx_service = PPTXService(file_service)
+        
+        cost = await run_in_threadpool(pptx_service.estimate_cost, "chart", presentation_id)
+        await run_admitted(
+            "chart", cost,
+            pptx_service.bind_chart,
+            presentation_id=presentation_id,
+            variable_name=request.variable_name,
+            categories=request.categories,
+            series=[(s.name, s.values) for s in request.series],
+            number_format=request.number_format
+        )
+        
+        return ContentInsertResponse(
+            success=True,
+            message=f"Chart variable '{{{{chart:{request.variable_name}}}}}' bound to {len(request.series)} series"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to bind chart variable: {str(e)}"
+        )
+
+
+@router.get(
+    "/{presentation_id}/slides/{slide_index}/preview.png",
+    summary="Preview a slide",
+    description="Render a fast wireframe PNG preview of a slide (shape boxes, pictures and text) without an office suite"
+)
+async def preview_slide(
+    presentation_id: str,
+    slide_index: int,
+    width: int = Query(960, ge=64, le=3840, description="Preview width in pixels")
+):
+    """
+    Preview a slide
+    
+    - **presentation_id**: ID of the presentation
+    - **slide_index**: Zero-based slide index (same as `slide_index` in the variables scan)
+    - **width**: Preview width in pixels
+    
+    Previews are approximate and cached by slide content, so unchanged slides are not re-rendered.
+    """
+    try:
+        file_service = FileService()
+        pptx_service = PPTXService(file_service)
+        preview_service = PreviewService(file_service)
+        
+        # Build operation-log presentations first (no-op for file presentations)
+        cost = await run_in_threadpool(pptx_service.estimate_cost, "materialize", presentation_id)
+        await run_admitted("materialize", cost, pptx_service.materialize, presentation_id)
+        
+        cost = await run_in_threadpool(pptx_service.estimate_cost, "preview", presentation_id)
+        preview_path = await run_admitted(
+            "preview", cost, preview_service.get_slide_preview, presentation_id, slide_index, width
+        )
+        
+        return FileResponse(path=str(preview_path), media_type="image/png")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to render slide preview: {str(e)}"
+        )
+
+
 @router.post(
     "/{presentation_id}/video",
     response_model=ContentInsertResponse,
@@ -218,7 +594,8 @@ async def download_presentation(presentation_id: str):
 async def insert_video(
     presentation_id: str,
     variable_name: str = Form(..., description="Variable name to replace (without {{}} )"),
-    video: UploadFile = File(..., description="Video file to insert (.mp4)"),
+    video: Optional[UploadFile] = File(None, description="Video file to insert (.mp4)"),
+    media_id: Optional[str] = Form(None, description="Video from the media library (instead of uploading one)"),
     poster: Optional[UploadFile] = File(None, description="Optional poster frame image")
 ):
     """
@@ -227,15 +604,25 @@ async def insert_video(
     - **presentation_id**: ID of the presentation
     - **variable_name**: Name of the variable (will search for {{variable_name}} or {{video:variable_name}} in Alt Text)
     - **video**: Video file to insert (.mp4)
+    - **media_id**: Alternatively, a video uploaded to /api/v1/media (its stored poster frame is used)
     - **poster**: Optional poster frame image. If not provided, it will be extracted from the video.
     """
     try:
         file_service = FileService()
         pptx_service = PPTXService(file_service)
         
-        # Save video
-        video_id, video_filename = await file_service.save_video(video)
-        video_path = file_service.get_video_path(video_id)
+        if (video is None) == (media_id is None):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Send either a video file or a media_id"
+            )
+        
+        if media_id:
+            video_path = file_service.get_media_path(media_id, MediaKind.VIDEO)
+        else:
+            # Save video
+            video_id, video_filename = await file_service.save_video(video)
+            video_path = file_service.get_video_path(video_id)
         
         # Determine poster path
         poster_path = None
@@ -243,16 +630,27 @@ async def insert_video(
             # Save user-provided poster
             poster_id, poster_filename = await file_service.save_image(poster)
             poster_path = file_service.get_image_path(poster_id)
+        elif media_id:
+            # Poster stored with the media (extracted now if it could not be at upload)
+            poster_path = file_service.get_media_poster_path(media_id) or await run_admitted(
+                "poster", None, file_service.create_media_poster, media_id
+            )
         else:
             # Extract automatic poster
-            poster_path = file_service.extract_poster_frame(video_path)
+            poster_path = await run_admitted("poster", None, file_service.extract_poster_frame, video_path)
             
         # Insert video
-        pptx_service.insert_video(
+        cost = await run_in_threadpool(
+            pptx_service.estimate_cost, "video", presentation_id, media_paths=(video_path, poster_path)
+        )
+        await run_admitted(
+            "video", cost,
+            pptx_service.insert_video,
             presentation_id=presentation_id,
             variable_name=variable_name,
-            video_path=str(video_path),
-            poster_path=str(poster_path)
+            video_path=None if media_id else str(video_path),
+            poster_path=str(poster_path),
+            media_id=media_id
         )
         
         return ContentInsertResponse(
@@ -2,6 +2,7 @@
 Template endpoints for the PPTX API
 """
 from fastapi import APIRouter, UploadFile, File, HTTPException, status
+from starlette.concurrency import run_in_threadpool
 from typing import List
 
 from app.models.schemas import (
@@ -11,6 +12,7 @@ from app.models.schemas import (
     ErrorResponse,
     ContentInsertResponse
 )
+from app.services.admission import run_admitted
 from app.services.file_service import FileService
 from app.services.pptx_service import PPTXService
 
@@ -37,12 +39,13 @@ async def upload_template(
     """
     try:
         file_service = FileService()
-        template_id, filename = await file_service.save_template(file)
+        template_id, filename, stats = await file_service.save_template(file)
         
         return TemplateUploadResponse(
             template_id=template_id,
             filename=filename,
-            message="Template uploaded successfully"
+            message="Template uploaded successfully",
+            stats=stats
         )
     except HTTPException:
         raise
@@ -94,7 +97,8 @@ async def get_template_variables(template_id: str):
         file_service = FileService()
         pptx_service = PPTXService(file_service)
         
-        variables = pptx_service.get_template_variables(template_id)
+        cost = await run_in_threadpool(pptx_service.estimate_cost, "scan", template_id=template_id)
+        variables = await run_admitted("scan", cost, pptx_service.get_template_variables, template_id)
         
         return variables
     except HTTPException:
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List, Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import field_validator
 
@@ -19,6 +19,134 @@ class Settings(BaseSettings):
     BASE_DIR: str = "."
     UPLOAD_DIR: str = "uploads"
     OUTPUT_DIR: str = "outputs"
+
+    # Almacenamiento de presentaciones nuevas:
+    # "file"  -> cada edición reescribe outputs/{id}.pptx
+    # "oplog" -> referencia al template + log de operaciones; el .pptx se genera al descargar o finalizar
+    PRESENTATION_STORAGE: Literal["file", "oplog"] = "file"
+    # Caché de presentaciones generadas en modo "oplog" (mismo template + mismas operaciones + mismos medios).
+    # Espacio máximo en disco en bytes; 0 la desactiva.
+    OUTPUT_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+    # Espacio máximo en disco (bytes) de las previsualizaciones PNG en outputs/previews/;
+    # al superarlo se borran primero las usadas hace más tiempo
+    PREVIEW_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # Backend de almacenamiento de templates, imágenes, vídeos y presentaciones:
+    # "local" -> archivos bajo BASE_DIR (uploads/ y outputs/)
+    # "s3"    -> bucket S3 o compatible (MinIO...), para varios nodos sin estado tras un balanceador
+    STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    S3_BUCKET: str = ""
+    S3_PREFIX: str = ""
+    # Solo para servicios compatibles (p. ej. http://minio:9000); vacío para AWS
+    S3_ENDPOINT_URL: str = ""
+    S3_REGION: str = "us-east-1"
+    # Vacíos -> credenciales por defecto de boto3 (variables AWS_*, rol IAM...)
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: str = ""
+    # Conexiones HTTP reutilizadas por el cliente compartido
+    S3_MAX_POOL_CONNECTIONS: int = 32
+    # Subidas y descargas multiparte a partir de este tamaño, en partes de este tamaño
+    S3_MULTIPART_THRESHOLD: int = 8 * 1024 * 1024
+    S3_MULTIPART_CHUNKSIZE: int = 8 * 1024 * 1024
+    # Caché local de lectura para S3 (relativa a BASE_DIR) y su tamaño máximo en bytes
+    STORAGE_CACHE_DIR: str = ".storage_cache"
+    STORAGE_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+
+    # Validación de templates al subirlos (solo se lee el directorio del zip y [Content_Types].xml):
+    # tamaño máximo del .pptx y descomprimido, número máximo de partes y ratio de compresión máximo por
+    # parte (por encima se considera una zip bomb).
+    TEMPLATE_MAX_BYTES: int = 200 * 1024 * 1024
+    TEMPLATE_MAX_UNCOMPRESSED_BYTES: int = 1024 * 1024 * 1024
+    TEMPLATE_MAX_PARTS: int = 10000
+    TEMPLATE_MAX_COMPRESSION_RATIO: int = 100
+
+    # Subida masiva de templates e imágenes (zip o tar por streaming): miembros máximos por archivo y
+    # tamaño máximo de cada miembro una vez extraído.
+    BULK_MAX_MEMBERS: int = 5000
+    BULK_MAX_MEMBER_BYTES: int = 200 * 1024 * 1024
+
+    # Ajuste automático de texto (formatting.auto_fit): directorios con las fuentes .ttf/.otf usadas para
+    # medir el texto y fuente de reserva cuando la del texto no está instalada.
+    TEXT_FIT_FONT_DIRS: List[str] = ["/usr/share/fonts", "/usr/local/share/fonts", "~/.fonts"]
+    TEXT_FIT_FALLBACK_FONT: str = "DejaVu Sans"
+
+    # Control de admisión por memoria (por proceso): las operaciones pesadas solo se ejecutan mientras
+    # la memoria estimada de las que están en curso no supere el presupuesto. Si no hay hueco esperan
+    # hasta ADMISSION_QUEUE_TIMEOUT segundos y después se rechazan con 429 + Retry-After. 0 lo desactiva.
+    ADMISSION_MEMORY_BUDGET_BYTES: int = 1024 * 1024 * 1024
+    ADMISSION_QUEUE_TIMEOUT: float = 10.0
+    ADMISSION_RETRY_AFTER: int = 5
+
+    # Trazas (spans compatibles con OpenTelemetry, propagación W3C traceparent):
+    # "none" | "console" (stderr) | "file" (JSON por línea en TRACING_FILE) | "otlp" (OTLP/HTTP JSON)
+    # | "paquete.modulo:Clase" (exportador propio, subclase de tracing.SpanExporter)
+    TRACING_EXPORTER: str = "none"
+    TRACING_FILE: str = "outputs/traces/spans.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318"
+    # Headers extra para el collector, "clave=valor,clave2=valor2"
+    TRACING_OTLP_HEADERS: str = ""
+    TRACING_SERVICE_NAME: str = "pptx-api"
+    # Fracción de trazas nuevas que se exportan (las que llegan con traceparent respetan su flag)
+    TRACING_SAMPLE_RATIO: float = 1.0
+
+    # Reintentos seguros: las peticiones POST de presentaciones con header Idempotency-Key guardan su
+    # respuesta IDEMPOTENCY_TTL segundos (0 lo desactiva) y los duplicados la reciben sin repetir el trabajo.
+    # Un duplicado que llega mientras la primera sigue en curso espera hasta IDEMPOTENCY_WAIT_TIMEOUT
+    # segundos (después responde 409).
+    IDEMPOTENCY_TTL: int = 24 * 60 * 60
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 330.0
+
+    # Plazo máximo en segundos por tipo de operación. Con plazo, la operación se ejecuta en un proceso
+    # auxiliar que se mata al vencer (respuesta 504); 0 o ausente -> sin plazo, en el propio worker.
+    OPERATION_DEADLINES: Dict[str, float] = {
+        "create": 60,
+        "scan": 30,
+        "text": 60,
+        "image": 60,
+        "video": 120,
+        "poster": 30,
+        "table": 60,
+        "repeat": 120,
+        "chart": 60,
+        "compact": 60,
+        "materialize": 300,
+        "preview": 60,
+        "merge": 300,
+    }
+    # Procesos auxiliares por worker para operaciones con plazo (mínimo 1). Se arrancan bajo demanda y
+    # cada uno carga python-pptx, lxml, OpenCV y numpy: en el host hay workers de la API x OPERATION_WORKERS.
+    # La memoria de los que están inactivos se descuenta del presupuesto de admisión.
+    OPERATION_WORKERS: int = 2
+
+    # Caché de templates en memoria compartida entre los workers del host (mmap de solo lectura).
+    # Directorio vacío -> /dev/shm/pptx-api-<hash del directorio outputs> (o outputs/shm si no existe /dev/shm).
+    # 0 bytes la desactiva. Al borrar un template se borra también su copia compartida.
+    # El límite efectivo nunca supera el tamaño del tmpfs (Docker: /dev/shm de 64 MB por defecto);
+    # los templates que no caben se leen del disco con lecturas normales.
+    TEMPLATE_SHM_DIR: str = ""
+    TEMPLATE_SHM_MAX_BYTES: int = 512 * 1024 * 1024
+
+    # Al guardar, elimina relaciones y partes que ya nadie referencia (p. ej. la imagen de un marcador reemplazado)
+    PACKAGE_COMPACTION: bool = True
+    # Además elimina los diseños (layouts) que ninguna diapositiva usa y los patrones que quedan sin diseños usados
+    PACKAGE_COMPACTION_LAYOUTS: bool = False
+
+    # Compresión al guardar .pptx: nivel deflate (0-9, 0 = sin comprimir) para XML y para otros binarios.
+    # Los medios ya comprimidos (extensiones de ZIP_STORED_EXTENSIONS) se guardan tal cual.
+    ZIP_XML_COMPRESSLEVEL: int = 6
+    ZIP_BINARY_COMPRESSLEVEL: int = 6
+    ZIP_STORED_EXTENSIONS: List[str] = [
+        "jpg", "jpeg", "png", "gif", "webp", "mp4", "m4v", "mov", "avi", "wmv",
+        "mp3", "m4a", "wma", "xlsx", "docx", "pptx", "zip",
+    ]
+    # Hilos que comprimen partes en paralelo
+    ZIP_COMPRESS_WORKERS: int = 4
+
+    # Profiling (solo para administradores)
+    # Con PROFILING_ENABLED=False el middleware ni siquiera se registra.
+    PROFILING_ENABLED: bool = False
+    PROFILING_ADMIN_TOKEN: str = ""
+    PROFILING_MAX_PROFILES: int = 20
     
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -26,7 +154,7 @@ class Settings(BaseSettings):
         case_sensitive=True
     )
 
-    @field_validator("CORS_ORIGINS", mode="before")
+    @field_validator("CORS_ORIGINS", "ZIP_STORED_EXTENSIONS", "TEXT_FIT_FONT_DIRS", mode="before")
     @classmethod
     def assemble_cors_origins(cls, v: str | List[str]) -> List[str]:
         if isinstance(v, str) and not v.startswith("["):
@@ -3,12 +3,14 @@ Main FastAPI application for PPTX API
 """
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from app.api.routes import templates, presentations
-from app.api.deps import verify_token
+from app.api.routes import templates, presentations, media, bulk, debug
+from app.api.deps import verify_token, verify_admin_token
+from app.api.middleware import IdempotencyMiddleware, TracingMiddleware, profiling_middleware
 from app.models.schemas import HealthResponse
 from app.config import settings
+from app.services.metrics import metrics
 
 
 # Create FastAPI application
@@ -29,6 +31,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Safe retries of mutating presentation requests (Idempotency-Key header)
+if settings.IDEMPOTENCY_TTL > 0:
+    app.add_middleware(IdempotencyMiddleware, path_prefix=presentations.router.prefix)
+
+# Request tracing (TRACING_EXPORTER), around everything else including idempotent waits
+if settings.TRACING_EXPORTER != "none":
+    app.add_middleware(TracingMiddleware)
+
 # Include routers
 # Include routers with security dependency
 app.include_router(
@@ -39,6 +49,22 @@ app.include_router(
     presentations.router,
     dependencies=[Depends(verify_token)]
 )
+app.include_router(
+    media.router,
+    dependencies=[Depends(verify_token)]
+)
+app.include_router(
+    bulk.router,
+    dependencies=[Depends(verify_token)]
+)
+
+# Request profiling (opt-in, zero overhead when disabled)
+if settings.PROFILING_ENABLED:
+    app.middleware("http")(profiling_middleware)
+    app.include_router(
+        debug.router,
+        dependencies=[Depends(verify_token), Depends(verify_admin_token)]
+    )
 
 
 @app.get("/", response_model=HealthResponse, tags=["health"])
@@ -67,6 +93,17 @@ async def health_check():
     )
 
 
+@app.get("/metrics", response_class=PlainTextResponse, tags=["health"])
+async def get_metrics():
+    """
+    Metrics endpoint (Prometheus text format)
+    
+    Per-process values: memory admitted for operations in flight, queued and
+    rejected requests. With several workers each one reports its own.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """
@@ -18,3 +18,16 @@ class VerticalAlignment(str, Enum):
     TOP = "TOP"
     MIDDLE = "MIDDLE"
     BOTTOM = "BOTTOM"
+
+
+class ImageFit(str, Enum):
+    """How an image fills the shape it replaces"""
+    COVER = "cover"
+    CONTAIN = "contain"
+    STRETCH = "stretch"
+
+
+class MediaKind(str, Enum):
+    """Kind of a media library item"""
+    IMAGE = "image"
+    VIDEO = "video"
@@ -1,9 +1,9 @@
 """
 Pydantic schemas for request/response models
 """
-from typing import Optional, List
-from pydantic import BaseModel, Field
-from .enums import TextAlignment, VerticalAlignment
+from typing import Dict, Optional, List, Union
+from pydantic import BaseModel, Field, model_validator
+from .enums import ImageFit, MediaKind, TextAlignment, VerticalAlignment
 
 
 class Position(BaseModel):
@@ -21,8 +21,15 @@ class Size(BaseModel):
 class VariableInfo(BaseModel):
     """Information about a variable detected in a template"""
     name: str = Field(..., description="Variable name (without the curly braces)")
-    type: str = Field(..., description="Type of variable (text or image)")
-    slide_index: int = Field(..., description="Index of the slide where the variable was found")
+    type: str = Field(..., description="Type of variable (text, image, video, table, chart or repeat)")
+    slide_index: Optional[int] = Field(..., description="Index of the slide where the variable was found (null for layouts and masters)")
+    part: Optional[str] = Field(None, description="Package part containing the variable (e.g. ppt/slides/slide1.xml)")
+    part_type: Optional[str] = Field(None, description="Kind of part: slide, notes, layout or master")
+    location: Optional[str] = Field(None, description="Where in the shape: text, table_cell or alt_text")
+    shape_id: Optional[int] = Field(None, description="Shape id within the part")
+    shape_name: Optional[str] = Field(None, description="Shape name, prefixed by its group names for grouped shapes")
+    row: Optional[int] = Field(None, description="Table row (table_cell only)")
+    column: Optional[int] = Field(None, description="Table column (table_cell only)")
 
 
 class TemplateVariables(BaseModel):
@@ -31,6 +38,25 @@ class TemplateVariables(BaseModel):
     variables: List[VariableInfo]
 
 
+class SkippedOperation(BaseModel):
+    """Logged operation left out of a built presentation because it failed"""
+    index: int = Field(..., description="Position of the operation in the log (0 = first edit)")
+    op: str
+    variable_name: Optional[str] = None
+    error: str
+
+
+class PresentationValidation(BaseModel):
+    """Variables left unfilled in a presentation"""
+    presentation_id: str
+    valid: bool = Field(..., description="True when no variables remain and no logged operation was skipped")
+    unresolved: List[VariableInfo]
+    skipped_operations: List[SkippedOperation] = Field(
+        default_factory=list,
+        description="Operation-log edits that failed when the deck was built"
+    )
+
+
 class TextFormatting(BaseModel):
     """Text formatting options"""
     font_name: Optional[str] = Field(None, description="Font family name")
@@ -41,6 +67,8 @@ class TextFormatting(BaseModel):
     color: Optional[str] = Field(None, pattern=r'^#[0-9A-Fa-f]{6}$', description="Hex color code (e.g., #FF0000)")
     alignment: Optional[TextAlignment] = Field(None, description="Text alignment")
     vertical_alignment: Optional[VerticalAlignment] = Field(None, description="Vertical alignment")
+    auto_fit: Optional[bool] = Field(None, description="Shrink the font until the text fits its shape (font_size is then the largest size tried)")
+    min_font_size: Optional[int] = Field(None, ge=1, le=400, description="Smallest font size auto_fit may use (default 8)")
 
 
 class TextInsertRequest(BaseModel):
@@ -53,17 +81,117 @@ class TextInsertRequest(BaseModel):
 class ImageInsertRequest(BaseModel):
     """Request to insert an image into a variable"""
     variable_name: str = Field(..., description="Variable name to replace (from Alt Text)")
+    media_id: Optional[str] = Field(None, description="Image from the media library (instead of an upload)")
+    fit: ImageFit = Field(ImageFit.STRETCH, description="cover (crop to fill), contain (letterbox) or stretch")
 
 
 class VideoInsertRequest(BaseModel):
     """Request to insert a video into a variable"""
     variable_name: str = Field(..., description="Variable name to replace (from Alt Text)")
+    media_id: Optional[str] = Field(None, description="Video from the media library (instead of an upload)")
+
+
+class TableInsertRequest(BaseModel):
+    """Request to fill a table identified by {{table:variable_name}} in its Alt Text"""
+    variable_name: str = Field(..., description="Table variable name (without {{table:}})")
+    rows: List[List[Optional[Union[str, int, float]]]] = Field(..., description="Rows of cell values, in column order")
+    header_rows: int = Field(1, ge=0, description="Leading rows kept as header; the next row is the row template")
+    auto_continue: bool = Field(False, description="Continue rows that overflow the table frame on cloned slides")
+
+
+class RepeatSlidesRequest(BaseModel):
+    """Request to repeat the slide block marked with {{#each variable_name}}"""
+    variable_name: str = Field(..., description="Block name (as in {{#each variable_name}})")
+    items: List[Dict[str, Optional[Union[str, int, float]]]] = Field(
+        ..., description="One object per copy; its keys replace the {{field}} variables of that copy"
+    )
+
+
+class RepeatSlidesResponse(BaseModel):
+    """Response after repeating a slide block"""
+    success: bool
+    message: str
+    slides_generated: Optional[int] = Field(None, description="Slides produced by the block (null when the operation is only logged)")
+
+
+class ChartSeriesData(BaseModel):
+    """One chart series as a column of values"""
+    name: str = Field(..., description="Series name (legend entry)")
+    values: List[Optional[float]] = Field(..., description="Values aligned with the categories (null for gaps)")
+
+
+class ChartBindRequest(BaseModel):
+    """Request to replace the data of charts identified by {{chart:variable_name}} in their Alt Text"""
+    variable_name: str = Field(..., description="Chart variable name (without {{chart:}})")
+    categories: List[Union[str, int, float]] = Field(..., description="Category labels (or X values for scatter charts)")
+    series: List[ChartSeriesData] = Field(..., min_length=1, description="Series in columnar form")
+    number_format: str = Field("General", description="Excel number format for the values")
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        for series in self.series:
+            if len(series.values) != len(self.categories):
+                raise ValueError(
+                    f"Series '{series.name}' has {len(series.values)} values for {len(self.categories)} categories"
+                )
+        return self
+
+
+class CompactionReport(BaseModel):
+    """What a package compaction removed"""
+    relationships_removed: int = Field(..., description="Relationships whose rId was no longer referenced")
+    parts_removed: int = Field(..., description="Parts (media, charts, layouts...) left out of the package")
+    layouts_removed: int = Field(0, description="Unused slide layouts removed")
+    masters_removed: int = Field(0, description="Slide masters removed because none of their layouts was used")
+    bytes_saved: int = Field(..., description="Uncompressed size of the removed parts")
+
+
+class CompactionResponse(BaseModel):
+    """Response after compacting a presentation"""
+    success: bool
+    message: str
+    report: Optional[CompactionReport] = Field(None, description="Null when the operation is only logged")
+
+
+class MergeReport(BaseModel):
+    """What a presentation merge wrote and deduplicated"""
+    sources: int = Field(..., description="Presentations merged")
+    slides: int = Field(..., description="Slides in the merged presentation")
+    parts: int = Field(..., description="Parts written (slides, layouts, media...)")
+    parts_deduplicated: int = Field(..., description="Parts not written again because an identical one was already in the output")
+    layouts_deduplicated: int = Field(..., description="Layouts reused from an identical master already in the output")
+    bytes_deduplicated: int = Field(..., description="Uncompressed size of the parts not written again")
+
+
+class PresentationMergeRequest(BaseModel):
+    """Request to merge presentations into a new one"""
+    presentation_ids: List[str] = Field(
+        ..., min_length=1, description="Presentations whose slides are appended, in order (the first one is the base)"
+    )
+
+
+class PresentationMergeResponse(BaseModel):
+    """Response after merging presentations"""
+    presentation_id: str = Field(..., description="ID of the merged presentation")
+    message: str
+    report: MergeReport
+
+
+class TemplateStats(BaseModel):
+    """Statistics read from a template's zip directory at upload"""
+    slide_count: int = Field(..., description="Slides in the template")
+    layout_count: int = Field(..., description="Slide layouts in the template")
+    part_count: int = Field(..., description="Parts (zip members) in the package")
+    media_bytes: int = Field(..., description="Uncompressed size of the media (ppt/media)")
+    package_bytes: int = Field(..., description="Size of the .pptx file")
+    uncompressed_bytes: int = Field(..., description="Uncompressed size of all parts")
 
 
 class TemplateInfo(BaseModel):
     """Basic information about a template"""
     template_id: str
     filename: str
+    stats: Optional[TemplateStats] = Field(None, description="Null for templates uploaded before stats were recorded")
 
 class TemplateListResponse(BaseModel):
     """Response containing a list of templates"""
@@ -75,6 +203,55 @@ class TemplateUploadResponse(BaseModel):
     template_id: str = Field(..., description="Unique template identifier")
     filename: str = Field(..., description="Original filename")
     message: str = Field(..., description="Success message")
+    stats: TemplateStats = Field(..., description="Template statistics")
+
+
+class MediaInfo(BaseModel):
+    """An image or video stored in the media library"""
+    media_id: str
+    kind: MediaKind
+    filename: str = Field(..., description="Stored filename")
+    original_filename: Optional[str] = Field(None, description="Filename it was uploaded with")
+    size_bytes: int
+    sha256: str = Field(..., description="SHA-256 of the content (identical uploads share one media_id)")
+    width: int = Field(..., description="Width in pixels")
+    height: int = Field(..., description="Height in pixels")
+    duration_seconds: Optional[float] = Field(None, description="Duration (videos only)")
+    poster_filename: Optional[str] = Field(None, description="Poster frame used when inserting the video (videos only)")
+    created_at: str = Field(..., description="Creation time (UTC, ISO 8601)")
+
+
+class MediaListResponse(BaseModel):
+    """Response containing the media library"""
+    media: List[MediaInfo]
+
+
+class MediaUploadResponse(BaseModel):
+    """Response after uploading to the media library"""
+    created: bool = Field(..., description="False when identical content was already stored (its media_id is returned)")
+    message: str = Field(..., description="Success message")
+    media: MediaInfo
+
+
+class BulkUploadItem(BaseModel):
+    """One member of an archive sent to the bulk upload"""
+    name: str = Field(..., description="Path of the member in the archive")
+    kind: str = Field(..., description="template (.pptx), image or other")
+    status: str = Field(..., description="created, existing (already stored with the same content), skipped or failed")
+    id: Optional[str] = Field(None, description="template_id, or media_id for images")
+    filename: Optional[str] = Field(None, description="Stored filename")
+    sha256: Optional[str] = Field(None, description="SHA-256 of the member content")
+    size: Optional[int] = Field(None, description="Member size in bytes")
+    stats: Optional[TemplateStats] = Field(None, description="Template statistics (templates only)")
+    error: Optional[str] = Field(None, description="Why the member was skipped or failed")
+
+
+class BulkUploadResponse(BaseModel):
+    """Manifest of a bulk upload"""
+    upload_id: str = Field(..., description="Send it again with the same archive to resume after a failure")
+    complete: bool = Field(..., description="False when the archive could not be read to the end")
+    error: Optional[str] = Field(None, description="Why the archive could not be read to the end")
+    items: List[BulkUploadItem] = Field(..., description="Members in archive order (across attempts)")
 
 
 class PresentationCreateRequest(BaseModel):
@@ -106,6 +283,18 @@ class ContentInsertResponse(BaseModel):
     message: str = Field(..., description="Success or error message")
 
 
+class ProfileInfo(BaseModel):
+    """Basic information about a stored request profile"""
+    profile_id: str
+    created_at: str = Field(..., description="Creation time (UTC, ISO 8601)")
+    size_bytes: int
+
+
+class ProfileListResponse(BaseModel):
+    """Response containing a list of stored profiles"""
+    profiles: List[ProfileInfo]
+
+
 class ErrorResponse(BaseModel):
     """Error response model"""
     error: str = Field(..., description="Error type")
@@ -0,0 +1,201 @@
+"""
+Memory-aware admission control for heavy presentation operations
+"""
+import asyncio
+import math
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services.deadline import idle_worker_bytes, run_with_deadline
+from app.services.metrics import metrics
+from app.services.profile_service import profile_section
+from app.services.tracing import span
+
+
+# Fixed cost of any admitted operation (interpreter objects, lxml overhead)
+BASE_COST = 16 * 1024 * 1024
+
+# Memory per byte of package and per byte of media, by operation. python-pptx
+# inflates every part and lxml trees take several times the XML size; images
+# are read into memory and written back once, videos (inserted or already in
+# a presentation) are streamed from their file (see media_parts.py).
+COST_FACTORS: Dict[str, Tuple[float, float]] = {
+    "create": (4, 0),
+    "scan": (1, 0),
+    "text": (5, 0),
+    "table": (5, 0),
+    "repeat": (6, 0),
+    "chart": (5, 0),
+    "compact": (5, 0),
+    "image": (5, 2),
+    "video": (5, 0),
+    "materialize": (6, 2),
+    "preview": (6, 0),
+    # Parts are copied one at a time (media in chunks), never the whole deck
+    "merge": (1, 0),
+}
+
+
+def estimate_cost(operation: str, package_bytes: int, media_bytes: int = 0) -> int:
+    """
+    Estimated peak memory of an operation in bytes
+
+    Args:
+        operation: Operation name (a key of COST_FACTORS)
+        package_bytes: Size of the .pptx the operation loads
+        media_bytes: Size of the media it inserts
+
+    Returns:
+        Cost in bytes
+    """
+    package_factor, media_factor = COST_FACTORS[operation]
+    return int(BASE_COST + package_bytes * package_factor + media_bytes * media_factor)
+
+
+class AdmissionController:
+    """
+    Admits work while the estimated memory of everything in flight in this
+    process stays under a budget. Requests that do not fit wait (FIFO) up to
+    a bounded time and are then rejected with 429 and Retry-After.
+
+    A request costing more than the whole budget is admitted alone.
+    Memory held outside the operations (`reserved`, e.g. idle worker
+    processes) is taken from the budget.
+    """
+
+    def __init__(self, budget_bytes: int, queue_timeout: float, retry_after: int,
+                 reserved: Callable[[], int] = lambda: 0):
+        """
+        Initialize admission controller
+
+        Args:
+            budget_bytes: Memory budget for in-flight operations (0 disables admission control)
+            queue_timeout: Seconds a request may wait for room before being rejected
+            retry_after: Seconds suggested to rejected clients
+            reserved: Returns the bytes of the budget currently held by something else
+        """
+        self.budget_bytes = budget_bytes
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.reserved = reserved
+        self.in_flight_bytes = 0
+        self.in_flight = 0
+        self._waiters: List[Tuple[int, asyncio.Future]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_bytes > 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _fits(self, cost: int) -> bool:
+        if self.in_flight == 0:
+            return True
+        return self.in_flight_bytes + self.reserved() + cost <= self.budget_bytes
+
+    def _wake(self):
+        """Admit waiters in arrival order while they fit"""
+        while self._waiters and self._fits(self._waiters[0][0]):
+            cost, waiter = self._waiters.pop(0)
+            if not waiter.done():
+                self.in_flight_bytes += cost
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def admit(self, cost: int):
+        """
+        Hold `cost` bytes of the budget for the enclosed block
+
+        Raises:
+            HTTPException: 429 if no room was made within the queue timeout
+        """
+        if not self.enabled:
+            yield
+            return
+
+        cost = min(cost, self.budget_bytes)
+        if not self._waiters and self._fits(cost):
+            self.in_flight_bytes += cost
+            self.in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            entry = (cost, waiter)
+            self._waiters.append(entry)
+            with span("admission.wait", **{"admission.cost_bytes": cost, "admission.queued": len(self._waiters)}):
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+                except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                    if waiter.done() and not waiter.cancelled():
+                        # Admitted just as the wait ended: give the room back
+                        self._release(cost)
+                    else:
+                        waiter.cancel()
+                        self._waiters.remove(entry)
+                        self._wake()
+                    if isinstance(e, asyncio.CancelledError):
+                        raise
+                    metrics.inc("pptx_admission_rejected_total")
+                    raise HTTPException(
+                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                        detail="Server busy: not enough memory budget for this operation, retry later",
+                        headers={"Retry-After": str(self.retry_after)}
+                    )
+
+        metrics.inc("pptx_admission_admitted_total")
+        try:
+            yield
+        finally:
+            self._release(cost)
+
+    def _release(self, cost: int):
+        self.in_flight_bytes -= cost
+        self.in_flight -= 1
+        self._wake()
+
+
+admission = AdmissionController(
+    budget_bytes=settings.ADMISSION_MEMORY_BUDGET_BYTES,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+    retry_after=max(1, math.ceil(settings.ADMISSION_RETRY_AFTER)),
+    reserved=idle_worker_bytes,
+)
+
+metrics.counter("pptx_admission_admitted_total", "Operations admitted by admission control")
+metrics.counter("pptx_admission_rejected_total", "Operations rejected with 429 after waiting for memory budget")
+metrics.gauge("pptx_admission_in_flight_bytes", "Estimated memory of the operations in flight", lambda: admission.in_flight_bytes)
+metrics.gauge("pptx_admission_in_flight", "Operations in flight", lambda: admission.in_flight)
+metrics.gauge("pptx_admission_queued", "Operations waiting for memory budget", lambda: admission.queued)
+metrics.gauge("pptx_admission_budget_bytes", "Memory budget for operations in flight", lambda: admission.budget_bytes)
+metrics.gauge("pptx_admission_reserved_bytes", "Resident memory of idle operation workers, taken from the budget", idle_worker_bytes)
+
+
+def _profiled(operation: str, func, *args, **kwargs):
+    with profile_section():
+        return run_with_deadline(operation, func, *args, **kwargs)
+
+
+async def run_admitted(operation: str, cost: Optional[int], func, *args, **kwargs):
+    """
+    Run a blocking service call in the threadpool once admitted
+
+    Keeps the event loop free while presentations are loaded and saved, so
+    queued requests can wait (and be rejected) without blocking others.
+    The call runs under the operation's deadline (see deadline.py).
+
+    Args:
+        operation: Operation name (deadline key)
+        cost: Estimated memory in bytes (None or 0 runs without admission, e.g. log appends)
+        func: Service method to call
+    """
+    with span("pptx.operation", **{"pptx.operation": operation, "admission.cost_bytes": cost or 0}):
+        if not cost:
+            return await run_in_threadpool(_profiled, operation, func, *args, **kwargs)
+        async with admission.admit(cost):
+            return await run_in_threadpool(_profiled, operation, func, *args, **kwargs)
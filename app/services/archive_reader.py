@@ -0,0 +1,245 @@
+"""
+Incremental reading of zip and tar archives from a forward-only stream
+"""
+import struct
+import tarfile
+import zlib
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+
+_CHUNK = 256 * 1024
+
+_LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+_LOCAL_SIGNATURE = b"PK\x03\x04"
+_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+# Central directory and end of central directory records: no more members
+_END_SIGNATURES = (b"PK\x01\x02", b"PK\x05\x06", b"PK\x06\x06")
+
+_ZIP64_EXTRA = 0x0001
+_STORED, _DEFLATED = 0, 8
+
+
+class ArchiveError(Exception):
+    """The stream is not a readable zip/tar archive (or ends prematurely)"""
+
+
+class _Stream:
+    """Forward-only reader with push-back over a file object that may return short reads"""
+
+    def __init__(self, raw: BinaryIO):
+        self._raw = raw
+        self._buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            data, self._buffer = self._buffer + self._raw.read(), b""
+            return data
+        while len(self._buffer) < size:
+            chunk = self._raw.read(max(size - len(self._buffer), _CHUNK))
+            if not chunk:
+                break
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def read_exact(self, size: int) -> bytes:
+        data = self.read(size)
+        if len(data) != size:
+            raise ArchiveError("Archive ends unexpectedly")
+        return data
+
+    def peek(self, size: int) -> bytes:
+        data = self.read(size)
+        self.unread(data)
+        return data
+
+    def unread(self, data: bytes):
+        self._buffer = data + self._buffer
+
+
+class _ZipMemberReader:
+    """Decompressed content of one zip member, read straight from the stream"""
+
+    def __init__(self, stream: _Stream, name: str, method: int, compressed: Optional[int],
+                 size: Optional[int], crc: int, has_descriptor: bool, zip64: bool, max_bytes: int):
+        self._stream = stream
+        self._name = name
+        self._remaining = compressed  # None: deflate stream ended by the data descriptor
+        self._expected_size = size
+        self._crc = crc
+        self._has_descriptor = has_descriptor
+        self._zip64 = zip64
+        self._max_bytes = max_bytes
+        self._inflater = zlib.decompressobj(-zlib.MAX_WBITS) if method == _DEFLATED else None
+        self._pending = b""
+        self._actual_crc = 0
+        self._size = 0
+        self._done = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._done and (size < 0 or len(self._pending) < size):
+            self._fill()
+        if size < 0:
+            data, self._pending = self._pending, b""
+        else:
+            data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+    def _fill(self):
+        inflater = self._inflater
+        if inflater is not None and inflater.unconsumed_tail:
+            compressed = b""
+        elif self._remaining is None:
+            compressed = self._stream.read(_CHUNK)
+            if not compressed:
+                raise ArchiveError(f"Archive ends inside member '{self._name}'")
+        elif self._remaining:
+            compressed = self._stream.read_exact(min(self._remaining, _CHUNK))
+            self._remaining -= len(compressed)
+        elif inflater is not None:
+            raise ArchiveError(f"Corrupt member '{self._name}': truncated deflate stream")
+        else:
+            compressed = b""
+
+        if inflater is None:
+            self._add(compressed)
+            if self._remaining == 0:
+                self._finish()
+            return
+        try:
+            # Bounded output, so a zip bomb never inflates more than a chunk past the limit
+            self._add(inflater.decompress(inflater.unconsumed_tail + compressed, _CHUNK))
+        except zlib.error as e:
+            raise ArchiveError(f"Corrupt member '{self._name}': {str(e)}")
+        if inflater.eof:
+            if inflater.unused_data:
+                if self._remaining is not None:
+                    raise ArchiveError(f"Corrupt member '{self._name}': data after the deflate stream")
+                self._stream.unread(inflater.unused_data)
+            self._finish()
+
+    def _add(self, data: bytes):
+        self._size += len(data)
+        if self._size > self._max_bytes:
+            raise ArchiveError(f"Member '{self._name}' is larger than {self._max_bytes} bytes")
+        self._actual_crc = zlib.crc32(data, self._actual_crc)
+        self._pending += data
+
+    def _finish(self):
+        if self._remaining:
+            raise ArchiveError(f"Corrupt member '{self._name}': data after the deflate stream")
+        crc, size = self._crc, self._expected_size
+        if self._has_descriptor:
+            if self._stream.peek(4) == _DESCRIPTOR_SIGNATURE:
+                self._stream.read_exact(4)
+            if self._zip64:
+                crc, _, size = struct.unpack("<IQQ", self._stream.read_exact(20))
+            else:
+                crc, _, size = struct.unpack("<III", self._stream.read_exact(12))
+        if self._actual_crc != crc or (size is not None and self._size != size):
+            raise ArchiveError(f"Corrupt member '{self._name}': checksum mismatch")
+        self._done = True
+
+    def skip(self):
+        """Skip the rest of the member without inflating it, when its compressed size is known"""
+        if self._remaining is None or self._has_descriptor:
+            while not self._done:
+                self._fill()
+                self._pending = b""
+            return
+        while self._remaining:
+            self._remaining -= len(self._stream.read_exact(min(self._remaining, _CHUNK)))
+        self._done = True
+        self._pending = b""
+
+
+def _zip64_sizes(extra: bytes, compressed: int, size: int) -> Tuple[int, int, bool]:
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, length = struct.unpack_from("<HH", extra, offset)
+        if header_id == _ZIP64_EXTRA:
+            fields = extra[offset + 4:offset + 4 + length]
+            # The local header's zip64 field carries both sizes, uncompressed first
+            if len(fields) >= 16:
+                size, compressed = struct.unpack_from("<QQ", fields)
+            return compressed, size, True
+        offset += 4 + length
+    return compressed, size, False
+
+
+def _iter_zip(stream: _Stream, max_member_bytes: int) -> Iterator[Tuple[str, Optional[int], object]]:
+    while True:
+        signature = stream.peek(4)
+        if signature in _END_SIGNATURES or not signature:
+            return
+        if signature != _LOCAL_SIGNATURE:
+            raise ArchiveError("Corrupt zip archive: unexpected record")
+
+        (_, _, flags, method, _, _, crc, compressed, size,
+         name_length, extra_length) = _LOCAL_HEADER.unpack(stream.read_exact(_LOCAL_HEADER.size))
+        name = stream.read_exact(name_length).decode("utf-8" if flags & 0x800 else "cp437", errors="replace")
+        compressed, size, zip64 = _zip64_sizes(stream.read_exact(extra_length), compressed, size)
+
+        has_descriptor = bool(flags & 0x8)
+        if flags & 0x1:
+            raise ArchiveError(f"Encrypted member '{name}' is not supported")
+        if method not in (_STORED, _DEFLATED):
+            raise ArchiveError(f"Member '{name}' uses an unsupported compression method ({method})")
+        if has_descriptor and method == _STORED:
+            # Its end can only be found through the central directory, which comes last
+            raise ArchiveError(f"Member '{name}' is stored without sizes; recreate the archive with compression")
+
+        reader = _ZipMemberReader(
+            stream, name, method,
+            compressed=None if has_descriptor else compressed,
+            size=None if has_descriptor else size,
+            crc=crc, has_descriptor=has_descriptor, zip64=zip64, max_bytes=max_member_bytes,
+        )
+        yield name, None if has_descriptor else size, reader
+        reader.skip()
+
+
+def _iter_tar(stream: _Stream, max_member_bytes: int) -> Iterator[Tuple[str, Optional[int], object]]:
+    try:
+        archive = tarfile.open(fileobj=stream, mode="r|*")
+    except tarfile.TarError as e:
+        raise ArchiveError(f"Not a zip or tar archive ({str(e)})")
+    with archive:
+        while True:
+            try:
+                info = archive.next()
+            except tarfile.TarError as e:
+                raise ArchiveError(f"Corrupt tar archive: {str(e)}")
+            if info is None:
+                return
+            if info.isfile():
+                # tarfile skips whatever is not read before the next header
+                yield info.name, info.size, archive.extractfile(info)
+
+
+def iter_archive(raw: BinaryIO, max_member_bytes: int) -> Iterator[Tuple[str, Optional[int], object]]:
+    """
+    Members of a zip or tar (optionally gzip/bz2/xz compressed) archive, in
+    stream order, without buffering the archive.
+
+    Zip members are read from their local headers, so the central directory
+    at the end is never needed. Each member must be read (or abandoned)
+    before advancing. Reading a zip member past `max_member_bytes` (only
+    possible when its size is not known in advance) or with a CRC mismatch
+    raises ArchiveError.
+
+    Args:
+        raw: Forward-only binary stream (e.g. a request body)
+        max_member_bytes: Largest decompressed member accepted
+
+    Yields:
+        (member name, size if known in advance, file object with its content)
+
+    Raises:
+        ArchiveError: If the stream is not a supported archive or is corrupt
+    """
+    stream = _Stream(raw)
+    if stream.peek(4) in (_LOCAL_SIGNATURE,) + _END_SIGNATURES:
+        yield from _iter_zip(stream, max_member_bytes)
+    else:
+        yield from _iter_tar(stream, max_member_bytes)
@@ -0,0 +1,172 @@
+"""
+Bulk registration of templates and images from a streamed zip or tar archive
+"""
+import re
+import tempfile
+from pathlib import PurePosixPath
+from typing import BinaryIO, Optional
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.models.schemas import BulkUploadItem, BulkUploadResponse
+from app.services.archive_reader import ArchiveError, iter_archive
+from app.services.file_service import FileService, copy_hashed
+from app.services.tracing import span
+
+
+_UPLOAD_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".webp"}
+
+# Members up to this size are held in memory, larger ones in a temporary file
+_SPOOL_SIZE = 8 * 1024 * 1024
+
+
+def _member_kind(name: str) -> Optional[str]:
+    """template, image or other; None for directories and OS metadata (__MACOSX, dotfiles)"""
+    path = PurePosixPath(name)
+    if name.endswith("/") or path.parts[:1] == ("__MACOSX",) or path.name.startswith("."):
+        return None
+    suffix = path.suffix.lower()
+    if suffix == ".pptx":
+        return "template"
+    if suffix in _IMAGE_EXTENSIONS:
+        return "image"
+    return "other"
+
+
+class BulkUploadService:
+    """Service for registering many templates and images from one archive"""
+
+    def __init__(self, file_service: FileService):
+        """
+        Initialize bulk upload service
+
+        Args:
+            file_service: File service instance
+        """
+        self.file_service = file_service
+
+    def get_manifest(self, upload_id: str) -> BulkUploadResponse:
+        """
+        Get the manifest of a bulk upload
+
+        Raises:
+            HTTPException: If there is no upload with that ID
+        """
+        manifest = self.file_service.get_bulk_manifest(upload_id) if _UPLOAD_ID.match(upload_id) else None
+        if manifest is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Bulk upload with ID '{upload_id}' not found"
+            )
+        return BulkUploadResponse.model_validate_json(manifest)
+
+    def upload(self, stream: BinaryIO, upload_id: Optional[str] = None) -> BulkUploadResponse:
+        """
+        Register every template (.pptx) and image of a zip or tar archive
+
+        Members are extracted one at a time as the stream arrives, hashed and
+        validated, and registered through FileService (images in the media
+        library). The manifest is stored
+        after each member, so when the upload breaks off it can be resumed by
+        sending the archive again with the same upload_id: members already
+        registered with the same content are not stored again.
+
+        Args:
+            stream: Forward-only binary stream with the archive
+            upload_id: ID of an earlier, incomplete upload to resume
+
+        Returns:
+            Manifest of the upload
+
+        Raises:
+            HTTPException: If upload_id is invalid or the stream is not an archive
+        """
+        if upload_id is None:
+            manifest = BulkUploadResponse(
+                upload_id=self.file_service.generate_id(), complete=False, items=[]
+            )
+        elif not _UPLOAD_ID.match(upload_id):
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid upload_id: use letters, digits, '-' and '_' (up to 64)"
+            )
+        else:
+            stored = self.file_service.get_bulk_manifest(upload_id)
+            manifest = (
+                BulkUploadResponse.model_validate_json(stored) if stored
+                else BulkUploadResponse(upload_id=upload_id, complete=False, items=[])
+            )
+        manifest.complete = False
+        manifest.error = None
+
+        positions = {item.name: index for index, item in enumerate(manifest.items)}
+        members = 0
+        try:
+            for name, size, content in iter_archive(stream, settings.BULK_MAX_MEMBER_BYTES):
+                kind = _member_kind(name)
+                if kind is None:
+                    continue
+                members += 1
+                if members > settings.BULK_MAX_MEMBERS:
+                    raise ArchiveError(f"Archive has more than {settings.BULK_MAX_MEMBERS} members")
+
+                previous = manifest.items[positions[name]] if name in positions else None
+                with span("bulk.member", **{"bulk.member": name, "bulk.kind": kind}) as member_span:
+                    item = self._register(name, kind, size, content, previous)
+                    member_span.set_attributes({"bulk.status": item.status, "file.bytes": item.size})
+
+                if previous is None:
+                    positions[name] = len(manifest.items)
+                    manifest.items.append(item)
+                else:
+                    manifest.items[positions[name]] = item
+                if item.status != "existing":
+                    self._save(manifest)
+            manifest.complete = True
+        except ArchiveError as e:
+            if members == 0 and not manifest.items:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid archive: {str(e)}"
+                )
+            manifest.error = str(e)
+
+        self._save(manifest)
+        return manifest
+
+    def _register(self, name: str, kind: str, size: Optional[int], content: BinaryIO,
+                  previous: Optional[BulkUploadItem]) -> BulkUploadItem:
+        if kind == "other":
+            return BulkUploadItem(name=name, kind=kind, status="skipped", size=size,
+                                  error="Not a template (.pptx) or image")
+        if size is not None and size > settings.BULK_MAX_MEMBER_BYTES:
+            return BulkUploadItem(name=name, kind=kind, status="failed", size=size,
+                                  error=f"Larger than {settings.BULK_MAX_MEMBER_BYTES} bytes")
+
+        with tempfile.SpooledTemporaryFile(max_size=_SPOOL_SIZE) as spool:
+            sha256, size = copy_hashed(content, spool)
+            if (previous is not None and previous.id and previous.kind == kind
+                    and previous.sha256 == sha256):
+                return previous.model_copy(update={"status": "existing"})
+
+            spool.seek(0)
+            try:
+                if kind == "template":
+                    item_id, filename, stats = self.file_service.add_template(spool)
+                    created = True
+                else:
+                    # Images go to the media library, so their ids can be used as media_id
+                    media, created = self.file_service.add_media(spool, PurePosixPath(name).name)
+                    item_id, filename, stats = media.media_id, media.filename, None
+            except HTTPException as e:
+                return BulkUploadItem(name=name, kind=kind, status="failed", sha256=sha256, size=size,
+                                      error=str(e.detail))
+
+        return BulkUploadItem(name=name, kind=kind, status="created" if created else "existing", id=item_id,
+                              filename=filename, sha256=sha256, size=size, stats=stats)
+
+    def _save(self, manifest: BulkUploadResponse):
+        self.file_service.save_bulk_manifest(manifest.upload_id, manifest.model_dump_json().encode("utf-8"))
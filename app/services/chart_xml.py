@@ -0,0 +1,247 @@
+"""
+Streaming builders for chart XML caches and embedded chart workbooks
+"""
+import io
+import math
+import zipfile
+from typing import Iterable, Iterator, List, Sequence
+from xml.sax.saxutils import escape as xml_escape
+
+import numpy as np
+from lxml import etree
+from pptx.oxml import element_class_lookup
+
+from app.services.package_writer import zip_info
+
+
+C_NS = "http://schemas.openxmlformats.org/drawingml/2006/chart"
+
+SHEET_NAME = "Sheet1"
+
+# Rows written to the worksheet stream (and points fed to the cache parser) per chunk
+_ROW_CHUNK = 4096
+
+# The workbook is only read back when the chart is edited in PowerPoint;
+# fast deflate keeps large series cheap to write
+_COMPRESS_LEVEL = 1
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    f'<sheets><sheet name="{SHEET_NAME}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Built-in spreadsheet number formats; anything else gets a custom numFmt
+_BUILTIN_NUM_FMTS = {
+    "General": 0, "0": 1, "0.00": 2, "#,##0": 3, "#,##0.00": 4,
+    "0%": 9, "0.00%": 10, "0.00E+00": 11,
+}
+_CUSTOM_NUM_FMT_ID = 164
+
+# Style index of the series value cells in the cellXfs written by _styles()
+_VALUE_STYLE = 1
+
+
+def column_letter(index: int) -> str:
+    """Zero-based column index to Excel column letters (0 -> A, 26 -> AA)"""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def as_numbers(values: Sequence) -> np.ndarray:
+    """Columnar values as a float array; None becomes NaN (a gap in the chart)"""
+    return np.asarray(values, dtype=float)
+
+
+def _format_numbers(array: np.ndarray) -> List[str]:
+    """Shortest round-trip text for each number ('' for NaN and infinities)"""
+    return [repr(v) if math.isfinite(v) else "" for v in array.tolist()]
+
+
+def categories_are_numeric(categories: Sequence) -> bool:
+    return all(isinstance(c, (int, float)) and not isinstance(c, bool) for c in categories)
+
+
+def _points(texts: Iterable[str], start: int = 0) -> Iterator[str]:
+    for idx, text in enumerate(texts, start):
+        if text != "":
+            yield f'<c:pt idx="{idx}"><c:v>{text}</c:v></c:pt>'
+
+
+def _parse_streamed(head: str, chunks: Iterable[str], tail: str):
+    """
+    Parse an element fed in pieces, so the serialized cache is never held as
+    one string. Elements get python-pptx's custom classes, as with parse_xml.
+    """
+    parser = etree.XMLParser(remove_blank_text=True, resolve_entities=False)
+    parser.set_element_class_lookup(element_class_lookup)
+    parser.feed(head)
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.feed(tail)
+    return parser.close()
+
+
+def _number_points(values: np.ndarray) -> Iterator[str]:
+    for start in range(0, len(values), _ROW_CHUNK):
+        yield "".join(_points(_format_numbers(values[start:start + _ROW_CHUNK]), start))
+
+
+def series_name_xml(name: str, column: int) -> str:
+    ref = f"{SHEET_NAME}!${column_letter(column)}$1"
+    return (
+        f'<c:tx xmlns:c="{C_NS}"><c:strRef><c:f>{ref}</c:f><c:strCache><c:ptCount val="1"/>'
+        f'<c:pt idx="0"><c:v>{xml_escape(name)}</c:v></c:pt></c:strCache></c:strRef></c:tx>'
+    )
+
+
+def categories_element(tag: str, categories: Sequence):
+    """c:cat / c:xVal element with a string or number cache for column A"""
+    count = len(categories)
+    ref = f"{SHEET_NAME}!$A$2:$A${count + 1}"
+    if categories_are_numeric(categories):
+        head = (f'<c:{tag} xmlns:c="{C_NS}"><c:numRef><c:f>{ref}</c:f><c:numCache>'
+                f'<c:formatCode>General</c:formatCode><c:ptCount val="{count}"/>')
+        chunks = _number_points(np.asarray(categories, dtype=float))
+        tail = f'</c:numCache></c:numRef></c:{tag}>'
+    else:
+        head = f'<c:{tag} xmlns:c="{C_NS}"><c:strRef><c:f>{ref}</c:f><c:strCache><c:ptCount val="{count}"/>'
+        chunks = (
+            "".join(_points((xml_escape(str(c)) for c in categories[start:start + _ROW_CHUNK]), start))
+            for start in range(0, count, _ROW_CHUNK)
+        )
+        tail = f'</c:strCache></c:strRef></c:{tag}>'
+    return _parse_streamed(head, chunks, tail)
+
+
+def values_element(tag: str, values: np.ndarray, column: int, number_format: str = "General"):
+    """c:val / c:yVal element with a number cache for the given worksheet column"""
+    count = len(values)
+    col = column_letter(column)
+    ref = f"{SHEET_NAME}!${col}$2:${col}${count + 1}"
+    head = (f'<c:{tag} xmlns:c="{C_NS}"><c:numRef><c:f>{ref}</c:f><c:numCache>'
+            f'<c:formatCode>{xml_escape(number_format)}</c:formatCode><c:ptCount val="{count}"/>')
+    return _parse_streamed(head, _number_points(values), f'</c:numCache></c:numRef></c:{tag}>')
+
+
+def _styles(number_format: str) -> str:
+    """styles.xml whose second cell format applies `number_format` to the series values"""
+    num_fmt_id = _BUILTIN_NUM_FMTS.get(number_format)
+    num_fmts = ""
+    if num_fmt_id is None:
+        num_fmt_id = _CUSTOM_NUM_FMT_ID
+        num_fmts = (f'<numFmts count="1"><numFmt numFmtId="{num_fmt_id}" '
+                    f'formatCode="{xml_escape(number_format, {chr(34): "&quot;"})}"/></numFmts>')
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        f'{num_fmts}'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        f'<xf numFmtId="{num_fmt_id}" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    )
+
+
+def _cell(ref: str, text: str, numeric: bool, style: int = 0) -> str:
+    if text == "":
+        return ""
+    if numeric:
+        if style:
+            return f'<c r="{ref}" s="{style}"><v>{text}</v></c>'
+        return f'<c r="{ref}"><v>{text}</v></c>'
+    return f'<c r="{ref}" t="inlineStr"><is><t>{xml_escape(text)}</t></is></c>'
+
+
+def write_xlsx(categories: Sequence, series_names: List[str], columns: List[np.ndarray],
+               number_format: str = "General") -> bytes:
+    """
+    Write a minimal single-sheet workbook with categories in column A and one
+    series per following column, whose cells use `number_format`.
+
+    The worksheet XML is streamed into the deflate stream in row chunks, so
+    the uncompressed sheet is never held in memory; only the compressed
+    workbook is.
+    """
+    buffer = io.BytesIO()
+    numeric_categories = categories_are_numeric(categories)
+    letters = [column_letter(i + 1) for i in range(len(columns))]
+
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=_COMPRESS_LEVEL) as zf:
+        # Fixed member timestamps keep decks with bound charts reproducible
+        zf.writestr(zip_info("[Content_Types].xml"), _CONTENT_TYPES)
+        zf.writestr(zip_info("_rels/.rels"), _ROOT_RELS)
+        zf.writestr(zip_info("xl/workbook.xml"), _WORKBOOK)
+        zf.writestr(zip_info("xl/_rels/workbook.xml.rels"), _WORKBOOK_RELS)
+        zf.writestr(zip_info("xl/styles.xml"), _styles(number_format))
+
+        with zf.open(zip_info("xl/worksheets/sheet1.xml", compresslevel=_COMPRESS_LEVEL), "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            header = "".join(_cell(f"{letter}1", name, False) for letter, name in zip(letters, series_names))
+            sheet.write(f'<row r="1">{header}</row>'.encode("utf-8"))
+
+            for start in range(0, len(categories), _ROW_CHUNK):
+                end = min(start + _ROW_CHUNK, len(categories))
+                chunk = categories[start:end]
+                category_texts = (_format_numbers(np.asarray(chunk, dtype=float)) if numeric_categories
+                                  else [str(c) for c in chunk])
+                column_texts = [_format_numbers(values[start:end]) for values in columns]
+                rows = []
+                for offset, category in enumerate(category_texts):
+                    r = start + offset + 2
+                    cells = [_cell(f"A{r}", category, numeric_categories)]
+                    cells.extend(_cell(f"{letter}{r}", texts[offset], True, _VALUE_STYLE)
+                                 for letter, texts in zip(letters, column_texts))
+                    rows.append(f'<row r="{r}">{"".join(cells)}</row>')
+                sheet.write("".join(rows).encode("utf-8"))
+
+            sheet.write(b"</sheetData></worksheet>")
+
+    return buffer.getvalue()
@@ -0,0 +1,255 @@
+"""
+Per-operation deadlines enforced by running the work in killable worker processes
+"""
+import math
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.services.metrics import metrics
+from app.services.profile_service import current_session
+from app.services import tracing
+
+
+metrics.counter("pptx_operation_timeouts_total", "Operations killed for exceeding their deadline")
+metrics.counter("pptx_worker_restarts_total", "Operation worker processes replaced after a timeout or crash")
+metrics.counter("pptx_worker_wait_rejected_total", "Operations rejected with 429 after waiting their whole deadline for a worker")
+
+
+# Seconds a new worker process may take to import the services
+_STARTUP_TIMEOUT = 60
+
+
+def _worker_main(conn):
+    """Worker process loop: receive (func, args, kwargs), send back the outcome"""
+    # Import the heavy modules once, before the first task arrives
+    import app.services.pptx_service  # noqa: F401
+    import app.services.preview_service  # noqa: F401
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            func, args, kwargs, traceparent = conn.recv()
+        except EOFError:
+            return
+        try:
+            # Spans of the task continue the request's trace
+            with tracing.span("worker.task", traceparent=traceparent):
+                outcome = ("ok", func(*args, **kwargs))
+        except HTTPException as e:
+            outcome = ("http", (e.status_code, e.detail, e.headers))
+        except Exception as e:
+            try:
+                # Exceptions must survive the trip back to the server process
+                pickle.loads(pickle.dumps(e))
+                outcome = ("error", e)
+            except Exception:
+                outcome = ("error", Exception(str(e)))
+        tracing.flush()
+        conn.send(outcome)
+
+
+def _resident_bytes(pid: int) -> int:
+    """Resident memory of a process (0 where /proc is not available)"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        # Startup (imports) does not count against the first task's deadline
+        if not self.conn.poll(_STARTUP_TIMEOUT) or self.conn.recv()[0] != "ready":
+            self.kill()
+            raise Exception("Worker process failed to start")
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """
+    Pool of worker processes (spawned, not forked, so no locks or clients
+    are inherited from the server's threads) that run one operation at a
+    time. A worker that misses its deadline is killed together with the
+    work it was doing and replaced on the next call.
+    """
+
+    def __init__(self, size: int):
+        """
+        Initialize worker pool
+
+        Args:
+            size: Maximum number of worker processes
+        """
+        self._context = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: List[_Worker] = []
+        self._lock = threading.Lock()
+
+    def idle_resident_bytes(self) -> int:
+        """Resident memory of the idle workers (busy ones are covered by their operation's cost)"""
+        with self._lock:
+            pids = [worker.process.pid for worker in self._idle]
+        return sum(_resident_bytes(pid) for pid in pids)
+
+    def _take(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.process.is_alive():
+                    return worker
+                worker.conn.close()
+        return _Worker(self._context)
+
+    def run(self, operation: str, timeout: float, func, *args, **kwargs):
+        """
+        Call `func(*args, **kwargs)` in a worker, killing it after `timeout` seconds
+
+        The deadline starts when the call is made: time spent waiting for a
+        free worker is taken from it.
+
+        Blocking: call from a thread, not from the event loop.
+
+        Raises:
+            HTTPException: 429 when no worker freed up before the deadline
+                (the operation never started), 504 when the deadline is
+                exceeded while running, or the one raised by `func`
+        """
+        deadline = time.monotonic() + timeout
+        with tracing.span("worker.wait", **{"pptx.operation": operation}):
+            acquired = self._slots.acquire(timeout=timeout)
+        if not acquired:
+            metrics.inc("pptx_worker_wait_rejected_total")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Server busy: no worker became free within the {timeout:g}s deadline of '{operation}', retry later",
+                headers={"Retry-After": str(max(1, math.ceil(settings.ADMISSION_RETRY_AFTER)))}
+            )
+
+        try:
+            return self._run(operation, timeout, deadline, func, *args, **kwargs)
+        finally:
+            self._slots.release()
+
+    def _run(self, operation: str, timeout: float, deadline: float, func, *args, **kwargs):
+        with tracing.span("worker.run", **{"pptx.operation": operation}) as run_span:
+            worker = self._take()
+            remaining = max(0.0, deadline - time.monotonic())
+            run_span.set_attributes({"worker.pid": worker.process.pid, "worker.deadline_s": remaining})
+            try:
+                worker.conn.send((func, args, kwargs, tracing.current_traceparent()))
+                finished = worker.conn.poll(remaining)
+                if finished:
+                    kind, value = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                worker.kill()
+                metrics.inc("pptx_worker_restarts_total")
+                raise Exception(f"Worker process for '{operation}' died: {str(e) or type(e).__name__}")
+
+            if not finished:
+                pid = worker.process.pid
+                worker.kill()
+                _remove_partial_writes(pid)
+                metrics.inc("pptx_operation_timeouts_total")
+                metrics.inc("pptx_worker_restarts_total")
+                raise HTTPException(
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                    detail=f"Operation '{operation}' exceeded its {timeout:g}s deadline and was cancelled"
+                )
+
+            with self._lock:
+                self._idle.append(worker)
+
+        if kind == "http":
+            status_code, detail, headers = value
+            raise HTTPException(status_code=status_code, detail=detail, headers=headers)
+        if kind == "error":
+            raise value
+        return value
+
+
+def _remove_partial_writes(pid: int):
+    """
+    Delete the temporary files a killed worker was writing.
+
+    Outputs are always written to "<name>.<pid>.<...>.tmp" and renamed into
+    place, so the files the worker was replacing are intact.
+    """
+    from app.services.file_service import FileService
+    from app.services.template_cache import get_template_cache
+
+    file_service = FileService()
+    template_cache = get_template_cache(file_service)
+    folders = [
+        file_service.outputs_dir,
+        file_service.outputs_dir / "cache",
+        file_service.outputs_dir / "previews",
+        *template_cache.shm_dir.glob("*"),
+    ]
+    for folder in folders:
+        for path in Path(folder).glob(f"*.{pid}.*"):
+            if path.name.endswith(".tmp"):
+                path.unlink(missing_ok=True)
+
+
+_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def pool_size() -> int:
+    """
+    Worker processes per server process (OPERATION_WORKERS, at least 1).
+
+    Each one imports python-pptx, lxml, OpenCV and numpy, and every API
+    worker has its own pool: the host runs API workers x OPERATION_WORKERS
+    of them, so the default stays small rather than following the CPU count.
+    """
+    return max(1, settings.OPERATION_WORKERS)
+
+
+def _get_pool() -> WorkerPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(pool_size())
+        return _pool
+
+
+def idle_worker_bytes() -> int:
+    """Resident memory of this process's idle workers (0 before the pool starts)"""
+    pool = _pool
+    return pool.idle_resident_bytes() if pool is not None else 0
+
+
+def run_with_deadline(operation: str, func, *args, **kwargs):
+    """
+    Run a service call under the deadline configured for `operation`
+
+    Operations without a deadline (OPERATION_DEADLINES) and profiled
+    requests, whose work must stay visible to the profiler, run in the
+    calling thread.
+
+    Args:
+        operation: Operation name (key of OPERATION_DEADLINES)
+        func: Picklable callable, e.g. a bound method of a service
+    """
+    timeout = settings.OPERATION_DEADLINES.get(operation, 0)
+    if timeout <= 0 or current_session.get() is not None:
+        return func(*args, **kwargs)
+    return _get_pool().run(operation, timeout, func, *args, **kwargs)
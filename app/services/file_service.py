@@ -1,12 +1,50 @@
 """
 File service for handling template, image, and presentation files
 """
+import fcntl
+import hashlib
+import io
 import os
 import shutil
+import time
 import uuid
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
 from fastapi import UploadFile, HTTPException
+from PIL import Image
+from starlette.concurrency import run_in_threadpool
+
+from app.models.enums import MediaKind
+from app.models.schemas import MediaInfo, TemplateStats
+from app.services.deadline import run_with_deadline
+from app.services.storage import get_storage
+from app.services.template_cache import get_template_cache
+from app.services.template_validation import inspect_template
+from app.services.tracing import span
+
+
+# Media library: stored extension by the format Pillow detects (the filename is not trusted)
+_IMAGE_FORMATS = {"PNG": ".png", "JPEG": ".jpg", "GIF": ".gif", "BMP": ".bmp", "TIFF": ".tiff", "WEBP": ".webp"}
+_VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".wmv"}
+
+_COPY_CHUNK = 1024 * 1024
+
+
+def copy_hashed(source: BinaryIO, target: BinaryIO) -> tuple[str, int]:
+    """
+    Copy a binary stream, hashing it on the way
+    
+    Returns:
+        Tuple of (SHA-256 hex digest, bytes copied)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: source.read(_COPY_CHUNK), b""):
+        digest.update(chunk)
+        target.write(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
 
 
 class FileService:
@@ -20,34 +58,85 @@ class FileService:
             base_dir: Base directory for the application
         """
         self.base_dir = Path(base_dir)
-        self.templates_dir = self.base_dir / "uploads" / "templates"
-        self.images_dir = self.base_dir / "uploads" / "images"
-        self.videos_dir = self.base_dir / "uploads" / "videos"
-        self.outputs_dir = self.base_dir / "outputs"
+        self.storage = get_storage(self.base_dir)
+        
+        # Local working copies: the stored files themselves with local storage,
+        # a read-through cache with remote storage
+        working_dir = self.storage.working_path("")
+        self.templates_dir = working_dir / "uploads" / "templates"
+        self.images_dir = working_dir / "uploads" / "images"
+        self.videos_dir = working_dir / "uploads" / "videos"
+        self.media_dir = working_dir / "uploads" / "media"
+        self.outputs_dir = working_dir / "outputs"
+        self._working_dir = working_dir
         
         # Create directories if they don't exist
         self._create_directories()
     
+    def __reduce__(self):
+        # Rebuilt from its base directory when sent to a worker process
+        return (FileService, (str(self.base_dir),))
+    
     def _create_directories(self):
         """Create necessary directories"""
         self.templates_dir.mkdir(parents=True, exist_ok=True)
         self.images_dir.mkdir(parents=True, exist_ok=True)
         self.videos_dir.mkdir(parents=True, exist_ok=True)
+        self.media_dir.mkdir(parents=True, exist_ok=True)
         self.outputs_dir.mkdir(parents=True, exist_ok=True)
     
     def generate_id(self) -> str:
         """Generate a unique ID"""
         return str(uuid.uuid4())
     
-    async def save_template(self, file: UploadFile) -> tuple[str, str]:
+    def _key(self, path: Path) -> str:
+        """Storage key of a working path"""
+        return Path(path).relative_to(self._working_dir).as_posix()
+    
+    def _find(self, directory: Path, file_id: str, skip_suffixes: tuple = ()) -> Optional[Path]:
+        """Local copy of the stored file named {file_id}.* in `directory`, if any"""
+        for key in self.storage.list(f"{self._key(directory)}/{file_id}."):
+            if Path(key).suffix not in skip_suffixes:
+                try:
+                    return self._fetch(key)
+                except FileNotFoundError:
+                    continue
+        return None
+    
+    def _fetch(self, key: str) -> Path:
+        """Local copy of a stored key (downloaded first with remote storage)"""
+        with span("storage.fetch", **{"storage.key": key}) as fetch_span:
+            path = self.storage.local_path(key)
+            fetch_span.set_attribute("file.bytes", path.stat().st_size)
+            return path
+    
+    def _store_upload(self, file_path: Path, stream) -> Path:
+        """Store an uploaded file at its working path"""
+        with span("storage.put", **{"storage.key": self._key(file_path)}) as put_span:
+            path = self.storage.put_stream(self._key(file_path), stream)
+            put_span.set_attribute("file.bytes", path.stat().st_size)
+            return path
+    
+    def _list(self, directory: Path, suffix: str) -> list[str]:
+        """Names of the stored files directly in `directory` ending with `suffix`"""
+        folder = self._key(directory)
+        return [
+            key[len(folder) + 1:] for key in self.storage.list(f"{folder}/")
+            if "/" not in key[len(folder) + 1:] and key.endswith(suffix)
+        ]
+    
+    async def save_template(self, file: UploadFile) -> tuple[str, str, TemplateStats]:
         """
         Save an uploaded template file
         
+        The package is validated from its zip directory before it is stored,
+        and its statistics are saved as the template's metadata.
+        
         Args:
             file: Uploaded file object
             
         Returns:
-            Tuple of (template_id, filename)
+            Tuple of (template_id, filename, stats)
             
         Raises:
             HTTPException: If file is invalid
@@ -59,25 +148,46 @@ class FileService:
                 detail="Invalid file format. Only .pptx files are allowed."
             )
         
+        return await run_in_threadpool(self.add_template, file.file, Path(file.filename).suffix)
+    
+    def add_template(self, stream: BinaryIO, file_extension: str = ".pptx") -> tuple[str, str, TemplateStats]:
+        """
+        Validate and store a template from a seekable binary stream
+        
+        Args:
+            stream: Template content (position is restored before storing)
+            file_extension: Extension of the stored file
+            
+        Returns:
+            Tuple of (template_id, filename, stats)
+            
+        Raises:
+            HTTPException: If the package is invalid or cannot be stored
+        """
+        # Validate the package without parsing it
+        stats = inspect_template(stream)
+        
         # Generate unique ID
         template_id = self.generate_id()
         
         # Create file path
-        file_extension = Path(file.filename).suffix
         filename = f"{template_id}{file_extension}"
         file_path = self.templates_dir / filename
         
-        # Save file
+        # Save file and metadata
         try:
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            self._store_upload(file_path, stream)
+            self.storage.put_stream(
+                self._key(self._template_metadata_path(template_id)),
+                io.BytesIO(stats.model_dump_json().encode("utf-8"))
+            )
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to save template: {str(e)}"
             )
         
-        return template_id, filename
+        return template_id, filename, stats
     
     async def save_image(self, file: UploadFile) -> tuple[str, str]:
         """
@@ -119,6 +229,22 @@ class FileService:
                 detail=f"Invalid or missing image extension. Detected type: {file.content_type}. Allowed formats: {', '.join(allowed_extensions)}"
             )
         
+        return await run_in_threadpool(self.add_image, file.file, file_extension)
+    
+    def add_image(self, stream: BinaryIO, file_extension: str) -> tuple[str, str]:
+        """
+        Store an image from a binary stream
+        
+        Args:
+            stream: Image content
+            file_extension: Extension of the stored file (e.g. ".png")
+            
+        Returns:
+            Tuple of (image_id, filename)
+            
+        Raises:
+            HTTPException: If the image cannot be stored
+        """
         # Generate unique ID
         image_id = self.generate_id()
         
@@ -128,8 +254,7 @@ class FileService:
         
         # Save file
         try:
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            self._store_upload(file_path, stream)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -166,8 +291,7 @@ class FileService:
         file_path = self.videos_dir / filename
         
         try:
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            await run_in_threadpool(self._store_upload, file_path, file.file)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -176,19 +300,21 @@ class FileService:
         
         return video_id, filename
 
-    def extract_poster_frame(self, video_path: Path) -> Path:
+    def extract_poster_frame(self, video_path: Path, poster_path: Optional[Path] = None) -> Path:
         """
         Extract the first frame of a video to use as a poster image
+        (saved next to the video as .jpg unless `poster_path` is given)
         """
         import cv2
         
-        poster_path = video_path.with_suffix('.jpg')
+        poster_path = poster_path or video_path.with_suffix('.jpg')
         
         try:
             vidcap = cv2.VideoCapture(str(video_path))
             success, image = vidcap.read()
             if success:
                 cv2.imwrite(str(poster_path), image)
+                self.storage.put_file(self._key(poster_path), poster_path)
                 return poster_path
             else:
                 raise Exception("Could not read video frame")
@@ -201,6 +327,300 @@ class FileService:
         finally:
             vidcap.release()
     
+    async def save_media(self, file: UploadFile, poster: Optional[UploadFile] = None) -> tuple[MediaInfo, bool]:
+        """
+        Save an uploaded image or video in the media library
+        
+        Args:
+            file: Uploaded file object
+            poster: Optional poster frame image (videos only)
+            
+        Returns:
+            Tuple of (media info, created); created is False when identical
+            content was already stored
+        """
+        return await run_in_threadpool(
+            self.add_media, file.file, file.filename, file.content_type, poster.file if poster else None
+        )
+    
+    def add_media(
+        self,
+        stream: BinaryIO,
+        original_filename: Optional[str] = None,
+        content_type: Optional[str] = None,
+        poster: Optional[BinaryIO] = None
+    ) -> tuple[MediaInfo, bool]:
+        """
+        Store an image or video in the media library, once per content
+        
+        The content is hashed while it is written. If a media item with the
+        same SHA-256 exists it is returned instead of storing a copy.
+        Images are recognized by their content, videos by extension or
+        content type; dimensions (and duration) are recorded as metadata.
+        
+        Args:
+            stream: Media content
+            original_filename: Filename it was uploaded with
+            content_type: Content type it was uploaded with
+            poster: Optional poster frame image (videos only)
+            
+        Returns:
+            Tuple of (media info, created)
+            
+        Raises:
+            HTTPException: If the content is not a supported image or video
+        """
+        tmp_path = self.media_dir / f".{self.generate_id()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                sha256, size = copy_hashed(stream, f)
+            
+            existing = self._find_media_by_hash(sha256)
+            if existing:
+                return existing, False
+            
+            kind, file_extension, width, height, duration = self._probe_media(
+                tmp_path, original_filename, content_type
+            )
+            media_id = self.generate_id()
+            media_path = self.media_dir / f"{media_id}{file_extension}"
+            tmp_path.replace(media_path)
+            self.storage.put_file(self._key(media_path), media_path)
+            
+            poster_filename = None
+            if kind == MediaKind.VIDEO and poster is not None:
+                poster_filename = self._store_media_poster(media_id, poster)
+            
+            info = MediaInfo(
+                media_id=media_id,
+                kind=kind,
+                filename=media_path.name,
+                original_filename=original_filename,
+                size_bytes=size,
+                sha256=sha256,
+                width=width,
+                height=height,
+                duration_seconds=duration,
+                poster_filename=poster_filename,
+                created_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            )
+            self._save_media_info(info)
+            self.storage.put_stream(self._key(self._media_hash_path(sha256)), io.BytesIO(media_id.encode("ascii")))
+            return info, True
+        finally:
+            tmp_path.unlink(missing_ok=True)
+    
+    def _probe_media(self, path: Path, original_filename: Optional[str], content_type: Optional[str]) -> tuple:
+        """(kind, extension, width, height, duration) of a media file"""
+        try:
+            with Image.open(path) as image:
+                image_format, (width, height) = image.format, image.size
+        except (OSError, Image.DecompressionBombError):
+            image_format = None
+        if image_format in _IMAGE_FORMATS:
+            return MediaKind.IMAGE, _IMAGE_FORMATS[image_format], width, height, None
+        
+        file_extension = Path(original_filename or "").suffix.lower()
+        if file_extension not in _VIDEO_EXTENSIONS and (content_type or "").startswith("video/"):
+            file_extension = ".mp4"
+        if file_extension not in _VIDEO_EXTENSIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported media. Allowed formats: images ({', '.join(sorted(_IMAGE_FORMATS))}) "
+                       f"and videos ({', '.join(sorted(_VIDEO_EXTENSIONS))})"
+            )
+        
+        # Demuxing an arbitrary upload can hang: it runs in a worker under
+        # the poster deadline, like the poster extraction that follows
+        width, height, fps, frames = run_with_deadline("poster", self.read_video_properties, path)
+        if not width or not height:
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid video: could not determine its dimensions"
+            )
+        duration = round(frames / fps, 3) if fps > 0 and frames > 0 else None
+        return MediaKind.VIDEO, file_extension, width, height, duration
+    
+    def read_video_properties(self, path: Path) -> tuple:
+        """(width, height, fps, frame count) of a video, as reported by OpenCV"""
+        import cv2
+        capture = cv2.VideoCapture(str(path))
+        try:
+            return (
+                int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                capture.get(cv2.CAP_PROP_FPS),
+                capture.get(cv2.CAP_PROP_FRAME_COUNT),
+            )
+        finally:
+            capture.release()
+    
+    def _store_media_poster(self, media_id: str, poster: BinaryIO) -> str:
+        """Store an uploaded poster frame for a video; returns its filename"""
+        try:
+            with Image.open(poster) as image:
+                image_format = image.format
+        except (OSError, Image.DecompressionBombError):
+            image_format = None
+        finally:
+            poster.seek(0)
+        if image_format not in _IMAGE_FORMATS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid poster image. Allowed formats: {', '.join(sorted(_IMAGE_FORMATS))}"
+            )
+        poster_path = self.media_dir / f"{media_id}.poster{_IMAGE_FORMATS[image_format]}"
+        self._store_upload(poster_path, poster)
+        return poster_path.name
+    
+    def create_media_poster(self, media_id: str) -> Path:
+        """
+        Extract and record the poster frame of a video in the media library
+        
+        Args:
+            media_id: Media ID of a video
+            
+        Returns:
+            Path to the poster image
+        """
+        info = self.get_media_info(media_id)
+        video_path = self.get_media_path(media_id, MediaKind.VIDEO)
+        poster_path = self.extract_poster_frame(video_path, self.media_dir / f"{media_id}.poster.jpg")
+        info.poster_filename = poster_path.name
+        self._save_media_info(info)
+        return poster_path
+    
+    def _media_info_path(self, media_id: str) -> Path:
+        return self.media_dir / f"{media_id}.json"
+    
+    def _media_hash_path(self, sha256: str) -> Path:
+        return self.media_dir / "sha256" / sha256
+    
+    def _save_media_info(self, info: MediaInfo):
+        self.storage.put_stream(
+            self._key(self._media_info_path(info.media_id)),
+            io.BytesIO(info.model_dump_json().encode("utf-8"))
+        )
+    
+    def _find_media_by_hash(self, sha256: str) -> Optional[MediaInfo]:
+        """Stored media item with this content, if any"""
+        try:
+            media_id = self.storage.local_path(self._key(self._media_hash_path(sha256))).read_text().strip()
+            info = self.get_media_info(media_id)
+        except (FileNotFoundError, HTTPException):
+            return None
+        if not self.storage.exists(self._key(self.media_dir / info.filename)):
+            return None
+        return info
+    
+    def get_media_info(self, media_id: str) -> MediaInfo:
+        """
+        Get the metadata of a media library item
+        
+        Args:
+            media_id: Media ID
+            
+        Returns:
+            MediaInfo
+            
+        Raises:
+            HTTPException: If media not found
+        """
+        try:
+            if Path(media_id).name != media_id:
+                raise FileNotFoundError(media_id)
+            path = self.storage.local_path(self._key(self._media_info_path(media_id)))
+            return MediaInfo.model_validate_json(path.read_bytes())
+        except (FileNotFoundError, ValueError):
+            raise HTTPException(
+                status_code=404,
+                detail=f"Media with ID '{media_id}' not found"
+            )
+    
+    def get_media_path(self, media_id: str, kind: Optional[MediaKind] = None) -> Path:
+        """
+        Get the path to a media library file
+        
+        Args:
+            media_id: Media ID
+            kind: Expected kind (image or video)
+            
+        Returns:
+            Path to the media file
+            
+        Raises:
+            HTTPException: If media not found (404) or of another kind (400)
+        """
+        info = self.get_media_info(media_id)
+        if kind is not None and info.kind != kind:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Media '{media_id}' has kind '{info.kind.value}', expected '{MediaKind(kind).value}'"
+            )
+        try:
+            return self._fetch(self._key(self.media_dir / info.filename))
+        except FileNotFoundError:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Media with ID '{media_id}' not found"
+            )
+    
+    def get_media_poster_path(self, media_id: str) -> Optional[Path]:
+        """
+        Get the path to the poster frame of a video in the media library
+        
+        Returns:
+            Path to the poster, or None if it has none yet
+        """
+        info = self.get_media_info(media_id)
+        if not info.poster_filename:
+            return None
+        try:
+            return self._fetch(self._key(self.media_dir / info.poster_filename))
+        except FileNotFoundError:
+            return None
+    
+    def list_media(self) -> list[MediaInfo]:
+        """
+        List the media library
+        
+        Returns:
+            List of MediaInfo, oldest first
+        """
+        media = []
+        for filename in self._list(self.media_dir, ".json"):
+            try:
+                media.append(self.get_media_info(Path(filename).stem))
+            except HTTPException:
+                continue
+        media.sort(key=lambda info: info.created_at)
+        return media
+    
+    def delete_media(self, media_id: str) -> bool:
+        """
+        Delete a media library item (presentations that already use it keep their copy)
+        
+        Args:
+            media_id: Media ID
+            
+        Returns:
+            True if deleted successfully
+        """
+        info = self.get_media_info(media_id)
+        try:
+            hash_key = self._key(self._media_hash_path(info.sha256))
+            try:
+                if self.storage.local_path(hash_key).read_text().strip() == media_id:
+                    self.storage.delete(hash_key)
+            except FileNotFoundError:
+                pass
+            if info.poster_filename:
+                self.storage.delete(self._key(self.media_dir / info.poster_filename))
+            self.storage.delete(self._key(self.media_dir / info.filename))
+            return self.storage.delete(self._key(self._media_info_path(media_id)))
+        except Exception:
+            return False
+    
     def get_template_path(self, template_id: str) -> Path:
         """
         Get the path to a template file
@@ -214,16 +634,63 @@ class FileService:
         Raises:
             HTTPException: If template not found
         """
-        # Find template file
-        for file_path in self.templates_dir.glob(f"{template_id}.*"):
-            if file_path.is_file():
-                return file_path
+        # Find template file (not its metadata)
+        file_path = self._find(self.templates_dir, template_id, skip_suffixes=('.json',))
+        if file_path:
+            return file_path
         
         raise HTTPException(
             status_code=404,
             detail=f"Template with ID '{template_id}' not found"
         )
     
+    def _template_metadata_path(self, template_id: str) -> Path:
+        return self.templates_dir / f"{template_id}.json"
+    
+    def get_template_stats(self, template_id: str) -> Optional[TemplateStats]:
+        """
+        Get the statistics recorded when a template was uploaded
+        
+        Args:
+            template_id: Template ID
+            
+        Returns:
+            TemplateStats, or None for templates uploaded before stats were recorded
+        """
+        try:
+            path = self.storage.local_path(self._key(self._template_metadata_path(template_id)))
+            return TemplateStats.model_validate_json(path.read_bytes())
+        except (FileNotFoundError, ValueError):
+            return None
+    
+    def _bulk_manifest_path(self, upload_id: str) -> Path:
+        return self._working_dir / "uploads" / "bulk" / f"{upload_id}.json"
+    
+    def get_bulk_manifest(self, upload_id: str) -> Optional[bytes]:
+        """
+        Get the stored manifest of a bulk upload
+        
+        Args:
+            upload_id: Bulk upload ID
+            
+        Returns:
+            Manifest JSON, or None if there is none
+        """
+        try:
+            return self.storage.local_path(self._key(self._bulk_manifest_path(upload_id))).read_bytes()
+        except FileNotFoundError:
+            return None
+    
+    def save_bulk_manifest(self, upload_id: str, manifest: bytes):
+        """
+        Store the manifest of a bulk upload
+        
+        Args:
+            upload_id: Bulk upload ID
+            manifest: Manifest JSON
+        """
+        self.storage.put_stream(self._key(self._bulk_manifest_path(upload_id)), io.BytesIO(manifest))
+    
     def get_image_path(self, image_id: str) -> Path:
         """
         Get the path to an image file
@@ -238,9 +705,9 @@ class FileService:
             HTTPException: If image not found
         """
         # Find image file
-        for file_path in self.images_dir.glob(f"{image_id}.*"):
-            if file_path.is_file():
-                return file_path
+        file_path = self._find(self.images_dir, image_id)
+        if file_path:
+            return file_path
         
         raise HTTPException(
             status_code=404,
@@ -251,9 +718,9 @@ class FileService:
         """
         Get the path to a video file
         """
-        for file_path in self.videos_dir.glob(f"{video_id}.*"):
-            if file_path.is_file() and file_path.suffix != '.jpg':
-                return file_path
+        file_path = self._find(self.videos_dir, video_id, skip_suffixes=('.jpg',))
+        if file_path:
+            return file_path
         
         raise HTTPException(
             status_code=404,
@@ -273,6 +740,41 @@ class FileService:
         filename = f"{presentation_id}.pptx"
         return self.outputs_dir / filename
     
+    def get_oplog_dir(self, presentation_id: str) -> Path:
+        """
+        Get the directory holding a presentation's operation log
+        
+        Args:
+            presentation_id: Presentation ID
+            
+        Returns:
+            Path to the operation log directory (may not exist)
+        """
+        return self.outputs_dir / f"{presentation_id}.oplog"
+    
+    @contextmanager
+    def lock_presentation(self, presentation_id: str):
+        """
+        Hold an exclusive lock on a presentation (flock on outputs/{id}.lock)
+        
+        Edits take it around their load-apply-save, so concurrent edits of
+        the same presentation in any process of the host (API workers and
+        their deadline worker processes) run one after another instead of
+        overwriting each other. The kernel releases it if the process dies.
+        With several nodes, requests for a presentation must reach the same
+        node (as for Idempotency-Key).
+        
+        Args:
+            presentation_id: Presentation ID
+        """
+        fd = os.open(self.outputs_dir / f"{presentation_id}.lock", os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+    
     def get_presentation_path(self, presentation_id: str) -> Path:
         """
         Get the path to a presentation file
@@ -288,13 +790,46 @@ class FileService:
         """
         file_path = self.create_presentation_path(presentation_id)
         
-        if not file_path.exists():
+        try:
+            return self._fetch(self._key(file_path))
+        except FileNotFoundError:
             raise HTTPException(
                 status_code=404,
                 detail=f"Presentation with ID '{presentation_id}' not found"
             )
+    
+    def save_presentation(self, presentation_id: str):
+        """
+        Store a presentation after it was written to its local path
+        (a no-op with local storage)
         
-        return file_path
+        Args:
+            presentation_id: Presentation ID
+        """
+        file_path = self.create_presentation_path(presentation_id)
+        with span("storage.put", **{"storage.key": self._key(file_path), "file.bytes": file_path.stat().st_size}):
+            self.storage.put_file(self._key(file_path), file_path)
+    
+    def stream_presentation(self, presentation_id: str):
+        """
+        Stream a stored presentation without keeping a local copy
+        
+        Args:
+            presentation_id: Presentation ID
+            
+        Returns:
+            Iterator over the file content
+            
+        Raises:
+            HTTPException: If presentation not found
+        """
+        try:
+            return self.storage.iter_chunks(self._key(self.create_presentation_path(presentation_id)))
+        except FileNotFoundError:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Presentation with ID '{presentation_id}' not found"
+            )
     
     def delete_template(self, template_id: str) -> bool:
         """
@@ -308,8 +843,9 @@ class FileService:
         """
         file_path = self.get_template_path(template_id)
         try:
-            file_path.unlink()
-            return True
+            get_template_cache(self).retire(file_path)
+            self.storage.delete(self._key(self._template_metadata_path(template_id)))
+            return self.storage.delete(self._key(file_path))
         except Exception:
             return False
     
@@ -323,9 +859,25 @@ class FileService:
         Returns:
             True if deleted successfully
         """
-        file_path = self.get_presentation_path(presentation_id)
+        key = self._key(self.create_presentation_path(presentation_id))
+        oplog_dir = self.get_oplog_dir(presentation_id)
+        
+        if not oplog_dir.exists() and not self.storage.exists(key):
+            raise HTTPException(
+                status_code=404,
+                detail=f"Presentation with ID '{presentation_id}' not found"
+            )
+        
         try:
-            file_path.unlink()
+            with self.lock_presentation(presentation_id):
+                if oplog_dir.exists():
+                    # oplog_service.TEMPLATE_FILE (a hard link of the template)
+                    get_template_cache(self).retire(oplog_dir / "template.pptx")
+                    shutil.rmtree(oplog_dir)
+                    # A materialized copy is a node-local build, not a stored file
+                    self.create_presentation_path(presentation_id).unlink(missing_ok=True)
+                self.storage.delete(key)
+                (self.outputs_dir / f"{presentation_id}.lock").unlink(missing_ok=True)
             return True
         except Exception:
             return False
@@ -342,8 +894,7 @@ class FileService:
         """
         file_path = self.get_image_path(image_id)
         try:
-            file_path.unlink()
-            return True
+            return self.storage.delete(self._key(file_path))
         except Exception:
             return False
 
@@ -355,12 +906,12 @@ class FileService:
             List of dictionaries containing template information
         """
         templates = []
-        for file_path in self.templates_dir.glob("*.pptx"):
-            if file_path.is_file():
-                templates.append({
-                    "template_id": file_path.stem,
-                    "filename": file_path.name
-                })
+        for filename in self._list(self.templates_dir, ".pptx"):
+            templates.append({
+                "template_id": Path(filename).stem,
+                "filename": filename,
+                "stats": self.get_template_stats(Path(filename).stem)
+            })
         return templates
 
     def list_presentations(self) -> list[dict]:
@@ -371,10 +922,19 @@ class FileService:
             List of dictionaries containing presentation information
         """
         presentations = []
-        for file_path in self.outputs_dir.glob("*.pptx"):
-            if file_path.is_file():
+        for filename in self._list(self.outputs_dir, ".pptx"):
+            presentations.append({
+                "presentation_id": Path(filename).stem,
+                "filename": filename
+            })
+        
+        # Operation-log presentations that have not been materialized yet
+        listed = {p["presentation_id"] for p in presentations}
+        for oplog_dir in self.outputs_dir.glob("*.oplog"):
+            presentation_id = oplog_dir.name[:-len(".oplog")]
+            if oplog_dir.is_dir() and presentation_id not in listed:
                 presentations.append({
-                    "presentation_id": file_path.stem,
-                    "filename": file_path.name
+                    "presentation_id": presentation_id,
+                    "filename": f"{presentation_id}.pptx"
                 })
         return presentations
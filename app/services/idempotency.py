@@ -0,0 +1,170 @@
+"""
+Stored results of requests sent with an Idempotency-Key header
+"""
+import asyncio
+import base64
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.services.metrics import metrics
+
+
+metrics.counter("pptx_idempotent_replays_total", "Requests answered with the stored response of an earlier one")
+
+# Seconds between checks while another request with the same key is in flight
+_POLL_INTERVAL = 0.05
+
+# Seconds between sweeps of expired records (per process)
+_SWEEP_INTERVAL = 60
+
+_last_sweep = 0.0
+_sweep_lock = threading.Lock()
+
+
+class IdempotencyLock:
+    """Exclusive hold on a key; released when the request is done"""
+
+    def __init__(self, fd: int):
+        self._fd = fd
+
+    def release(self):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+
+
+class IdempotencyStore:
+    """
+    Responses stored as outputs/idempotency/{record_id}.json for `ttl`
+    seconds, next to a {record_id}.lock file.
+
+    The lock file is held (flock) while the first request with a key runs,
+    so duplicates arriving meanwhile, in this or another worker process of
+    the host, wait for it and then replay its stored response.
+    """
+
+    def __init__(self, directory: Path, ttl: int):
+        """
+        Initialize idempotency store
+
+        Args:
+            directory: Directory for records and locks
+            ttl: Seconds a response is kept
+        """
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def record_id(self, key: str, scope: str) -> str:
+        """File name for a client key (scoped, e.g. by credentials, so keys of different clients never collide)"""
+        return hashlib.sha256(f"{scope}\0{key}".encode("utf-8")).hexdigest()
+
+    def _try_lock(self, record_id: str) -> Optional[IdempotencyLock]:
+        path = self.directory / f"{record_id}.lock"
+        fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # The sweeper may have unlinked the file we opened: lock the current one instead
+            if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                return IdempotencyLock(fd)
+        except (BlockingIOError, FileNotFoundError):
+            pass
+        os.close(fd)
+        return None
+
+    async def acquire(self, record_id: str, timeout: float) -> IdempotencyLock:
+        """
+        Wait until no other request holds `record_id`
+
+        Raises:
+            TimeoutError: If it is still held after `timeout` seconds
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            lock = self._try_lock(record_id)
+            if lock is not None:
+                return lock
+            if time.monotonic() >= deadline:
+                raise TimeoutError(record_id)
+            await asyncio.sleep(_POLL_INTERVAL)
+
+    def get(self, record_id: str) -> Optional[Dict]:
+        """
+        Stored response for `record_id`, if any and not expired
+
+        Returns:
+            Dict with fingerprint, status, headers ([name, value] pairs) and body (bytes)
+        """
+        try:
+            record = json.loads((self.directory / f"{record_id}.json").read_bytes())
+        except (OSError, ValueError):
+            return None
+        if record["expires_at"] < time.time():
+            return None
+        record["body"] = base64.b64decode(record["body"])
+        return record
+
+    def put(self, record_id: str, fingerprint: str, status: int, headers: list, body: bytes):
+        """Store a response (call while holding the record's lock)"""
+        record = {
+            "fingerprint": fingerprint,
+            "status": status,
+            "headers": headers,
+            "body": base64.b64encode(body).decode("ascii"),
+            "expires_at": time.time() + self.ttl,
+        }
+        path = self.directory / f"{record_id}.json"
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp_path.write_text(json.dumps(record))
+            tmp_path.replace(path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        self._sweep()
+
+    def _sweep(self):
+        """Delete expired records and their locks (unless held), at most once a minute"""
+        global _last_sweep
+        with _sweep_lock:
+            if time.monotonic() - _last_sweep < _SWEEP_INTERVAL:
+                return
+            _last_sweep = time.monotonic()
+
+        now = time.time()
+        for path in self.directory.glob("*.json"):
+            try:
+                expired = json.loads(path.read_bytes())["expires_at"] < now
+            except (OSError, ValueError, KeyError):
+                expired = True
+            if expired:
+                self._remove(path.stem)
+        # Locks of requests whose response was not stored (e.g. 5xx)
+        for path in self.directory.glob("*.lock"):
+            try:
+                stale = not path.with_suffix(".json").exists() and path.stat().st_mtime < now - self.ttl
+            except FileNotFoundError:
+                continue
+            if stale:
+                self._remove(path.stem)
+
+    def _remove(self, record_id: str):
+        lock = self._try_lock(record_id)
+        if lock is not None:
+            try:
+                (self.directory / f"{record_id}.json").unlink(missing_ok=True)
+                (self.directory / f"{record_id}.lock").unlink(missing_ok=True)
+            finally:
+                lock.release()
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Idempotency store configured by settings (IDEMPOTENCY_TTL)"""
+    from app.config import settings
+    from app.services.file_service import FileService
+
+    return IdempotencyStore(FileService().outputs_dir / "idempotency", settings.IDEMPOTENCY_TTL)
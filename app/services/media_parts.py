@@ -0,0 +1,245 @@
+"""
+Media parts backed by files, streamed into the package when it is saved
+"""
+import hashlib
+import os
+import zipfile
+from typing import BinaryIO, Optional
+
+from pptx.media import Video
+from pptx.opc.constants import CONTENT_TYPE as CT
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.package import PartFactory, _PackageLoader
+from pptx.opc.packuri import PACKAGE_URI, PackURI
+from pptx.package import Package
+from pptx.parts.media import MediaPart
+from pptx.shapes.shapetree import _MoviePicElementCreator
+from pptx.util import lazyproperty
+
+
+_CHUNK = 1024 * 1024
+
+
+def _stream_sha1(stream: BinaryIO) -> str:
+    digest = hashlib.sha1()
+    for chunk in iter(lambda: stream.read(_CHUNK), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_sha1(path: str) -> str:
+    with open(path, "rb") as f:
+        return _stream_sha1(f)
+
+
+class FileVideo(Video):
+    """Video whose content is read from its file in chunks, never as a whole"""
+
+    def __init__(self, path: str, mime_type: str):
+        super().__init__(None, mime_type, os.path.basename(path))
+        self.path = path
+
+    @property
+    def blob(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    @lazyproperty
+    def sha1(self) -> str:
+        return _file_sha1(self.path)
+
+
+class FileMediaPart(MediaPart):
+    """
+    Media part whose content stays in a file until the package is saved,
+    where package_writer copies it into the zip in chunks.
+
+    The file must not change or disappear before the save.
+    """
+
+    def __init__(self, partname, content_type, package, path: str, sha1: str):
+        super().__init__(partname, content_type, package)
+        self.path = path
+        self._sha1 = sha1
+
+    @classmethod
+    def new(cls, package, media: FileVideo):
+        return cls(package.next_media_partname(media.ext), media.content_type, package, media.path, media.sha1)
+
+    @property
+    def blob(self) -> bytes:
+        # Only for code that needs the bytes; saving streams from self.path
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    @property
+    def sha1(self) -> str:
+        return self._sha1
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+    
+    @property
+    def crc(self) -> Optional[int]:
+        return None
+    
+    def open(self) -> BinaryIO:
+        return open(self.path, "rb")
+
+
+class ZipMediaPart(MediaPart):
+    """
+    Media part of a loaded presentation whose content stays in the zip it
+    was loaded from (see open_presentation), until package_writer copies it
+    into the saved zip in chunks.
+
+    The source file must not change or disappear before the save.
+    """
+
+    def __init__(self, partname, content_type, package, zip_path: str, member: zipfile.ZipInfo):
+        super().__init__(partname, content_type, package)
+        self.zip_path = zip_path
+        self.member = member
+
+    @property
+    def blob(self) -> bytes:
+        # Only for code that needs the bytes; saving streams from the zip
+        with self.open() as f:
+            return f.read()
+
+    @lazyproperty
+    def sha1(self) -> str:
+        with self.open() as f:
+            return _stream_sha1(f)
+
+    @property
+    def size(self) -> int:
+        return self.member.file_size
+
+    @property
+    def crc(self) -> Optional[int]:
+        return self.member.CRC
+
+    def open(self) -> BinaryIO:
+        # The member stream keeps the file open after the ZipFile is closed
+        with zipfile.ZipFile(self.zip_path) as zf:
+            return zf.open(self.member)
+
+
+def part_size(part) -> int:
+    """Size of a part's content, without reading file-backed parts"""
+    return part.size if isinstance(part, (FileMediaPart, ZipMediaPart)) else len(part.blob)
+
+
+class _ZipMemberReader:
+    """PackageReader that reads zip members when asked (python-pptx reads them all up front)"""
+
+    def __init__(self, zf: zipfile.ZipFile):
+        self._zf = zf
+        self._members = {PackURI(f"/{info.filename}"): info for info in zf.infolist()}
+
+    def __contains__(self, pack_uri) -> bool:
+        return pack_uri in self._members
+
+    def __getitem__(self, pack_uri) -> bytes:
+        return self._zf.read(self._members[pack_uri])
+
+    def member(self, pack_uri) -> zipfile.ZipInfo:
+        return self._members[pack_uri]
+
+    def rels_xml_for(self, partname) -> Optional[bytes]:
+        uri = partname.rels_uri
+        return self[uri] if uri in self else None
+
+
+class _ZipMediaPackageLoader(_PackageLoader):
+    def __init__(self, pkg_file, package, reader: _ZipMemberReader):
+        super().__init__(pkg_file, package)
+        self._reader = reader
+
+    @lazyproperty
+    def _package_reader(self):
+        return self._reader
+
+    @lazyproperty
+    def _parts(self):
+        parts = {}
+        for partname in self._xml_rels:
+            if partname == "/" or partname not in self._reader:
+                continue
+            content_type = self._content_types[partname]
+            if PartFactory._part_cls_for(content_type) is MediaPart:
+                parts[partname] = ZipMediaPart(
+                    partname, content_type, self._package, self._pkg_file, self._reader.member(partname)
+                )
+            else:
+                parts[partname] = PartFactory(partname, content_type, self._package, self._reader[partname])
+        return parts
+
+
+class _ZipMediaPackage(Package):
+    def _load(self):
+        with zipfile.ZipFile(self._pkg_file) as zf:
+            pkg_xml_rels, parts = _ZipMediaPackageLoader(self._pkg_file, self, _ZipMemberReader(zf))._load()
+        self._rels.load_from_xml(PACKAGE_URI, pkg_xml_rels, parts)
+        return self
+
+
+def open_presentation(path: str):
+    """
+    Same as Presentation(path), but media parts (videos, audio) are not read:
+    they stay in the .pptx and are streamed from it when the presentation is
+    saved with package_writer.save_presentation.
+
+    The file must not be overwritten in place before that save; writing a
+    temporary file and renaming it over the original is safe.
+
+    Args:
+        path: Path to a .pptx file
+
+    Returns:
+        python-pptx Presentation
+    """
+    presentation_part = _ZipMediaPackage.open(path).main_document_part
+    if presentation_part.content_type not in (CT.PML_PRESENTATION_MAIN, CT.PML_PRES_MACRO_MAIN):
+        raise ValueError(f"file '{path}' is not a PowerPoint file, content type is '{presentation_part.content_type}'")
+    return presentation_part.presentation
+
+
+class _FileMoviePicElementCreator(_MoviePicElementCreator):
+    @lazyproperty
+    def _video(self):
+        return FileVideo(self._movie_file, self._mime_type)
+
+    @lazyproperty
+    def _video_part_rIds(self):
+        slide_part = self._slide_part
+        package = slide_part.package
+        # The same video twice in a deck is stored once (like python-pptx, by SHA-1)
+        media_part = package._media_parts._find_by_sha1(self._video.sha1) or FileMediaPart.new(package, self._video)
+        return slide_part.relate_to(media_part, RT.MEDIA), slide_part.relate_to(media_part, RT.VIDEO)
+
+
+def add_movie(shapes, movie_path: str, left, top, width, height, poster_frame_image=None, mime_type=CT.VIDEO):
+    """
+    Same as shapes.add_movie(), but the video is never read into memory: it
+    is hashed in chunks here and streamed into the zip when the presentation
+    is saved with package_writer.save_presentation.
+
+    Args:
+        shapes: SlideShapes of the slide
+        movie_path: Path to the video file
+        left, top, width, height: Geometry of the movie shape (EMU)
+        poster_frame_image: Path to the image shown before the video plays
+        mime_type: Video content type
+
+    Returns:
+        The new movie shape
+    """
+    movie_pic = _FileMoviePicElementCreator.new_movie_pic(
+        shapes, shapes._next_shape_id, movie_path, left, top, width, height, poster_frame_image, mime_type
+    )
+    shapes._spTree.append(movie_pic)
+    shapes._add_video_timing(movie_pic)
+    return shapes._shape_factory(movie_pic)
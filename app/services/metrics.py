@@ -0,0 +1,46 @@
+"""
+Process-level metrics in the Prometheus text format
+"""
+import threading
+from typing import Callable, Dict, List, Tuple
+
+
+class Metrics:
+    """Counters and gauges of this worker process, rendered for GET /metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._help: List[Tuple[str, str, str]] = []
+
+    def counter(self, name: str, help_text: str):
+        """Declare a counter (starts at 0)"""
+        with self._lock:
+            if name not in self._counters:
+                self._counters[name] = 0
+                self._help.append((name, "counter", help_text))
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]):
+        """Declare a gauge whose value is read when rendering"""
+        with self._lock:
+            if name not in self._gauges:
+                self._help.append((name, "gauge", help_text))
+            self._gauges[name] = read
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, kind, help_text in self._help:
+                value = self._counters[name] if kind == "counter" else self._gauges[name]()
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -0,0 +1,146 @@
+"""
+Operation log storage for presentations: template reference plus append-only edits
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.services.file_service import FileService
+
+
+LOG_FILE = "log.jsonl"
+TEMPLATE_FILE = "template.pptx"
+BUILT_FILE = "built"
+SKIPPED_FILE = "skipped.json"
+MEDIA_DIR = "media"
+
+# Operation fields holding paths to uploaded media, kept next to the log
+MEDIA_FIELDS = ("image_path", "video_path", "poster_path")
+
+
+def _link_or_copy(source: Path, target: Path):
+    """Hard link when possible (O(1)), copy otherwise (e.g. across devices)"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def _to_json(value):
+    """json.dumps default for pydantic models in operation arguments"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class OpLogService:
+    """
+    Stores a presentation as a directory in outputs/ with:
+
+    - template.pptx: hard link to the template at creation time (immutable)
+    - log.jsonl: one JSON operation per line, only ever appended to
+    - media/: uploaded images and videos referenced by the operations
+    - built: size of the log the cached outputs/{id}.pptx was built from
+    - skipped.json: operations that failed in that build and were left out
+    """
+
+    def __init__(self, file_service: FileService):
+        """
+        Initialize operation log service
+
+        Args:
+            file_service: File service instance
+        """
+        self.file_service = file_service
+
+    def exists(self, presentation_id: str) -> bool:
+        return (self.file_service.get_oplog_dir(presentation_id) / LOG_FILE).is_file()
+
+    def create(self, template_path: Path, template_id: str, presentation_id: str) -> Path:
+        """Start a log for a new presentation referencing `template_path`"""
+        log_dir = self.file_service.get_oplog_dir(presentation_id)
+        (log_dir / MEDIA_DIR).mkdir(parents=True, exist_ok=True)
+        _link_or_copy(template_path, log_dir / TEMPLATE_FILE)
+        self._write_line(log_dir / LOG_FILE, {"op": "create", "template_id": template_id})
+        return log_dir
+
+    def append(self, presentation_id: str, operation: Dict):
+        """
+        Append an operation to the log. Media paths in the operation are linked
+        into the presentation's media folder so callers can delete their copy.
+        """
+        log_dir = self.file_service.get_oplog_dir(presentation_id)
+        if not (log_dir / LOG_FILE).is_file():
+            raise HTTPException(
+                status_code=404,
+                detail=f"Presentation with ID '{presentation_id}' not found"
+            )
+
+        operation = dict(operation)
+        for field in MEDIA_FIELDS:
+            if operation.get(field):
+                source = Path(operation[field])
+                _link_or_copy(source, log_dir / MEDIA_DIR / source.name)
+                operation[field] = source.name
+
+        self._write_line(log_dir / LOG_FILE, operation)
+
+    def read(self, presentation_id: str) -> Tuple[List[Dict], int]:
+        """
+        Edit operations (without the initial create) with media paths resolved,
+        and the log size they were read at.
+        """
+        log_dir = self.file_service.get_oplog_dir(presentation_id)
+        with open(log_dir / LOG_FILE, "rb") as f:
+            data = f.read()
+
+        operations = []
+        for line in data.splitlines():
+            operation = json.loads(line)
+            if operation["op"] == "create":
+                continue
+            for field in MEDIA_FIELDS:
+                if operation.get(field):
+                    operation[field] = str(log_dir / MEDIA_DIR / operation[field])
+            operations.append(operation)
+        return operations, len(data)
+
+    def template_path(self, presentation_id: str) -> Path:
+        return self.file_service.get_oplog_dir(presentation_id) / TEMPLATE_FILE
+
+    def cached_output(self, presentation_id: str) -> Optional[Path]:
+        """The materialized deck if it was built from the current log"""
+        log_dir = self.file_service.get_oplog_dir(presentation_id)
+        output_path = self.file_service.create_presentation_path(presentation_id)
+        try:
+            built_size = int((log_dir / BUILT_FILE).read_text())
+        except (OSError, ValueError):
+            return None
+        if output_path.is_file() and built_size == (log_dir / LOG_FILE).stat().st_size:
+            return output_path
+        return None
+
+    def mark_built(self, presentation_id: str, log_size: int, skipped: List[Dict] = ()):
+        log_dir = self.file_service.get_oplog_dir(presentation_id)
+        (log_dir / SKIPPED_FILE).write_text(json.dumps(list(skipped), separators=(",", ":")))
+        (log_dir / BUILT_FILE).write_text(str(log_size))
+
+    def skipped(self, presentation_id: str) -> List[Dict]:
+        """Operations left out of the last build (see mark_built)"""
+        try:
+            return json.loads((self.file_service.get_oplog_dir(presentation_id) / SKIPPED_FILE).read_text())
+        except (OSError, ValueError):
+            return []
+
+    def _write_line(self, path: Path, operation: Dict):
+        line = json.dumps(operation, default=_to_json, separators=(",", ":")) + "\n"
+        # A single write() on an O_APPEND descriptor keeps concurrent appends whole
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
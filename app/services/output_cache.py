@@ -0,0 +1,135 @@
+"""
+Content-addressed cache of generated presentations
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.services.file_service import FileService
+
+
+# Bump when the way operations are applied changes, so old outputs are not reused
+CACHE_VERSION = "1"
+
+_HASH_CHUNK = 1024 * 1024
+
+# (path, size, mtime_ns) -> sha256, so unchanged templates and media are hashed once
+_file_hashes: Dict[Tuple[str, int, int], str] = {}
+_file_hashes_lock = threading.Lock()
+
+
+def file_sha256(path: Path) -> str:
+    """sha256 of a file, memoized by path, size and modification time"""
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    with _file_hashes_lock:
+        if key in _file_hashes:
+            return _file_hashes[key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+
+    with _file_hashes_lock:
+        if len(_file_hashes) > 10_000:
+            _file_hashes.clear()
+        _file_hashes[key] = digest.hexdigest()
+    return _file_hashes[key]
+
+
+class OutputCache:
+    """
+    Generated decks stored under outputs/cache/{key}.pptx, where the key is
+    derived from the template content, the canonical operation list and the
+    content of the media the operations reference.
+
+    Entries are evicted least-recently-used first (by mtime, refreshed on
+    every hit) once the cache exceeds its disk budget.
+    """
+
+    def __init__(self, file_service: FileService, max_bytes: int):
+        """
+        Initialize output cache
+
+        Args:
+            file_service: File service instance
+            max_bytes: Disk budget for cached outputs (0 disables the cache)
+        """
+        self.file_service = file_service
+        self.max_bytes = max_bytes
+        self.cache_dir = file_service.outputs_dir / "cache"
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def key(self, template_path: Path, operations: List[Dict], media_fields: Tuple[str, ...]) -> str:
+        """
+        Cache key for building `operations` on top of `template_path`.
+
+        Media paths are replaced by the hash of their content, so the same
+        image uploaded twice under different names still hits.
+        """
+        canonical = []
+        for operation in operations:
+            operation = dict(operation)
+            for field in media_fields:
+                if operation.get(field):
+                    operation[field] = "sha256:" + file_sha256(Path(operation[field]))
+            canonical.append(operation)
+
+        digest = hashlib.sha256(f"v{CACHE_VERSION}:".encode())
+        digest.update(file_sha256(template_path).encode())
+        digest.update(json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str, target: Path) -> bool:
+        """Place the cached output for `key` at `target`; returns False on a miss"""
+        entry = self.cache_dir / f"{key}.pptx"
+        try:
+            os.utime(entry)
+        except FileNotFoundError:
+            return False
+        self._place(entry, target)
+        return True
+
+    def put(self, key: str, source: Path):
+        """Store `source` under `key` and evict old entries beyond the disk budget"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._place(source, self.cache_dir / f"{key}.pptx")
+        self._evict()
+
+    def _place(self, source: Path, target: Path):
+        """
+        Hard link (or copy) `source` to `target`, replacing it atomically.
+
+        Linking is safe because outputs of cached presentations are only ever
+        replaced, never rewritten in place.
+        """
+        tmp_path = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)
+        tmp_path.replace(target)
+
+    def _evict(self):
+        entries = []
+        for path in self.cache_dir.glob("*.pptx"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
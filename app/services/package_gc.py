@@ -0,0 +1,114 @@
+"""
+Compaction of python-pptx packages: drops relationships and parts nothing refers to
+"""
+from lxml import etree
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+from app.models.schemas import CompactionReport
+from app.services.media_parts import part_size
+
+
+# Relationships that only exist to be referenced by an r:* attribute of the
+# source part's XML. Others (layout, master, theme, notes, ...) are implicit
+# and must never be dropped for lack of a reference.
+EXPLICIT_RELTYPES = frozenset({
+    RT.IMAGE,
+    RT.MEDIA,
+    RT.VIDEO,
+    RT.AUDIO,
+    RT.HYPERLINK,
+    RT.CHART,
+    RT.OLE_OBJECT,
+    RT.PACKAGE,
+})
+
+_REL_REFS = etree.XPath(
+    "//@*[namespace-uri()='http://schemas.openxmlformats.org/officeDocument/2006/relationships']"
+)
+
+
+def compact_package(prs, remove_unused_layouts: bool = False) -> CompactionReport:
+    """
+    Remove what a presentation no longer uses.
+
+    python-pptx writes every part reachable through relationships, so a
+    picture whose shape was deleted is still saved as long as the slide keeps
+    its relationship. Explicit relationships whose rId no longer appears in
+    the source XML are dropped here; the parts only they referenced are then
+    left out of the next save.
+
+    Args:
+        prs: python-pptx Presentation (modified in place)
+        remove_unused_layouts: Also remove layouts no slide uses, and masters
+            left without used layouts (at least one master and layout is kept)
+
+    Returns:
+        CompactionReport with what was removed and the bytes saved
+    """
+    package = prs.part.package
+    parts_before = list(package.iter_parts())
+
+    relationships_removed = 0
+    for part in parts_before:
+        element = getattr(part, "_element", None)
+        if element is None:
+            continue
+        droppable = [rId for rId, rel in part.rels.items() if rel.reltype in EXPLICIT_RELTYPES]
+        if not droppable:
+            continue
+        referenced = set(_REL_REFS(element))
+        for rId in droppable:
+            if rId not in referenced:
+                part.rels.pop(rId)
+                relationships_removed += 1
+
+    layouts_removed = masters_removed = 0
+    if remove_unused_layouts:
+        layouts_removed, masters_removed = _remove_unused_layouts(prs)
+
+    parts_after = set(package.iter_parts())
+    removed = [part for part in parts_before if part not in parts_after]
+
+    return CompactionReport(
+        relationships_removed=relationships_removed,
+        parts_removed=len(removed),
+        layouts_removed=layouts_removed,
+        masters_removed=masters_removed,
+        bytes_saved=sum(part_size(part) for part in removed),
+    )
+
+
+def _remove_unused_layouts(prs):
+    used = {slide.slide_layout.part for slide in prs.slides}
+    layouts_removed = masters_removed = 0
+
+    masters = list(prs.slide_masters)
+    unused_masters = [
+        master for master in masters
+        if not any(layout.part in used for layout in master.slide_layouts)
+    ]
+    if len(unused_masters) == len(masters):
+        # A deck without slides still needs one master
+        unused_masters = unused_masters[1:]
+
+    sldMasterIdLst = prs.part._element.sldMasterIdLst
+    for master in unused_masters:
+        for sldMasterId in sldMasterIdLst.sldMasterId_lst:
+            if prs.part.related_part(sldMasterId.rId) is master.part:
+                sldMasterIdLst.remove(sldMasterId)
+                prs.part.rels.pop(sldMasterId.rId)
+                break
+        masters_removed += 1
+        layouts_removed += len(master.slide_layouts)
+
+    for master in masters:
+        if master in unused_masters:
+            continue
+        layouts = master.slide_layouts
+        for layout in list(layouts):
+            # A master needs at least one layout
+            if layout.part not in used and len(layouts) > 1:
+                layouts.remove(layout)
+                layouts_removed += 1
+
+    return layouts_removed, masters_removed
@@ -0,0 +1,513 @@
+"""
+Merging of .pptx packages at the zip level: slides are appended without loading the decks in python-pptx
+"""
+import hashlib
+import posixpath
+import re
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from xml.sax.saxutils import quoteattr
+
+from lxml import etree
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+from app.models.schemas import MergeReport
+from app.services.package_reader import NS, R_ID
+from app.services.package_writer import part_compresslevel, zip_info
+
+
+CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+
+# (rId, relationship type, target partname or external URL, external)
+Rel = Tuple[str, str, str, bool]
+
+_CHUNK = 1024 * 1024
+
+# Slide ids start at 256; master and layout ids share one space from 2^31
+_FIRST_SLIDE_ID = 256
+_FIRST_MASTER_ID = 2147483648
+
+_TRAILING_NUMBER = re.compile(r"\d+$")
+
+_XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+
+def _kind(reltype: str) -> str:
+    """Last segment of a relationship type (slide, slideLayout, image...), same for transitional and strict URIs"""
+    return reltype.rpartition("/")[2]
+
+
+def _rels_name(partname: str) -> str:
+    folder, name = posixpath.split(partname)
+    return posixpath.join(folder, "_rels", name + ".rels")
+
+
+def _relative(target: str, source: str) -> str:
+    folder = posixpath.dirname(source)
+    return posixpath.relpath(target, folder) if folder else target
+
+
+def _rels_xml(rels: List[Rel], partname: str) -> bytes:
+    """The .rels of a part, with internal targets relative to it"""
+    items = "".join(
+        f'<Relationship Id={quoteattr(rId)} Type={quoteattr(reltype)} '
+        + (f'Target={quoteattr(target)} TargetMode="External"/>' if external
+           else f'Target={quoteattr(_relative(target, partname))}/>')
+        for rId, reltype, target, external in rels
+    )
+    return (
+        _XML_DECLARATION
+        + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        + items + "</Relationships>"
+    ).encode("utf-8")
+
+
+class _Source:
+    """One input package and what has already been copied from it"""
+
+    def __init__(self, path: Path):
+        self.zip = zipfile.ZipFile(path)
+        types = etree.fromstring(self.zip.read("[Content_Types].xml"))
+        self.defaults = {
+            element.get("Extension").lower(): element.get("ContentType")
+            for element in types.iterfind(f"{{{CT_NS}}}Default")
+        }
+        self.overrides = {
+            element.get("PartName").lstrip("/"): element.get("ContentType")
+            for element in types.iterfind(f"{{{CT_NS}}}Override")
+        }
+        self.presentation = next(
+            (target for _, reltype, target, external in self.rels("") if _kind(reltype) == "officeDocument"),
+            "ppt/presentation.xml"
+        )
+        # Source partname -> output partname
+        self.copied: Dict[str, str] = {}
+        self.copying: Set[str] = set()
+        self.designs: Dict[str, Tuple[str, Dict[str, str]]] = {}
+        self.slides: Dict[str, str] = {}
+
+    def close(self):
+        self.zip.close()
+
+    def exists(self, partname: str) -> bool:
+        return partname in self.zip.NameToInfo
+
+    def read(self, partname: str) -> bytes:
+        return self.zip.read(partname)
+
+    def content_type(self, partname: str) -> str:
+        return self.overrides.get(partname) or self.defaults.get(
+            partname.rpartition(".")[2].lower(), "application/octet-stream"
+        )
+
+    def rels(self, partname: str) -> List[Rel]:
+        """Relationships of a part ("" for the package), internal targets resolved to partnames"""
+        name = _rels_name(partname) if partname else "_rels/.rels"
+        if not self.exists(name):
+            return []
+        folder = posixpath.dirname(partname)
+        rels = []
+        for rel in etree.fromstring(self.read(name)).iterfind("pr:Relationship", NS):
+            target, external = rel.get("Target"), rel.get("TargetMode") == "External"
+            if not external:
+                target = posixpath.normpath(posixpath.join("/" + folder, target)).lstrip("/")
+            rels.append((rel.get("Id"), rel.get("Type"), target, external))
+        return rels
+
+    def slide_partnames(self) -> List[str]:
+        """Slide partnames in presentation order"""
+        targets = {rId: target for rId, _, target, _ in self.rels(self.presentation)}
+        presentation = etree.fromstring(self.read(self.presentation))
+        return [targets[sld_id.get(R_ID)] for sld_id in presentation.iterfind("p:sldIdLst/p:sldId", NS)]
+
+
+class _PackageMerger:
+    """
+    Copies parts from the sources into an output zip as they are reached,
+    remembering only content hashes and partnames of what was written.
+    """
+
+    def __init__(self, zf: zipfile.ZipFile):
+        self.zf = zf
+        self._names: Set[str] = set()
+        self._counters: Dict[Tuple[str, str, str], int] = {}
+        self._content_types: Dict[str, str] = {}
+        # (crc, size, content type) -> [(sha256, output partname)] for parts without relationships
+        self._blobs: Dict[Tuple[int, int, str], List[Tuple[str, str]]] = {}
+        # sha256 of content + relationships -> output partname, for parts with relationships
+        self._linked: Dict[str, str] = {}
+        # sha256 of a master with its layouts -> (output master, output layout per master rId)
+        self._designs: Dict[str, Tuple[str, Dict[str, str]]] = {}
+        self._masters: List[str] = []
+        self._layout_ids: Set[int] = set()
+        self._notes_master: Optional[str] = None
+        self._slides: List[str] = []
+        self._base = None
+        self.report = MergeReport(sources=0, slides=0, parts=0, parts_deduplicated=0,
+                                  layouts_deduplicated=0, bytes_deduplicated=0)
+
+    # --- Output ---------------------------------------------------------
+
+    def _allocate(self, partname: str) -> str:
+        """Output partname for a source part: the same name when free, else the next free number"""
+        if partname not in self._names:
+            self._names.add(partname)
+            return partname
+        folder, name = posixpath.split(partname)
+        stem, dot, extension = name.partition(".")
+        prefix = _TRAILING_NUMBER.sub("", stem)
+        key = (folder, prefix, extension)
+        number = self._counters.get(key, 1)
+        while True:
+            number += 1
+            candidate = posixpath.join(folder, f"{prefix}{number}{dot}{extension}")
+            if candidate not in self._names:
+                break
+        self._counters[key] = number
+        self._names.add(candidate)
+        return candidate
+
+    def _write(self, partname: str, content_type: str, data: bytes, rels: Optional[List[Rel]] = None):
+        level = part_compresslevel(partname)
+        self.zf.writestr(zip_info(partname, zipfile.ZIP_DEFLATED if level else zipfile.ZIP_STORED, level or None), data)
+        if rels:
+            self.zf.writestr(zip_info(_rels_name(partname)), _rels_xml(rels, partname))
+        self._content_types[partname] = content_type
+        self.report.parts += 1
+
+    def _stream(self, source: _Source, partname: str, target: str) -> str:
+        """Copy a part from the source zip in chunks; returns its sha256"""
+        info = source.zip.getinfo(partname)
+        level = part_compresslevel(target)
+        digest = hashlib.sha256()
+        with source.zip.open(info) as f, self.zf.open(
+            zip_info(target, zipfile.ZIP_DEFLATED if level else zipfile.ZIP_STORED, level or None),
+            "w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT
+        ) as member:
+            for chunk in iter(lambda: f.read(_CHUNK), b""):
+                digest.update(chunk)
+                member.write(chunk)
+        self._content_types[target] = source.content_type(partname)
+        self.report.parts += 1
+        return digest.hexdigest()
+
+    def _deduplicated(self, size: int) -> None:
+        self.report.parts_deduplicated += 1
+        self.report.bytes_deduplicated += size
+
+    # --- Relationship targets -------------------------------------------
+
+    def _map_rels(self, source: _Source, rels: List[Rel], fixed: Dict[str, str]) -> List[Rel]:
+        """
+        Output relationships of a part. Targets of kinds in `fixed` (e.g. the
+        slide of a notes slide) are given; the rest are copied first.
+        """
+        mapped = []
+        for rId, reltype, target, external in rels:
+            if not external:
+                kind = _kind(reltype)
+                if kind in fixed:
+                    target = fixed[kind]
+                elif source.exists(target):
+                    target = self._target(source, kind, target)
+                # else dangling in the source too: kept as it was
+            mapped.append((rId, reltype, target, external))
+        return mapped
+
+    def _target(self, source: _Source, kind: str, partname: str) -> str:
+        if kind == "slide" and partname in source.slides:
+            return source.slides[partname]
+        if kind == "slideLayout":
+            return self._layout(source, partname)
+        if kind == "slideMaster":
+            return self._design(source, partname)[0]
+        if kind == "notesMaster":
+            # A presentation has one notes master: every notes slide uses the first one
+            if self._notes_master is None:
+                self._notes_master = self._copy(source, partname)
+            return self._notes_master
+        return self._copy(source, partname)
+
+    # --- Parts ----------------------------------------------------------
+
+    def _copy(self, source: _Source, partname: str) -> str:
+        """
+        Copy a part (media, theme, chart, embedding...) and what it refers to,
+        or reuse an identical part already in the output
+        """
+        if partname in source.copied:
+            return source.copied[partname]
+        if partname in source.copying:
+            raise Exception(f"Relationship cycle through '{partname}' is not supported")
+        content_type = source.content_type(partname)
+        rels = source.rels(partname)
+        info = source.zip.getinfo(partname)
+
+        if not rels:
+            # Compare by CRC and size first, so most parts are read once (while copying)
+            candidates = self._blobs.setdefault((info.CRC, info.file_size, content_type), [])
+            output = None
+            if candidates:
+                digest = hashlib.sha256()
+                with source.zip.open(info) as f:
+                    for chunk in iter(lambda: f.read(_CHUNK), b""):
+                        digest.update(chunk)
+                output = next((name for sha256, name in candidates if sha256 == digest.hexdigest()), None)
+            if output is not None:
+                self._deduplicated(info.file_size)
+            else:
+                output = self._allocate(partname)
+                candidates.append((self._stream(source, partname, output), output))
+        else:
+            source.copying.add(partname)
+            mapped = self._map_rels(source, rels, {})
+            source.copying.discard(partname)
+            data = source.read(partname)
+            digest = hashlib.sha256(content_type.encode("utf-8") + b"\0" + data)
+            digest.update(repr(mapped).encode("utf-8"))
+            output = self._linked.get(digest.hexdigest())
+            if output is not None:
+                self._deduplicated(len(data))
+            else:
+                output = self._allocate(partname)
+                self._linked[digest.hexdigest()] = output
+                self._write(output, content_type, data, mapped)
+
+        source.copied[partname] = output
+        return output
+
+    def _design(self, source: _Source, master: str) -> Tuple[str, Dict[str, str]]:
+        """
+        Copy a slide master with its layouts, or reuse an identical master
+        already in the output
+
+        Returns:
+            (output master, output layout per source layout partname)
+        """
+        if master in source.designs:
+            return source.designs[master]
+        master_rels = source.rels(master)
+        layouts = [(rId, target) for rId, reltype, target, external in master_rels
+                   if not external and _kind(reltype) == "slideLayout"]
+        placeholders = {rId: f"#layout:{rId}" for rId, _ in layouts}
+
+        # Content hash of the whole design, with the master <-> layout links
+        # as placeholders (they are the only relationship cycle)
+        master_data = source.read(master)
+        digest = hashlib.sha256(master_data)
+        mapped_master = [
+            (rId, reltype, placeholders.get(rId, target), external)
+            for rId, reltype, target, external in self._map_rels(source, master_rels, {"slideLayout": ""})
+        ]
+        digest.update(repr(mapped_master).encode("utf-8"))
+        layout_parts = []
+        for rId, layout in layouts:
+            data = source.read(layout)
+            mapped = self._map_rels(source, source.rels(layout), {"slideMaster": "#master"})
+            digest.update(rId.encode("utf-8") + b"\0" + data + repr(mapped).encode("utf-8"))
+            layout_parts.append((rId, layout, data, mapped))
+        key = digest.hexdigest()
+
+        if key in self._designs:
+            output_master, output_layouts = self._designs[key]
+            self.report.layouts_deduplicated += len(layouts)
+            self._deduplicated(len(master_data) + sum(len(data) for _, _, data, _ in layout_parts))
+        else:
+            output_master = self._allocate(master)
+            output_layouts = {rId: self._allocate(layout) for rId, layout in layouts}
+            for rId, layout, data, mapped in layout_parts:
+                self._write(output_layouts[rId], source.content_type(layout), data, [
+                    (rel_id, reltype, output_master if target == "#master" else target, external)
+                    for rel_id, reltype, target, external in mapped
+                ])
+            self._write(output_master, source.content_type(master), self._renumber_layouts(master_data), [
+                (rel_id, reltype, output_layouts.get(rel_id, target), external)
+                for rel_id, reltype, target, external in mapped_master
+            ])
+            self._designs[key] = (output_master, output_layouts)
+            self._masters.append(output_master)
+
+        design = (output_master, {layout: output_layouts[rId] for rId, layout in layouts})
+        source.designs[master] = design
+        source.copied[master] = output_master
+        return design
+
+    def _renumber_layouts(self, master_data: bytes) -> bytes:
+        """Give the master's sldLayoutId ids new values when they clash with earlier masters"""
+        root = etree.fromstring(master_data)
+        layout_ids = root.findall("p:sldLayoutIdLst/p:sldLayoutId", NS)
+        if not any(int(element.get("id")) in self._layout_ids for element in layout_ids):
+            self._layout_ids.update(int(element.get("id")) for element in layout_ids)
+            return master_data
+        next_id = max(self._layout_ids) + 1
+        for element in layout_ids:
+            element.set("id", str(next_id))
+            self._layout_ids.add(next_id)
+            next_id += 1
+        return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+    def _layout(self, source: _Source, layout: str) -> str:
+        master = next((target for _, reltype, target, external in source.rels(layout)
+                       if not external and _kind(reltype) == "slideMaster"), None)
+        if master is None:
+            raise Exception(f"Layout '{layout}' has no slide master")
+        layouts = self._design(source, master)[1]
+        if layout not in layouts:
+            raise Exception(f"Layout '{layout}' is not listed by its slide master '{master}'")
+        return layouts[layout]
+
+    def _slide(self, source: _Source, slide: str):
+        output = source.slides[slide]
+        rels = source.rels(slide)
+        notes = {target for _, reltype, target, external in rels if not external and _kind(reltype) == "notesSlide"}
+        fixed = {}
+        for target in notes:
+            # Notes point back to their slide: copied with it, never shared
+            output_notes = self._allocate(target)
+            fixed["notesSlide"] = output_notes
+            self._write(output_notes, source.content_type(target), source.read(target), self._map_rels(
+                source, source.rels(target), {"slide": output}
+            ))
+        self._write(output, source.content_type(slide), source.read(slide), self._map_rels(source, rels, fixed))
+        self._slides.append(output)
+        self.report.slides += 1
+
+    # --- Sources --------------------------------------------------------
+
+    def add_base(self, source: _Source):
+        """
+        Start the output from the first package: its presentation properties,
+        masters (all of them, in order), notes master and document properties
+        """
+        presentation = etree.fromstring(source.read(source.presentation))
+        rels = source.rels(source.presentation)
+        targets = {rId: target for rId, _, target, _ in rels}
+        for master_id in presentation.iterfind("p:sldMasterIdLst/p:sldMasterId", NS):
+            self._design(source, targets[master_id.get(R_ID)])
+        mapped = self._map_rels(source, [
+            rel for rel in rels if _kind(rel[1]) not in ("slide", "slideMaster")
+        ], {})
+        package_rels = self._map_rels(source, [
+            rel for rel in source.rels("") if _kind(rel[1]) != "officeDocument"
+        ], {})
+        self._base = (source.presentation, source.content_type(source.presentation), presentation, mapped,
+                      package_rels + [(rId, reltype, target, external) for rId, reltype, target, external
+                                      in source.rels("") if _kind(reltype) == "officeDocument"])
+        self._names.add(source.presentation)
+
+    def add_slides(self, source: _Source):
+        """Append every slide of a package, in presentation order"""
+        slides = source.slide_partnames()
+        source.slides = {slide: self._allocate(slide) for slide in slides}
+        for slide in slides:
+            self._slide(source, slide)
+        self.report.sources += 1
+
+    def finish(self):
+        """Write presentation.xml with the new slide and master lists, the package rels and content types"""
+        partname, content_type, presentation, mapped, package_rels = self._base
+        p = f"{{{NS['p']}}}"
+
+        rels: List[Rel] = []
+        renamed = {}
+        for rId, reltype, target, external in mapped:
+            if _kind(reltype) == "notesMaster":
+                continue
+            renamed[rId] = f"rId{len(rels) + 1}"
+            rels.append((renamed[rId], reltype, target, external))
+
+        def relate(reltype: str, target: str) -> str:
+            rId = f"rId{len(rels) + 1}"
+            rels.append((rId, reltype, target, False))
+            return rId
+
+        # Custom shows and sections list the original slides only
+        for element in presentation.findall("p:custShowLst", NS):
+            presentation.remove(element)
+        for section_list in presentation.xpath(".//*[local-name()='sectionLst']"):
+            extension = section_list.getparent()
+            extension.getparent().remove(extension)
+        for element in presentation.iter():
+            for attribute, value in element.attrib.items():
+                if attribute.startswith(f"{{{NS['r']}}}") and value in renamed:
+                    element.set(attribute, renamed[value])
+
+        def replace_list(tag: str, after: Tuple[str, ...]) -> etree._Element:
+            for element in presentation.findall(p + tag):
+                presentation.remove(element)
+            new = etree.Element(p + tag)
+            position = 0
+            for index, child in enumerate(presentation):
+                if etree.QName(child).localname in after:
+                    position = index + 1
+            presentation.insert(position, new)
+            return new
+
+        master_list = replace_list("sldMasterIdLst", ())
+        next_id = max(self._layout_ids | {_FIRST_MASTER_ID - 1}) + 1
+        for master in self._masters:
+            etree.SubElement(master_list, p + "sldMasterId", {"id": str(next_id), R_ID: relate(RT.SLIDE_MASTER, master)})
+            next_id += 1
+        notes_list = replace_list("notesMasterIdLst", ("sldMasterIdLst",))
+        if self._notes_master is not None:
+            etree.SubElement(notes_list, p + "notesMasterId", {R_ID: relate(RT.NOTES_MASTER, self._notes_master)})
+        else:
+            presentation.remove(notes_list)
+        slide_list = replace_list("sldIdLst", ("sldMasterIdLst", "notesMasterIdLst", "handoutMasterIdLst"))
+        for index, slide in enumerate(self._slides):
+            etree.SubElement(slide_list, p + "sldId", {"id": str(_FIRST_SLIDE_ID + index), R_ID: relate(RT.SLIDE, slide)})
+        if not len(slide_list):
+            presentation.remove(slide_list)
+
+        self._write(partname, content_type, etree.tostring(
+            presentation, xml_declaration=True, encoding="UTF-8", standalone=True
+        ), rels)
+        self.zf.writestr(zip_info("_rels/.rels"), _rels_xml(package_rels, ""))
+
+        defaults = {"rels": "application/vnd.openxmlformats-package.relationships+xml", "xml": "application/xml"}
+        for name, content_type in self._content_types.items():
+            defaults.setdefault(name.rpartition(".")[2].lower(), content_type)
+        types = [f'<Default Extension={quoteattr(extension)} ContentType={quoteattr(content_type)}/>'
+                 for extension, content_type in defaults.items()]
+        types += [f'<Override PartName={quoteattr("/" + name)} ContentType={quoteattr(content_type)}/>'
+                  for name, content_type in self._content_types.items()
+                  if defaults[name.rpartition(".")[2].lower()] != content_type]
+        self.zf.writestr(zip_info("[Content_Types].xml"), (
+            _XML_DECLARATION + f'<Types xmlns="{CT_NS}">' + "".join(types) + "</Types>"
+        ).encode("utf-8"))
+
+
+def merge_packages(sources: List[Path], output: Path) -> MergeReport:
+    """
+    Append the slides of several .pptx packages into a new one.
+
+    The first package is the base: its slide size, properties, masters and
+    notes master are kept. Slides of every package follow in order, each
+    with what it refers to (layout, master, theme, media, charts, notes).
+    Slide XML is copied as is and only the relationships are rewritten.
+
+    Parts are written to `output` as they are reached, media copied in
+    chunks. Identical parts (by content hash, including what they refer
+    to) are written once, and so are identical masters with their layouts,
+    so memory and output size grow with the unique parts, not the inputs.
+
+    Args:
+        sources: Package paths, in order
+        output: Path of the merged package
+
+    Returns:
+        MergeReport with what was written and deduplicated
+    """
+    with zipfile.ZipFile(output, "w") as zf:
+        merger = _PackageMerger(zf)
+        for index, path in enumerate(sources):
+            source = _Source(path)
+            try:
+                if index == 0:
+                    merger.add_base(source)
+                merger.add_slides(source)
+            finally:
+                source.close()
+        merger.finish()
+    return merger.report
@@ -0,0 +1,88 @@
+"""
+Read-only access to the parts of a .pptx package without python-pptx
+"""
+import posixpath
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from lxml import etree
+
+
+NS = {
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "pr": "http://schemas.openxmlformats.org/package/2006/relationships",
+}
+R_ID = f"{{{NS['r']}}}id"
+R_EMBED = f"{{{NS['r']}}}embed"
+RT_LAYOUT = "/slideLayout"
+RT_MASTER = "/slideMaster"
+RT_NOTES = "/notesSlide"
+
+PRESENTATION_PART = "ppt/presentation.xml"
+
+
+class PackageReader:
+    """Minimal read-only view of a .pptx zip: part bytes and relationships"""
+
+    def __init__(self, path: Path):
+        self.zip = zipfile.ZipFile(path)
+        self._xml: Dict[str, etree._Element] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.zip.close()
+
+    def read(self, partname: str) -> bytes:
+        return self.zip.read(partname)
+
+    def crc(self, partname: str) -> int:
+        return self.zip.getinfo(partname).CRC
+
+    def xml(self, partname: str):
+        if partname not in self._xml:
+            self._xml[partname] = etree.fromstring(self.read(partname))
+        return self._xml[partname]
+
+    def rels_name(self, partname: str) -> str:
+        folder, name = posixpath.split(partname)
+        return posixpath.join(folder, "_rels", name + ".rels")
+
+    def rels(self, partname: str) -> Dict[str, Tuple[str, str]]:
+        """rId -> (reltype, target partname) for internal relationships"""
+        name = self.rels_name(partname)
+        if name not in self.zip.NameToInfo:
+            return {}
+        folder = posixpath.dirname(partname)
+        rels = {}
+        for rel in self.xml(name).iterfind("pr:Relationship", NS):
+            if rel.get("TargetMode") == "External":
+                continue
+            target = posixpath.normpath(posixpath.join(folder, rel.get("Target")))
+            rels[rel.get("Id")] = (rel.get("Type"), target.lstrip("/"))
+        return rels
+
+    def related(self, partname: str, reltype_suffix: str) -> Optional[str]:
+        for reltype, target in self.rels(partname).values():
+            if reltype.endswith(reltype_suffix):
+                return target
+        return None
+
+    def slide_partnames(self) -> List[str]:
+        """Slide partnames in presentation order"""
+        rels = self.rels(PRESENTATION_PART)
+        sld_ids = self.xml(PRESENTATION_PART).iterfind("p:sldIdLst/p:sldId", NS)
+        return [rels[sld_id.get(R_ID)][1] for sld_id in sld_ids]
+
+    def partnames(self, folder: str) -> List[str]:
+        """XML parts directly inside `folder` (e.g. 'ppt/slideLayouts'), in numeric order"""
+        prefix = folder.rstrip("/") + "/"
+        names = [
+            name for name in self.zip.namelist()
+            if name.startswith(prefix) and name.endswith(".xml") and "/" not in name[len(prefix):]
+        ]
+        return sorted(names, key=lambda name: (len(name), name))
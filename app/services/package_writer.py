@@ -0,0 +1,253 @@
+"""
+Deterministic, parallel saving of python-pptx presentations
+"""
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, List, NamedTuple, Optional, Tuple, Union
+
+from pptx.opc.serialized import PackageWriter, _ZipPkgWriter
+
+from app.config import settings
+from app.services.media_parts import FileMediaPart, ZipMediaPart
+
+
+# Fixed timestamp for every zip member (the earliest date zip can store)
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+def zip_info(name: str, compress_type: int = zipfile.ZIP_DEFLATED,
+             compresslevel: Optional[int] = None) -> zipfile.ZipInfo:
+    """ZipInfo with a fixed timestamp and permissions, so equal content gives equal bytes"""
+    info = zipfile.ZipInfo(name, date_time=ZIP_EPOCH)
+    info.compress_type = compress_type
+    info.external_attr = 0o644 << 16
+    if compresslevel is not None:
+        # Only ZipFile.open() reads the level from the ZipInfo
+        info._compresslevel = compresslevel
+    return info
+
+
+# DOS date/time of ZIP_EPOCH as stored in zip headers
+_DOS_TIME = 0
+_DOS_DATE = (1 << 5) | 1
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+
+# Parts below this size are compressed inline: not worth a thread handoff
+_PARALLEL_MIN_SIZE = 64 * 1024
+
+# Chunk size for parts streamed from files
+_CHUNK = 1024 * 1024
+
+
+class _FileSource(NamedTuple):
+    """
+    Content of a member that stays in a file or in the source zip (see
+    media_parts.FileMediaPart and ZipMediaPart); crc is None when unknown
+    """
+    open: Callable[[], BinaryIO]
+    size: int
+    crc: Optional[int]
+
+
+def _source_size(source: Union[bytes, _FileSource]) -> int:
+    return source.size if isinstance(source, _FileSource) else len(source)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by all saves (zlib releases the GIL while compressing)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ZIP_COMPRESS_WORKERS, thread_name_prefix="zip-compress"
+            )
+        return _executor
+
+
+def part_compresslevel(membername: str) -> int:
+    """
+    Deflate level for a package member; 0 means stored uncompressed.
+
+    Already-compressed media (by extension) is stored: deflating a JPEG or
+    an MP4 costs CPU and saves nothing.
+    """
+    extension = membername.rpartition(".")[2].lower()
+    if extension in settings.ZIP_STORED_EXTENSIONS:
+        return 0
+    if extension in ("xml", "rels", "vml"):
+        return settings.ZIP_XML_COMPRESSLEVEL
+    return settings.ZIP_BINARY_COMPRESSLEVEL
+
+
+def _compress(blob: bytes, level: int) -> Tuple[int, int, bytes]:
+    """(compress_type, crc32, data) for one member"""
+    crc = zlib.crc32(blob)
+    if level == 0:
+        return zipfile.ZIP_STORED, crc, blob
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return zipfile.ZIP_DEFLATED, crc, compressor.compress(blob) + compressor.flush()
+
+
+def _compress_file(source: _FileSource, level: int) -> Tuple[int, int, BinaryIO]:
+    """
+    (compress_type, crc32, file with the data) for a member streamed from a
+    file: the source itself when stored, a temporary file with the deflated
+    data otherwise. The caller closes the returned file.
+    """
+    if level == 0:
+        crc = source.crc
+        if crc is None:
+            crc = 0
+            with source.open() as f:
+                for chunk in iter(lambda: f.read(_CHUNK), b""):
+                    crc = zlib.crc32(chunk, crc)
+        return zipfile.ZIP_STORED, crc, source.open()
+    crc = 0
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    data = tempfile.TemporaryFile()
+    with source.open() as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            crc = zlib.crc32(chunk, crc)
+            data.write(compressor.compress(chunk))
+    data.write(compressor.flush())
+    data.seek(0)
+    return zipfile.ZIP_DEFLATED, crc, data
+
+
+class _ParallelZipWriter(_ZipPkgWriter):
+    """
+    Collects the parts, compresses them on the shared thread pool and writes
+    the archive (fixed timestamps, members in write order) on exit. Members
+    given as a _FileSource are read from their source in chunks.
+    """
+
+    def __init__(self, pkg_file):
+        super().__init__(pkg_file)
+        self._members: List[Tuple[str, Union[bytes, _FileSource]]] = []
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if exc_type is None:
+            self._write_archive()
+
+    def write(self, pack_uri, blob):
+        self._members.append((pack_uri.membername, blob))
+
+    def _write_archive(self):
+        total = sum(_source_size(source) for _, source in self._members)
+        if total >= 0xFFFFFFFF or len(self._members) >= 0xFFFF:
+            # Needs zip64 records: let zipfile write it (serially)
+            with zipfile.ZipFile(self._pkg_file, "w") as zf:
+                for name, source in self._members:
+                    level = part_compresslevel(name)
+                    compress_type = zipfile.ZIP_DEFLATED if level else zipfile.ZIP_STORED
+                    info = zip_info(name, compress_type, level or None)
+                    if isinstance(source, _FileSource):
+                        with source.open() as f, zf.open(info, "w", force_zip64=True) as member:
+                            shutil.copyfileobj(f, member, _CHUNK)
+                    else:
+                        zf.writestr(info, source)
+            return
+
+        executor = _get_executor()
+        results = []
+        for name, source in self._members:
+            level = part_compresslevel(name)
+            if isinstance(source, _FileSource):
+                results.append(executor.submit(_compress_file, source, level))
+            elif level and len(source) >= _PARALLEL_MIN_SIZE:
+                results.append(executor.submit(_compress, source, level))
+            else:
+                results.append(_compress(source, level))
+
+        if isinstance(self._pkg_file, str):
+            with open(self._pkg_file, "wb") as f:
+                self._write_members(f, results)
+        else:
+            self._write_members(self._pkg_file, results)
+
+    def _write_members(self, f, results):
+        offset = 0
+        central = []
+        for (name, source), result in zip(self._members, results):
+            compress_type, crc, data = result if isinstance(result, tuple) else result.result()
+            size = _source_size(source)
+            if isinstance(data, bytes):
+                data_size = len(data)
+            elif compress_type == zipfile.ZIP_STORED:
+                data_size = size
+            else:
+                data_size = data.seek(0, os.SEEK_END)
+                data.seek(0)
+            encoded = name.encode("utf-8")
+            flags = 0 if encoded.isascii() else 0x800
+            f.write(_LOCAL_HEADER.pack(
+                b"PK\x03\x04", 20, flags, compress_type, _DOS_TIME, _DOS_DATE,
+                crc, data_size, size, len(encoded), 0
+            ))
+            f.write(encoded)
+            if isinstance(data, bytes):
+                f.write(data)
+            else:
+                with data:
+                    shutil.copyfileobj(data, f, _CHUNK)
+            central.append(_CENTRAL_HEADER.pack(
+                b"PK\x01\x02", (3 << 8) | 20, 20, flags, compress_type, _DOS_TIME, _DOS_DATE,
+                crc, data_size, size, len(encoded), 0, 0, 0, 0, 0o644 << 16, offset
+            ) + encoded)
+            offset += _LOCAL_HEADER.size + len(encoded) + data_size
+
+        directory = b"".join(central)
+        f.write(directory)
+        f.write(_END_RECORD.pack(b"PK\x05\x06", 0, 0, len(central), len(central), len(directory), offset, 0))
+
+
+class _DeterministicPackageWriter(PackageWriter):
+    def _write(self):
+        with _ParallelZipWriter(self._pkg_file) as phys_writer:
+            self._write_content_types_stream(phys_writer)
+            self._write_pkg_rels(phys_writer)
+            self._write_parts(phys_writer)
+
+    def _write_parts(self, phys_writer):
+        for part in self._parts:
+            if isinstance(part, (FileMediaPart, ZipMediaPart)):
+                phys_writer.write(part.partname, _FileSource(part.open, part.size, part.crc))
+            else:
+                phys_writer.write(part.partname, part.blob)
+            if part._rels:
+                phys_writer.write(part.partname.rels_uri, part.rels.xml)
+
+
+def save_presentation(prs, pkg_file):
+    """
+    Save a presentation like Presentation.save(), but reproducibly.
+
+    python-pptx already writes parts in relationship-graph order and names new
+    parts deterministically; the only varying bytes are the zip member
+    timestamps, which are fixed here. The same template and the same
+    operations therefore produce byte-identical files.
+
+    Large parts are deflated in parallel, at ZIP_XML_COMPRESSLEVEL for XML
+    and ZIP_BINARY_COMPRESSLEVEL for other binaries; media listed in
+    ZIP_STORED_EXTENSIONS is stored as is. Videos inserted with
+    media_parts.add_movie, and media of presentations opened with
+    media_parts.open_presentation, are copied in chunks.
+
+    Args:
+        prs: python-pptx Presentation
+        pkg_file: Path (str) or writable binary stream
+    """
+    package = prs.part.package
+    _DeterministicPackageWriter.write(pkg_file, package._rels, tuple(package.iter_parts()))
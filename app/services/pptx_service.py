@@ -1,43 +1,108 @@
 """
 PPTX service for PowerPoint presentation manipulation using python-pptx
 """
+import copy
+import os
 import re
+from collections import Counter
 from pathlib import Path
-from typing import List, Optional, Set
+from xml.sax.saxutils import escape as xml_escape
+from typing import Dict, Iterator, List, Optional, Tuple
+from fastapi import HTTPException
+from lxml import etree
 from pptx import Presentation
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn
+from pptx.parts.chart import ChartPart
+from pptx.parts.embeddedpackage import EmbeddedXlsxPart
+from pptx.parts.slide import SlidePart
+from pptx.shapes.group import GroupShape
 from pptx.enum.shapes import MSO_SHAPE_TYPE
-from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
-from pptx.util import Pt
+from pptx.enum.text import PP_ALIGN, MSO_ANCHOR, MSO_AUTO_SIZE
+from pptx.util import Length, Pt
 from pptx.dml.color import RGBColor
 
 from app.models.schemas import (
-    VariableInfo,
+    CompactionReport,
+    MergeReport,
+    PresentationValidation,
+    SkippedOperation,
     TemplateVariables,
+    VariableInfo,
     TextFormatting
 )
-from app.models.enums import TextAlignment, VerticalAlignment
+from app.config import settings
+from app.models.enums import ImageFit, MediaKind, TextAlignment, VerticalAlignment
+from app.services import chart_xml
+from app.services.admission import estimate_cost
 from app.services.file_service import FileService
+from app.services.media_parts import add_movie, open_presentation
+from app.services.oplog_service import MEDIA_DIR, MEDIA_FIELDS, OpLogService
+from app.services.output_cache import OutputCache
+from app.services.package_gc import compact_package
+from app.services.package_merge import merge_packages
+from app.services.package_writer import save_presentation
+from app.services.package_reader import NS
+from app.services.template_cache import get_template_cache
+from app.services.text_fit import fit_font_size
+from app.services.tracing import span
+from app.services.variable_scanner import VariableScanner
+
+
+# Namespace prefix of relationship-id attributes (r:id, r:embed, r:link, ...)
+R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+# Private-use character marking where cell values go in a serialized table row
+CELL_MARK = "\ue000"
+
+# Operations that fail when their variable is not in the deck, and the scanned
+# variable types that can satisfy them (a bare {{name}} Alt Text scans as image)
+OP_VARIABLE_TYPES = {
+    "image": ("image",),
+    "video": ("image", "video"),
+    "table": ("table",),
+    "chart": ("chart",),
+    "repeat": ("repeat",),
+}
+
+# Operations that remove their marker once applied, so the same variable
+# cannot be filled twice by them
+CONSUMING_OPS = {"image": "media", "video": "media", "repeat": "repeat"}
 
 
 class PPTXService:
     """Service for PowerPoint presentation operations using curly brace variables"""
     
-    def __init__(self, file_service: FileService):
+    # python-pptx default row height (0.4 in) for rows without an explicit height
+    DEFAULT_ROW_HEIGHT = 370840
+    
+    def __init__(self, file_service: FileService, storage_mode: Optional[str] = None):
         """
         Initialize PPTX service
         
         Args:
             file_service: File service instance
+            storage_mode: "file" or "oplog" for new presentations (defaults to settings)
         """
         self.file_service = file_service
+        self.oplog = OpLogService(file_service)
+        self.output_cache = OutputCache(file_service, settings.OUTPUT_CACHE_MAX_BYTES)
+        self.template_cache = get_template_cache(file_service)
+        self.storage_mode = storage_mode or settings.PRESENTATION_STORAGE
         self.var_regex = re.compile(r"\{\{(.*?)\}\}")
     
+    def __reduce__(self):
+        # Rebuilt from its settings when sent to a worker process (see deadline.py)
+        return (PPTXService, (self.file_service, self.storage_mode))
+    
     def _get_alt_text(self, shape) -> Optional[str]:
         """Helper to extract Alt Text from a shape's XML"""
         try:
             # Look for cNvPr element which contains the non-visual properties (including Alt Text)
-            # It's usually a child of nvSpPr, nvPicPr, etc.
-            cNvPr = shape._element.find('.//p:cNvPr', namespaces=shape._element.nsmap)
+            # It's a child of nvSpPr, nvPicPr, nvGrpSpPr, etc. Only the shape's own one:
+            # a descendant search would return a grouped child's Alt Text for a group
+            cNvPr = shape._element.find('./*/p:cNvPr', namespaces=NS)
             
             if cNvPr is not None:
                 # Alt Text can be in 'descr' or 'title' attributes
@@ -49,10 +114,62 @@ class PPTXService:
             pass
         return None
 
+    def _iter_text_frames(self, shape) -> Iterator:
+        """Yield the text frame of a shape, of every cell if it is a table, or of every grouped shape"""
+        if isinstance(shape, GroupShape):
+            for child in shape.shapes:
+                yield from self._iter_text_frames(child)
+        elif shape.has_text_frame:
+            yield shape.text_frame
+        elif shape.has_table:
+            for row in shape.table.rows:
+                for cell in row.cells:
+                    yield cell.text_frame
+
+    def _replace_variables(self, shapes, values: Dict[str, str], formatting: Optional[TextFormatting] = None) -> bool:
+        """
+        Replace {{name}} with values[name] in the text of the given shapes, in one pass.
+
+        Paragraphs that ONLY contain a variable get the value as their whole text
+        (and the optional formatting); in mixed paragraphs the variables are
+        replaced in place. Returns whether anything was replaced.
+        """
+        replaced = False
+        for shape in shapes:
+            for text_frame in self._iter_text_frames(shape):
+                frame_replaced = False
+                for paragraph in text_frame.paragraphs:
+                    paragraph_text = paragraph.text
+                    if "{{" not in paragraph_text:
+                        continue
+                    names = [name for name in self.var_regex.findall(paragraph_text) if name in values]
+                    if not names:
+                        continue
+                    replaced = frame_replaced = True
+                    
+                    if len(names) == 1 and paragraph_text.strip() == "{{" + names[0] + "}}":
+                        paragraph.text = values[names[0]]
+                        if formatting:
+                            self._apply_paragraph_formatting(paragraph, formatting)
+                    else:
+                        # Mixed text: simple replacement
+                        # Note: this might lose some run-level formatting if the variable spans runs
+                        paragraph.text = self.var_regex.sub(
+                            lambda m: values.get(m.group(1), m.group(0)), paragraph_text
+                        )
+                if frame_replaced and formatting:
+                    self._apply_frame_formatting(text_frame, formatting)
+        return replaced
+
     def get_template_variables(self, template_id: str) -> TemplateVariables:
         """
         Get all {{variable}} patterns from a template
         
+        Slides, speaker notes, layouts and masters are scanned straight from
+        the package XML (see VariableScanner), including grouped shapes and
+        table cells. The result is shared by all workers of the host through
+        the template cache until the template changes.
+        
         Args:
             template_id: Template ID
             
@@ -61,77 +178,361 @@ class PPTXService:
         """
         template_path = self.file_service.get_template_path(template_id)
         
-        try:
-            prs = Presentation(str(template_path))
-        except Exception as e:
-            raise Exception(f"Failed to load template: {str(e)}")
-        
-        variables: List[VariableInfo] = []
-        seen_vars: Set[str] = set()
-
-        for slide_idx, slide in enumerate(prs.slides):
-            for shape in slide.shapes:
-                # 1. Check Text variables
-                if shape.has_text_frame:
-                    for paragraph in shape.text_frame.paragraphs:
-                        matches = self.var_regex.findall(paragraph.text)
-                        for match in matches:
-                            var_key = f"text:{match}:{slide_idx}"
-                            if var_key not in seen_vars:
-                                variables.append(VariableInfo(
-                                    name=match,
-                                    type="text",
-                                    slide_index=slide_idx
-                                ))
-                                seen_vars.add(var_key)
-
-                # 2. Check variables in Alt Text (Image or Video)
-                alt_text = self._get_alt_text(shape)
-                if alt_text:
-                    matches = self.var_regex.findall(alt_text)
-                    for match in matches:
-                        var_type = "image"
-                        clean_match = match
-                        
-                        if match.startswith("image:"):
-                            clean_match = match.replace("image:", "", 1)
-                            var_type = "image"
-                        elif match.startswith("video:"):
-                            clean_match = match.replace("video:", "", 1)
-                            var_type = "video"
-                        
-                        var_key = f"{var_type}:{clean_match}:{slide_idx}"
-                        if var_key not in seen_vars:
-                            variables.append(VariableInfo(
-                                name=clean_match,
-                                type=var_type,
-                                slide_index=slide_idx
-                            ))
-                            seen_vars.add(var_key)
-        
         return TemplateVariables(
             template_id=template_id,
-            variables=variables
+            variables=self._template_variables(template_path)
+        )
+    
+    def _template_variables(self, template_path: Path) -> List[VariableInfo]:
+        """Variables of a template package, scanned once per version (see template_cache.artifact)"""
+        def scan():
+            return [v.model_dump() for v in VariableScanner().scan(self.template_cache.open(template_path))]
+        
+        with span("pptx.scan", **{"pptx.package_bytes": template_path.stat().st_size}) as scan_span:
+            try:
+                variables = [VariableInfo(**v) for v in self.template_cache.artifact(template_path, "variables", scan)]
+            except Exception as e:
+                raise Exception(f"Failed to scan template: {str(e)}")
+            scan_span.set_attribute("pptx.variables", len(variables))
+        return variables
+    
+    def validate_presentation(self, presentation_id: str) -> PresentationValidation:
+        """
+        List the variables still present in a filled presentation
+        
+        Table and chart markers are not reported: they identify the shape
+        and are kept when its data is filled. For operation-log presentations
+        the logged operations that failed while building are reported too.
+        
+        Args:
+            presentation_id: Presentation ID
+            
+        Returns:
+            PresentationValidation object
+        """
+        presentation_path = self.materialize(presentation_id)
+        
+        with span("pptx.scan", **{"pptx.package_bytes": presentation_path.stat().st_size}) as scan_span:
+            try:
+                variables = VariableScanner().scan(presentation_path)
+            except Exception as e:
+                raise Exception(f"Failed to scan presentation: {str(e)}")
+            scan_span.set_attribute("pptx.variables", len(variables))
+        
+        # Table and chart Alt Text markers stay on the shape after filling
+        unresolved = [v for v in variables if v.type not in ("table", "chart")]
+        skipped = []
+        if self.oplog.exists(presentation_id):
+            skipped = [SkippedOperation(**entry) for entry in self.oplog.skipped(presentation_id)]
+        
+        return PresentationValidation(
+            presentation_id=presentation_id,
+            valid=not unresolved and not skipped,
+            unresolved=unresolved,
+            skipped_operations=skipped
         )
     
     def create_presentation(self, template_id: str, presentation_id: str) -> str:
-        """Create a new presentation from a template"""
+        """
+        Create a new presentation from a template
+        
+        In "oplog" storage mode this only records a reference to the template;
+        the deck is built on download or finalize (see materialize).
+        """
         template_path = self.file_service.get_template_path(template_id)
         
-        try:
-            prs = Presentation(str(template_path))
-        except Exception as e:
-            raise Exception(f"Failed to load template: {str(e)}")
+        if self.storage_mode == "oplog":
+            return str(self.oplog.create(template_path, template_id, presentation_id))
+        
+        prs = self._load(template_path, "template")
         
         output_path = self.file_service.create_presentation_path(presentation_id)
         
         try:
-            prs.save(str(output_path))
+            self._save(prs, output_path)
+            self.file_service.save_presentation(presentation_id)
         except Exception as e:
             raise Exception(f"Failed to save presentation: {str(e)}")
         
         return str(output_path)
     
+    def merge_presentations(self, presentation_ids: List[str], presentation_id: str) -> MergeReport:
+        """
+        Create a presentation with the slides of several others, in order
+        
+        Works on the packages directly (see package_merge.py): slides are
+        copied part by part and identical media and layouts are stored once.
+        The result is a file presentation in every storage mode.
+        
+        Args:
+            presentation_ids: Presentations to merge; the first one is the base
+            presentation_id: ID of the new presentation
+            
+        Returns:
+            MergeReport
+        """
+        sources = [self.materialize(source_id) for source_id in presentation_ids]
+        output_path = self.file_service.create_presentation_path(presentation_id)
+        tmp_path = output_path.with_name(f"{output_path.name}.{os.getpid()}.{self.file_service.generate_id()}.tmp")
+        
+        with span("pptx.merge", **{"pptx.sources": len(sources)}) as merge_span:
+            try:
+                report = merge_packages(sources, tmp_path)
+                tmp_path.replace(output_path)
+                self.file_service.save_presentation(presentation_id)
+            except Exception as e:
+                tmp_path.unlink(missing_ok=True)
+                raise Exception(f"Failed to merge presentations: {str(e)}")
+            merge_span.set_attributes({
+                "pptx.slides": report.slides,
+                "pptx.parts_deduplicated": report.parts_deduplicated,
+                "pptx.package_bytes": output_path.stat().st_size,
+            })
+        
+        return report
+    
+    def materialize(self, presentation_id: str) -> Path:
+        """
+        Get the .pptx file of a presentation, building it if needed
+        
+        For operation-log presentations the template is loaded once, every
+        logged operation applied in order and the result saved once. The file
+        is reused until the next operation is appended. Saves are
+        deterministic, so builds are also memoized across presentations in
+        the output cache, keyed by template, operations and media content.
+        
+        An operation that fails is left out of the build (and recorded for
+        validate_presentation) instead of making every build fail.
+        
+        Args:
+            presentation_id: Presentation ID
+            
+        Returns:
+            Path to the presentation file
+        """
+        if not self.oplog.exists(presentation_id):
+            return self.file_service.get_presentation_path(presentation_id)
+        
+        cached = self.oplog.cached_output(presentation_id)
+        if cached:
+            return cached
+        
+        # One build at a time per presentation; a build finished meanwhile is reused
+        with self.file_service.lock_presentation(presentation_id):
+            cached = self.oplog.cached_output(presentation_id)
+            if cached:
+                return cached
+            
+            operations, log_size = self.oplog.read(presentation_id)
+            with span("pptx.materialize", **{"pptx.operations": len(operations)}) as build_span:
+                template_path = self.oplog.template_path(presentation_id)
+                output_path = self.file_service.create_presentation_path(presentation_id)
+                
+                # Identical template + operations + media were already built: reuse that file
+                cache_key = None
+                if self.output_cache.enabled:
+                    cache_key = self.output_cache.key(template_path, operations, MEDIA_FIELDS)
+                    if self.output_cache.get(cache_key, output_path):
+                        build_span.set_attribute("pptx.output_cache_hit", True)
+                        self.oplog.mark_built(presentation_id, log_size)
+                        return output_path
+                
+                prs = self._load(template_path, "template")
+                
+                skipped = []
+                for index, operation in enumerate(operations):
+                    try:
+                        self._apply(prs, operation)
+                    except Exception as e:
+                        skipped.append({
+                            "index": index,
+                            "op": operation.get("op"),
+                            "variable_name": operation.get("variable_name"),
+                            "error": str(e),
+                        })
+                self._auto_compact(prs)
+                build_span.set_attribute("pptx.operations_skipped", len(skipped) or None)
+                
+                try:
+                    self._save(prs, output_path)
+                except Exception as e:
+                    raise Exception(f"Failed to save presentation: {str(e)}")
+                
+                # Only clean builds are shared: a cache hit carries no skipped operations
+                if cache_key and not skipped:
+                    self.output_cache.put(cache_key, output_path)
+                self.oplog.mark_built(presentation_id, log_size, skipped)
+                return output_path
+    
+    def estimate_cost(
+        self,
+        operation: str,
+        presentation_id: Optional[str] = None,
+        template_id: Optional[str] = None,
+        media_paths: Tuple = ()
+    ) -> int:
+        """
+        Estimated peak memory of an operation, for admission control
+        
+        Args:
+            operation: Operation name (see admission.COST_FACTORS)
+            presentation_id: Presentation the operation loads
+            template_id: Template the operation loads (create, scan)
+            media_paths: Media files the operation inserts
+            
+        Returns:
+            Cost in bytes; 0 when nothing is loaded (operation-log appends,
+            already built decks)
+        """
+        media_bytes = sum(Path(path).stat().st_size for path in media_paths if path)
+        
+        if template_id is not None:
+            if operation == "create" and self.storage_mode == "oplog":
+                return 0
+            # Sizes recorded at upload: no need to fetch the package to estimate
+            stats = self.file_service.get_template_stats(template_id)
+            if stats is not None:
+                return estimate_cost(operation, stats.package_bytes, media_bytes)
+            package_path = self.file_service.get_template_path(template_id)
+        elif self.oplog.exists(presentation_id):
+            if operation not in ("materialize", "preview", "merge"):
+                return 0
+            built = self.oplog.cached_output(presentation_id)
+            if built and operation == "materialize":
+                return 0
+            package_path = built or self.oplog.template_path(presentation_id)
+            media_dir = self.file_service.get_oplog_dir(presentation_id) / MEDIA_DIR
+            media_bytes += sum(path.stat().st_size for path in media_dir.iterdir())
+        else:
+            package_path = self.file_service.get_presentation_path(presentation_id)
+        
+        return estimate_cost(operation, package_path.stat().st_size, media_bytes)
+    
+    def _edit(self, presentation_id: str, operation: Dict):
+        """
+        Apply one operation to a presentation.
+        
+        File presentations are loaded, edited and saved; operation-log
+        presentations just get the operation appended (returns None), once
+        _check_logged finds it can be applied. Either way the presentation
+        is locked meanwhile (see FileService.lock_presentation), so concurrent
+        edits do not lose each other's changes.
+        """
+        with self.file_service.lock_presentation(presentation_id):
+            if self.oplog.exists(presentation_id):
+                self._check_logged(presentation_id, operation)
+                self.oplog.append(presentation_id, operation)
+                return None
+            
+            presentation_path = self.file_service.get_presentation_path(presentation_id)
+            
+            prs = self._load(presentation_path, "presentation")
+            
+            result = self._apply(prs, operation)
+            self._auto_compact(prs)
+            
+            try:
+                self._save(prs, presentation_path)
+                self.file_service.save_presentation(presentation_id)
+            except Exception as e:
+                raise Exception(f"Failed to save presentation: {str(e)}")
+            
+            return result
+    
+    def _check_logged(self, presentation_id: str, operation: Dict):
+        """
+        Reject an operation that could never be applied to an operation-log
+        presentation, before it is appended.
+        
+        The variable must be in the slides of the presentation's template
+        (cached scan) and, for operations that consume their marker, not
+        already filled by an earlier logged operation.
+        
+        Raises:
+            HTTPException: 422 if the operation cannot be applied
+        """
+        op = operation["op"]
+        if getattr(self, f"_apply_{op}", None) is None:
+            raise HTTPException(status_code=422, detail=f"Unknown operation '{op}'")
+        if op == "chart":
+            try:
+                self._check_chart_series(operation["categories"], operation["series"])
+            except Exception as e:
+                raise HTTPException(status_code=422, detail=str(e))
+        
+        types = OP_VARIABLE_TYPES.get(op)
+        if types is None:
+            return
+        name = operation["variable_name"]
+        variables = self._template_variables(self.oplog.template_path(presentation_id))
+        if not any(v.name == name and v.type in types and v.part_type == "slide" for v in variables):
+            raise HTTPException(
+                status_code=422,
+                detail=f"No {op} variable '{name}' in the slides of the presentation's template"
+            )
+        
+        if op in CONSUMING_OPS:
+            operations, _ = self.oplog.read(presentation_id)
+            if any(CONSUMING_OPS.get(logged["op"]) == CONSUMING_OPS[op] and logged.get("variable_name") == name
+                   for logged in operations):
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Variable '{name}' was already filled by an earlier {op} operation"
+                )
+    
+    def _load(self, path: Path, source: str):
+        """
+        Open a template (through the shared template cache) or a presentation
+        
+        Args:
+            path: Package path
+            source: "template" or "presentation" (also used in the error message)
+        """
+        with span("pptx.load", **{"pptx.source": source, "pptx.package_bytes": path.stat().st_size}) as load_span:
+            try:
+                if source == "template":
+                    prs = Presentation(self.template_cache.open(path))
+                else:
+                    # Media stays in the file until _save streams it to the replacement
+                    prs = open_presentation(str(path))
+            except Exception as e:
+                raise Exception(f"Failed to load {source}: {str(e)}")
+            load_span.set_attribute("pptx.slides", len(prs.slides))
+        return prs
+    
+    def _save(self, prs, path: Path):
+        """
+        Save a presentation atomically: write "<name>.<pid>.<id>.tmp" next to
+        it and rename it into place, so an interrupted or killed save never
+        leaves a truncated file (see deadline.py for the cleanup of the tmp)
+        """
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{self.file_service.generate_id()}.tmp")
+        with span("pptx.save", **{"pptx.slides": len(prs.slides)}) as save_span:
+            try:
+                save_presentation(prs, str(tmp_path))
+                save_span.set_attribute("pptx.package_bytes", tmp_path.stat().st_size)
+                tmp_path.replace(path)
+            except Exception:
+                tmp_path.unlink(missing_ok=True)
+                raise
+    
+    def _apply(self, prs, operation: Dict):
+        """Dispatch an operation ({"op": name, **arguments}) to its _apply_<name> method"""
+        arguments = dict(operation)
+        op = arguments.pop("op")
+        apply = getattr(self, f"_apply_{op}", None)
+        if apply is None:
+            raise Exception(f"Unknown operation '{op}'")
+        if isinstance(arguments.get("formatting"), dict):
+            arguments["formatting"] = TextFormatting(**arguments["formatting"])
+        media_bytes = sum(os.path.getsize(arguments[field]) for field in MEDIA_FIELDS if arguments.get(field))
+        with span("pptx.apply", **{
+            "pptx.operation": op,
+            "pptx.variable": arguments.get("variable_name"),
+            "pptx.media_bytes": media_bytes or None,
+        }):
+            return apply(prs, **arguments)
+    
     def insert_text(
         self,
         presentation_id: str,
@@ -142,62 +543,65 @@ class PPTXService:
         """
         Global search and replace for {{variable_name}}
         """
-        presentation_path = self.file_service.get_presentation_path(presentation_id)
-        
-        try:
-            prs = Presentation(str(presentation_path))
-        except Exception as e:
-            raise Exception(f"Failed to load presentation: {str(e)}")
-        
-        target = "{{" + variable_name + "}}"
+        return self._edit(presentation_id, {
+            "op": "text",
+            "variable_name": variable_name,
+            "text": text,
+            "formatting": formatting
+        })
+
+    def _apply_text(
+        self,
+        prs,
+        variable_name: str,
+        text: str,
+        formatting: Optional[TextFormatting] = None
+    ) -> bool:
         replaced = False
-        
         for slide in prs.slides:
-            for shape in slide.shapes:
-                if shape.has_text_frame:
-                    # Check if the target is in the text frame at all
-                    if target in shape.text_frame.text:
-                        replaced = True
-                        # Replace in each paragraph to preserve formatting as much as possible
-                        for paragraph in shape.text_frame.paragraphs:
-                            if target in paragraph.text:
-                                # If the paragraph ONLY contains the variable, we can apply global formatting
-                                if paragraph.text.strip() == target:
-                                    paragraph.text = text
-                                    if formatting:
-                                        self._apply_paragraph_formatting(paragraph, formatting)
-                                else:
-                                    # Mixed text: simple replacement
-                                    # Note: this might lose some run-level formatting if the variable spans runs
-                                    paragraph.text = paragraph.text.replace(target, text)
+            if self._replace_variables(slide.shapes, {variable_name: text}, formatting):
+                replaced = True
         
         if not replaced:
             # We don't raise exception for text as there might be many variables in a slide
             pass
         
-        try:
-            prs.save(str(presentation_path))
-        except Exception as e:
-            raise Exception(f"Failed to save presentation: {str(e)}")
-        
         return True
 
     def insert_image(
         self,
         presentation_id: str,
         variable_name: str,
-        image_path: str
+        image_path: Optional[str] = None,
+        fit: ImageFit = ImageFit.STRETCH,
+        media_id: Optional[str] = None
     ) -> bool:
         """
-        Replace image by finding {{variable_name}} or {{image:variable_name}} in Alt Text
-        """
-        presentation_path = self.file_service.get_presentation_path(presentation_id)
+        Replace image by finding {{variable_name}} or {{image:variable_name}} in Alt Text.
         
-        try:
-            prs = Presentation(str(presentation_path))
-        except Exception as e:
-            raise Exception(f"Failed to load presentation: {str(e)}")
+        fit: "stretch" fills the shape exactly, "contain" letterboxes the image
+        inside it and "cover" fills it cropping the overflow (srcRect), all
+        without resampling the image.
         
+        media_id: image from the media library, instead of image_path
+        """
+        if media_id:
+            image_path = str(self.file_service.get_media_path(media_id, MediaKind.IMAGE))
+        return self._edit(presentation_id, {
+            "op": "image",
+            "variable_name": variable_name,
+            "image_path": image_path,
+            "fit": ImageFit(fit).value
+        })
+
+    def _apply_image(
+        self,
+        prs,
+        variable_name: str,
+        image_path: str,
+        fit: str = ImageFit.STRETCH.value
+    ) -> bool:
+        fit = ImageFit(fit)
         image_replaced = False
         
         # We look for {{var}} or {{image:var}}
@@ -214,7 +618,9 @@ class PPTXService:
                     width, height = shape.width, shape.height
                     
                     try:
-                        slide.shapes.add_picture(image_path, left, top, width, height)
+                        picture = slide.shapes.add_picture(image_path, left, top, width, height)
+                        if fit != ImageFit.STRETCH:
+                            self._fit_picture(picture, fit)
                         # Remove original
                         sp = shape._element
                         sp.getparent().remove(sp)
@@ -226,31 +632,74 @@ class PPTXService:
         if not image_replaced:
             raise Exception(f"No image variable found with Alt Text '{{{{{variable_name}}}}}'")
         
-        try:
-            prs.save(str(presentation_path))
-        except Exception as e:
-            raise Exception(f"Failed to save presentation: {str(e)}")
-        
         return True
 
+    def _fit_picture(self, picture, fit: ImageFit):
+        """
+        Keep the image's aspect ratio inside the picture's current box: shrink
+        and center the box (contain) or crop the image to the box (cover).
+        Only the geometry and the crop change; the image bytes are untouched.
+        """
+        image_w, image_h = picture.image.size
+        if not image_w or not image_h or not picture.width or not picture.height:
+            return
+        image_aspect = image_w / image_h
+        target_aspect = picture.width / picture.height
+        
+        if fit == ImageFit.CONTAIN:
+            # Letterboxing, as for videos
+            if image_aspect > target_aspect:
+                new_h = int(picture.width / image_aspect)
+                picture.top += (picture.height - new_h) // 2
+                picture.height = new_h
+            else:
+                new_w = int(picture.height * image_aspect)
+                picture.left += (picture.width - new_w) // 2
+                picture.width = new_w
+        elif image_aspect > target_aspect:
+            # Cover, image wider than the box: crop left and right
+            crop = (1 - target_aspect / image_aspect) / 2
+            picture.crop_left = picture.crop_right = crop
+        else:
+            # Cover, image taller than the box: crop top and bottom
+            crop = (1 - image_aspect / target_aspect) / 2
+            picture.crop_top = picture.crop_bottom = crop
+
     def insert_video(
         self,
         presentation_id: str,
         variable_name: str,
-        video_path: str,
-        poster_path: str
+        video_path: Optional[str] = None,
+        poster_path: Optional[str] = None,
+        media_id: Optional[str] = None
     ) -> bool:
         """
         Replace a shape with a video by finding {{variable_name}} or {{video:variable_name}} in Alt Text.
         Includes automatic aspect ratio calculation (Letterboxing).
-        """
-        presentation_path = self.file_service.get_presentation_path(presentation_id)
-        
-        try:
-            prs = Presentation(str(presentation_path))
-        except Exception as e:
-            raise Exception(f"Failed to load presentation: {str(e)}")
         
+        media_id: video from the media library, instead of video_path; its
+        poster frame is used unless poster_path is given
+        """
+        if media_id:
+            video_path = str(self.file_service.get_media_path(media_id, MediaKind.VIDEO))
+            if not poster_path:
+                poster_path = str(
+                    self.file_service.get_media_poster_path(media_id) or self.file_service.create_media_poster(media_id)
+                )
+        return self._edit(presentation_id, {
+            "op": "video",
+            "variable_name": variable_name,
+            "video_path": video_path,
+            "poster_path": poster_path
+        })
+
+    def _apply_video(
+        self,
+        prs,
+        variable_name: str,
+        video_path: str,
+        poster_path: str
+    ) -> bool:
         # Get video dimensions using cv2
         import cv2
         vid = cv2.VideoCapture(video_path)
@@ -292,9 +741,10 @@ class PPTXService:
                         offset_l = (t_w - new_w) // 2
                     
                     try:
-                        # Add movie
+                        # Add movie, streamed from its file when the deck is saved
                         # Note: mime_type is usually 'video/mp4'
-                        slide.shapes.add_movie(
+                        add_movie(
+                            slide.shapes,
                             video_path,
                             t_l + offset_l,
                             t_t + offset_t,
@@ -313,13 +763,553 @@ class PPTXService:
         if not video_replaced:
             raise Exception(f"No video variable found with Alt Text '{{{{{variable_name}}}}}'")
         
-        try:
-            prs.save(str(presentation_path))
-        except Exception as e:
-            raise Exception(f"Failed to save presentation: {str(e)}")
+        return True
+
+    def insert_table(
+        self,
+        presentation_id: str,
+        variable_name: str,
+        rows: List[List[str]],
+        header_rows: int = 1,
+        auto_continue: bool = False
+    ) -> bool:
+        """
+        Fill a table whose Alt Text is {{table:variable_name}} with rows of values.
+
+        The first row after the header rows is used as the row template: its XML
+        is serialized once and every data row is stamped from it as a string, then
+        all rows are parsed and appended in a single pass. With auto_continue, rows
+        that do not fit in the table frame height continue on cloned slides.
+        """
+        return self._edit(presentation_id, {
+            "op": "table",
+            "variable_name": variable_name,
+            "rows": rows,
+            "header_rows": header_rows,
+            "auto_continue": auto_continue
+        })
+
+    def _apply_table(
+        self,
+        prs,
+        variable_name: str,
+        rows: List[List[str]],
+        header_rows: int = 1,
+        auto_continue: bool = False
+    ) -> bool:
+        target = "{{table:" + variable_name + "}}"
+        
+        # Collect matches first, per slide: continuation slides are inserted while filling
+        matches = []
+        for slide in prs.slides:
+            shapes = [
+                shape for shape in slide.shapes
+                if shape.has_table and (self._get_alt_text(shape) or "").strip() == target
+            ]
+            if shapes:
+                matches.append((slide, shapes))
+        
+        if not matches:
+            raise Exception(f"No table variable found with Alt Text '{target}'")
+        
+        # Empty every matching table before any clone is made, so continuation
+        # slides never carry another table's template rows
+        tables = {}
+        for slide, shapes in matches:
+            for shape in shapes:
+                tbl = shape.table._tbl
+                tr_lst = tbl.tr_lst
+                if len(tr_lst) <= header_rows:
+                    raise Exception(f"Table '{target}' needs a template row after its {header_rows} header row(s)")
+                
+                header_height = sum(int(tr.get("h", 0)) for tr in tr_lst[:header_rows])
+                row_height = int(tr_lst[header_rows].get("h", 0)) or self.DEFAULT_ROW_HEIGHT
+                row_template = self._prepare_row_template(tr_lst[header_rows])
+                for tr in tr_lst[header_rows:]:
+                    tbl.remove(tr)
+                
+                chunks = [rows]
+                if auto_continue:
+                    per_frame = max(1, (shape.height - header_height) // row_height)
+                    chunks = [rows[i:i + per_frame] for i in range(0, len(rows), per_frame)] or [[]]
+                tables[id(shape)] = (header_height, row_height, row_template, chunks)
+        
+        for slide, shapes in matches:
+            # One clone of the emptied slide per extra chunk of its longest table;
+            # each table continues on the clones with its own chunks
+            pages = max(len(tables[id(shape)][3]) for shape in shapes)
+            slide_idx = prs.slides.index(slide)
+            shape_idxs = [list(slide.shapes).index(shape) for shape in shapes]
+            clones = [self._clone_slide(prs, slide, slide_idx + n) for n in range(1, pages)]
+            
+            for shape, shape_idx in zip(shapes, shape_idxs):
+                header_height, row_height, row_template, chunks = tables[id(shape)]
+                frames = [shape] + [list(clone.shapes)[shape_idx] for clone in clones]
+                for n, frame in enumerate(frames):
+                    chunk = chunks[n] if n < len(chunks) else []
+                    self._append_table_rows(frame.table._tbl, row_template, chunk)
+                    if auto_continue:
+                        frame.height = header_height + row_height * len(chunk)
         
         return True
 
+    def repeat_slides(
+        self,
+        presentation_id: str,
+        variable_name: str,
+        items: List[Dict]
+    ) -> int:
+        """
+        Repeat the slide block marked with {{#each variable_name}} once per item.
+
+        The block starts at the slide containing {{#each variable_name}} and ends
+        at the next slide containing {{/each}} (or is just the marker slide). For
+        every item the block is cloned right after the previous copy and the
+        item's values replace the {{field}} variables of that copy, using the
+        same engine as insert_text. Clones share media and layout parts with
+        the block (see _clone_slide), so the deck grows by slide XML and, for
+        slides with charts, one chart part per copy.
+
+        Returns:
+            Number of slides generated (None when the operation is only logged)
+        """
+        return self._edit(presentation_id, {
+            "op": "repeat",
+            "variable_name": variable_name,
+            "items": items
+        })
+
+    def _apply_repeat(
+        self,
+        prs,
+        variable_name: str,
+        items: List[Dict]
+    ) -> int:
+        start_marker = "{{#each " + variable_name + "}}"
+        end_marker = "{{/each}}"
+        slides = list(prs.slides)
+        
+        start = next((i for i, slide in enumerate(slides) if self._strip_marker(slide, start_marker)), None)
+        if start is None:
+            raise Exception(f"No repeat block found with marker '{start_marker}'")
+        end = start
+        for i in range(start, len(slides)):
+            if self._strip_marker(slides[i], end_marker):
+                end = i
+                break
+        block = slides[start:end + 1]
+        
+        if not items:
+            for slide in block:
+                self._delete_slide(prs, slide)
+        else:
+            # Clone from the untouched block first, then fill every copy
+            copies = [block]
+            position = end + 1
+            for _ in items[1:]:
+                clones = []
+                for slide in block:
+                    clones.append(self._clone_slide(prs, slide, position))
+                    position += 1
+                copies.append(clones)
+            
+            for item, copy_slides in zip(items, copies):
+                values = {name: "" if value is None else str(value) for name, value in item.items()}
+                for slide in copy_slides:
+                    self._replace_variables(slide.shapes, values)
+        
+        return len(block) * len(items)
+
+    def compact(self, presentation_id: str, remove_unused_layouts: bool = False) -> Optional[CompactionReport]:
+        """
+        Drop relationships and parts the presentation no longer uses
+        
+        Unreferenced media and charts are already dropped on every save when
+        PACKAGE_COMPACTION is on; this also reports what was removed and can
+        remove unused layouts and masters.
+        
+        Args:
+            presentation_id: Presentation ID
+            remove_unused_layouts: Also remove layouts no slide uses
+            
+        Returns:
+            CompactionReport (None when the operation is only logged)
+        """
+        return self._edit(presentation_id, {
+            "op": "compact",
+            "remove_unused_layouts": remove_unused_layouts
+        })
+
+    def _apply_compact(self, prs, remove_unused_layouts: bool = False) -> CompactionReport:
+        return compact_package(prs, remove_unused_layouts)
+
+    def _auto_compact(self, prs):
+        """Compaction pass run before every save (see PACKAGE_COMPACTION)"""
+        if settings.PACKAGE_COMPACTION:
+            with span("pptx.compact") as compact_span:
+                report = compact_package(prs, settings.PACKAGE_COMPACTION_LAYOUTS)
+                compact_span.set_attributes({
+                    "pptx.parts_removed": report.parts_removed,
+                    "pptx.bytes_saved": report.bytes_saved,
+                })
+
+    def bind_chart(
+        self,
+        presentation_id: str,
+        variable_name: str,
+        categories: List,
+        series: List[Tuple[str, List]],
+        number_format: str = "General"
+    ) -> bool:
+        """
+        Replace categories and series of charts whose Alt Text is {{chart:variable_name}}.
+
+        Works on columnar payloads: each series is a (name, values) pair aligned
+        with `categories`. The c:cat/c:val caches are fed to the XML parser and
+        the embedded workbook is streamed into its zip, both in row chunks (see
+        chart_xml), instead of going through python-pptx's replace_data and its
+        in-memory workbook. `number_format` applies to the value caches and to
+        the workbook cells.
+        """
+        return self._edit(presentation_id, {
+            "op": "chart",
+            "variable_name": variable_name,
+            "categories": categories,
+            "series": series,
+            "number_format": number_format
+        })
+
+    def _apply_chart(
+        self,
+        prs,
+        variable_name: str,
+        categories: List,
+        series: List[Tuple[str, List]],
+        number_format: str = "General"
+    ) -> bool:
+        target = "{{chart:" + variable_name + "}}"
+        self._check_chart_series(categories, series)
+        columns = [chart_xml.as_numbers(values) for _, values in series]
+        names = [name for name, _ in series]
+        
+        chart_replaced = False
+        xlsx_blob = None
+        
+        # Chart frames per chart part: a part can still be shared between slides
+        # (deduplicated by a merge, or cloned before clones got their own copy)
+        chart_refs = Counter(
+            shape.chart_part for slide in prs.slides for shape in slide.shapes if shape.has_chart
+        )
+        
+        for slide in prs.slides:
+            for shape in slide.shapes:
+                alt_text = self._get_alt_text(shape)
+                if not (shape.has_chart and alt_text and alt_text.strip() == target):
+                    continue
+                chart_replaced = True
+                
+                chart_part = shape.chart_part
+                if chart_refs[chart_part] > 1:
+                    # Bind a copy, so the other frames keep their data
+                    chart_refs[chart_part] -= 1
+                    old_rId = shape._element.chart_rId
+                    new_rId = slide.part.relate_to(self._copy_chart_part(chart_part), RT.CHART)
+                    shape._element.chart.set(qn("r:id"), new_rId)
+                    slide.part.drop_rel(old_rId)
+                
+                chart = shape.chart
+                self._bind_chart_series(chart._chartSpace, categories, names, columns, number_format)
+                
+                # Same workbook for every chart bound to this variable
+                if xlsx_blob is None:
+                    xlsx_blob = chart_xml.write_xlsx(categories, names, columns, number_format)
+                chart.part.chart_workbook.update_from_xlsx_blob(xlsx_blob)
+        
+        if not chart_replaced:
+            raise Exception(f"No chart variable found with Alt Text '{target}'")
+        
+        return True
+
+    def _check_chart_series(self, categories: List, series: List[Tuple[str, List]]):
+        for name, values in series:
+            if len(values) != len(categories):
+                raise Exception(f"Series '{name}' has {len(values)} values for {len(categories)} categories")
+
+    def _bind_chart_series(self, chartSpace, categories, names, columns, number_format: str):
+        """Rewrite the c:ser elements of a chart for the given columnar data"""
+        plot_area = chartSpace.find(qn("c:chart")).find(qn("c:plotArea"))
+        ser_lst = plot_area.findall(f"./*/{qn('c:ser')}")
+        if not ser_lst:
+            raise Exception("Chart has no series to use as a template")
+        
+        # Add (cloning the last one) or drop series to match the payload
+        while len(ser_lst) < len(columns):
+            clone = copy.deepcopy(ser_lst[-1])
+            ser_lst[-1].addnext(clone)
+            ser_lst.append(clone)
+        for extra in ser_lst[len(columns):]:
+            extra.getparent().remove(extra)
+        ser_lst = ser_lst[:len(columns)]
+        
+        # String and number caches for the categories are shared by every series
+        is_xy = ser_lst[0].find(qn("c:xVal")) is not None
+        cat_tag, val_tag = ("xVal", "yVal") if is_xy else ("cat", "val")
+        cat_element = chart_xml.categories_element(cat_tag, categories)
+        
+        for idx, (ser, name, column) in enumerate(zip(ser_lst, names, columns)):
+            ser.find(qn("c:idx")).set("val", str(idx))
+            ser.find(qn("c:order")).set("val", str(idx))
+            
+            new_tx = parse_xml(chart_xml.series_name_xml(name, idx + 1))
+            old_tx = ser.find(qn("c:tx"))
+            if old_tx is not None:
+                old_tx.addprevious(new_tx)
+                ser.remove(old_tx)
+            else:
+                ser.find(qn("c:order")).addnext(new_tx)
+            
+            new_cat = cat_element if idx == 0 else copy.deepcopy(cat_element)
+            new_val = chart_xml.values_element(val_tag, column, idx + 1, number_format)
+            old_cat, old_val = ser.find(qn(f"c:{cat_tag}")), ser.find(qn(f"c:{val_tag}"))
+            if old_val is None:
+                raise Exception(f"Unsupported chart series (no c:{val_tag})")
+            old_val.addprevious(new_cat)
+            old_val.addprevious(new_val)
+            ser.remove(old_val)
+            if old_cat is not None:
+                ser.remove(old_cat)
+
+    def _prepare_row_template(self, tr) -> List[str]:
+        """
+        Reduce a table row to one run per cell and split its XML around the cell text.
+
+        Returns the serialized row as a list of string fragments; the data values
+        go between consecutive fragments. Merged continuation cells get no value.
+        """
+        row = copy.deepcopy(tr)
+        for idx, tc in enumerate(row.iterchildren(qn("a:tc"))):
+            txBody = tc.find(qn("a:txBody"))
+            if txBody is None or tc.get("hMerge") or tc.get("vMerge"):
+                continue
+            paragraphs = txBody.findall(qn("a:p"))
+            for extra in paragraphs[1:]:
+                txBody.remove(extra)
+            p = paragraphs[0]
+            first_r = p.find(qn("a:r"))
+            for child in list(p):
+                if child.tag in (qn("a:r"), qn("a:br"), qn("a:fld")) and child is not first_r:
+                    p.remove(child)
+            if first_r is None:
+                first_r = etree.SubElement(p, qn("a:r"))
+                end_rPr = p.find(qn("a:endParaRPr"))
+                if end_rPr is not None:
+                    rPr = copy.deepcopy(end_rPr)
+                    rPr.tag = qn("a:rPr")
+                    first_r.append(rPr)
+                    p.remove(end_rPr)
+                    p.append(end_rPr)
+                etree.SubElement(first_r, qn("a:t"))
+            first_r.find(qn("a:t")).text = f"{CELL_MARK}{idx}{CELL_MARK}"
+        
+        # Serialize inside a wrapper so the row itself carries no xmlns declarations
+        wrapper = etree.Element(qn("a:tbl"), nsmap=tr.getparent().nsmap)
+        wrapper.append(row)
+        xml = etree.tostring(wrapper, encoding="unicode")
+        inner = xml[xml.index(">") + 1:xml.rindex("</")]
+        return inner.split(CELL_MARK)
+
+    def _append_table_rows(self, tbl, row_template: List[str], rows: List[List[str]]):
+        """Stamp every row into the row template and append them all to the table"""
+        # Fragments alternate literal XML and cell indexes: [xml, "0", xml, "1", xml, ...]
+        literals = row_template[0::2]
+        cells = [int(i) for i in row_template[1::2]]
+        
+        parts = []
+        for values in rows:
+            parts.append(literals[0])
+            for n, cell_idx in enumerate(cells):
+                value = values[cell_idx] if cell_idx < len(values) else None
+                parts.append(xml_escape("" if value is None else str(value)))
+                parts.append(literals[n + 1])
+        
+        wrapper_open = etree.tostring(etree.Element(qn("a:tbl"), nsmap=tbl.nsmap), encoding="unicode")
+        container = parse_xml(wrapper_open[:-2] + ">" + "".join(parts) + "</a:tbl>")
+        
+        # New rows go after the existing ones (before a trailing extLst, if any)
+        tr_lst = tbl.tr_lst
+        anchor = tr_lst[-1] if tr_lst else tbl.tblGrid
+        position = tbl.index(anchor) + 1
+        tbl[position:position] = list(container)
+
+    def _clone_slide(self, prs, slide, index: int):
+        """
+        Duplicate a slide and move it to `index`.
+
+        The copy shares the source's layout, media and other related parts
+        instead of duplicating them: relationships are re-created on the new
+        slide part and the r:* references in the copied XML re-pointed to them.
+        Charts are the exception: bind_chart edits chart parts in place, so
+        each clone gets its own copy (see _copy_chart_part). Speaker notes are
+        not copied.
+        """
+        # Not slides.add_slide(): it searches every presentation relationship for
+        # a match and each prs.slides access renames all slide parts, which makes
+        # hundreds of clones quadratic. Callers have iterated prs.slides already,
+        # so slide partnames are sequential and the next one is free.
+        sldIdLst = prs.part._element.get_or_add_sldIdLst()
+        slide_part = SlidePart.new(prs.part._next_slide_partname, prs.part.package, slide.slide_layout.part)
+        slide_rId = prs.part.rels._add_relationship(RT.SLIDE, slide_part)
+        next_id = max(map(int, sldIdLst.xpath("./p:sldId/@id")), default=255) + 1
+        sldIdLst._add_sldId(id=next_id, rId=slide_rId)
+        clone = slide_part.slide
+        
+        # Replace the blank content with a copy of the source slide.
+        # The clone's spTree element is kept because python-pptx caches it.
+        src_cSld, dst_cSld = slide._element.cSld, clone._element.cSld
+        dst_spTree = dst_cSld.spTree
+        for element in (clone._element, dst_cSld, dst_spTree):
+            for child in list(element):
+                if child is not dst_cSld and child is not dst_spTree:
+                    element.remove(child)
+        
+        before_spTree = True
+        for child in src_cSld:
+            if child is src_cSld.spTree:
+                before_spTree = False
+                dst_spTree.extend(copy.deepcopy(c) for c in child)
+            elif before_spTree:
+                dst_spTree.addprevious(copy.deepcopy(child))
+            else:
+                dst_cSld.append(copy.deepcopy(child))
+        for child in slide._element:
+            if child is not src_cSld:
+                clone._element.append(copy.deepcopy(child))
+        
+        rId_map = {}
+        for rId, rel in slide.part.rels.items():
+            if rel.reltype in (RT.SLIDE_LAYOUT, RT.NOTES_SLIDE):
+                continue
+            if rel.is_external:
+                rId_map[rId] = clone.part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+            elif rel.reltype == RT.CHART:
+                rId_map[rId] = clone.part.relate_to(self._copy_chart_part(rel.target_part), rel.reltype)
+            else:
+                rId_map[rId] = clone.part.relate_to(rel.target_part, rel.reltype)
+        
+        self._remap_rIds(clone._element, rId_map)
+        
+        # Move the new sldId (appended last) to the requested position
+        sldId = sldIdLst[-1]
+        sldIdLst.remove(sldId)
+        sldIdLst.insert(index, sldId)
+        return clone
+
+    def _copy_chart_part(self, chart_part):
+        """
+        Copy a chart part and its embedded workbook, so the copy can be bound
+        without changing the source chart. Style, color and image parts are
+        never edited and stay shared.
+        """
+        package = chart_part.package
+        new_part = ChartPart(
+            package.next_partname(ChartPart.partname_template),
+            chart_part.content_type,
+            package,
+            copy.deepcopy(chart_part._element)
+        )
+        
+        rId_map = {}
+        for rId, rel in chart_part.rels.items():
+            if rel.is_external:
+                rId_map[rId] = new_part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+            elif rel.reltype == RT.PACKAGE:
+                xlsx_part = EmbeddedXlsxPart.new(rel.target_part.blob, package)
+                rId_map[rId] = new_part.relate_to(xlsx_part, rel.reltype)
+            else:
+                rId_map[rId] = new_part.relate_to(rel.target_part, rel.reltype)
+        
+        self._remap_rIds(new_part._element, rId_map)
+        return new_part
+
+    def _remap_rIds(self, root, rId_map: Dict[str, str]):
+        """Re-point the r:* attributes of a copied part's XML to its new relationships"""
+        for element in root.iter():
+            for attr, value in element.attrib.items():
+                if attr.startswith(R_NS) and value in rId_map:
+                    element.set(attr, rId_map[value])
+
+    def _strip_marker(self, slide, marker: str) -> bool:
+        """
+        Remove a block marker from a slide's text. A shape holding only the
+        marker is removed entirely. Returns whether the marker was found.
+        """
+        found = False
+        for shape in list(slide.shapes):
+            if not shape.has_text_frame or marker not in shape.text_frame.text:
+                continue
+            found = True
+            if shape.text_frame.text.strip() == marker:
+                shape._element.getparent().remove(shape._element)
+                continue
+            for paragraph in shape.text_frame.paragraphs:
+                if marker in paragraph.text:
+                    paragraph.text = paragraph.text.replace(marker, "")
+        return found
+
+    def _delete_slide(self, prs, slide):
+        """Remove a slide from the deck, dropping its relationship from the presentation part"""
+        sldIdLst = prs.slides._sldIdLst
+        sldId = sldIdLst[prs.slides.index(slide)]
+        sldIdLst.remove(sldId)
+        prs.part.drop_rel(sldId.rId)
+
+    def _apply_frame_formatting(self, text_frame, formatting: TextFormatting):
+        """Apply the text frame options (vertical alignment, auto-fit) of a formatting"""
+        if formatting.vertical_alignment:
+            anchor_mapping = {
+                VerticalAlignment.TOP: MSO_ANCHOR.TOP,
+                VerticalAlignment.MIDDLE: MSO_ANCHOR.MIDDLE,
+                VerticalAlignment.BOTTOM: MSO_ANCHOR.BOTTOM
+            }
+            text_frame.vertical_anchor = anchor_mapping[formatting.vertical_alignment]
+        if formatting.auto_fit:
+            self._fit_text_frame(text_frame, formatting)
+
+    def _fit_text_frame(self, text_frame, formatting: TextFormatting):
+        """
+        Set the largest font size at which the frame's text fits its shape
+        (see text_fit). Table cells keep their size: rows grow with their text.
+        """
+        owner = text_frame._parent
+        width, height = getattr(owner, "width", None), getattr(owner, "height", None)
+        if not width or not height:
+            return
+        width -= text_frame.margin_left + text_frame.margin_right
+        height -= text_frame.margin_top + text_frame.margin_bottom
+        
+        runs = [run for paragraph in text_frame.paragraphs for run in paragraph.runs]
+        if not runs or width <= 0 or height <= 0:
+            return
+        font = runs[0].font
+        sizes = [run.font.size.pt for run in runs if run.font.size is not None]
+        max_size = formatting.font_size or (max(sizes) if sizes else 18)
+        
+        size = fit_font_size(
+            text_frame.text,
+            width_pt=Length(width).pt,
+            height_pt=Length(height).pt,
+            max_size=max_size,
+            min_size=min(formatting.min_font_size or 8, max_size),
+            family=formatting.font_name or font.name,
+            bold=bool(formatting.bold if formatting.bold is not None else font.bold),
+            italic=bool(formatting.italic if formatting.italic is not None else font.italic)
+        )
+        for run in runs:
+            run.font.size = Pt(size)
+        # The size is fixed now: keep PowerPoint from resizing the shape or rescaling the text
+        text_frame.word_wrap = True
+        text_frame.auto_size = MSO_AUTO_SIZE.NONE
+
     def _apply_paragraph_formatting(self, paragraph, formatting: TextFormatting):
         """Apply formatting to a paragraph and its runs"""
         # Alignment
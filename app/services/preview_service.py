@@ -0,0 +1,363 @@
+"""
+Preview service for rendering approximate slide images with OpenCV
+"""
+import hashlib
+import os
+import unicodedata
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+from fastapi import HTTPException
+from lxml import etree
+
+from app.config import settings
+from app.services.file_service import FileService
+from app.services.package_reader import NS, R_EMBED, RT_LAYOUT, RT_MASTER, PackageReader
+
+
+EMU_PER_PT = 12700
+DEFAULT_FONT_PT = 18
+
+# Bump when the renderer output changes so cached previews are not reused
+RENDERER_VERSION = "1"
+
+
+def _tag(element) -> str:
+    """Local name of an element (without namespace)"""
+    return etree.QName(element).localname
+
+
+def _srgb(element, path: str) -> Optional[Tuple[int, int, int]]:
+    """BGR color of the first srgbClr found at `path`, if any"""
+    color = element.find(path, NS)
+    if color is None or color.get("val") is None:
+        return None
+    val = color.get("val")
+    return int(val[4:6], 16), int(val[2:4], 16), int(val[0:2], 16)
+
+
+class PreviewService:
+    """Service for fast wireframe previews of presentation slides"""
+
+    def __init__(self, file_service: FileService):
+        """
+        Initialize preview service
+
+        Args:
+            file_service: File service instance
+        """
+        self.file_service = file_service
+        self.max_bytes = settings.PREVIEW_CACHE_MAX_BYTES
+        self.previews_dir = file_service.outputs_dir / "previews"
+        self.previews_dir.mkdir(parents=True, exist_ok=True)
+
+    def __reduce__(self):
+        return (PreviewService, (self.file_service,))
+
+    def get_slide_preview(self, presentation_id: str, slide_index: int, width: int = 960) -> Path:
+        """
+        Get the path to a PNG preview of a slide, rendering it only if needed
+
+        Previews are cached by a hash of the slide part, its relationships and
+        the CRCs of the parts it references, so a slide that did not change
+        between edits is never rendered twice. Cached previews are evicted
+        least-recently-used first (by mtime, refreshed on every hit) once they
+        exceed PREVIEW_CACHE_MAX_BYTES.
+
+        Args:
+            presentation_id: Presentation ID
+            slide_index: Zero-based slide index
+            width: Width of the preview in pixels
+
+        Returns:
+            Path to the cached PNG file
+
+        Raises:
+            HTTPException: If the presentation or slide is not found
+        """
+        presentation_path = self.file_service.get_presentation_path(presentation_id)
+
+        with PackageReader(presentation_path) as pkg:
+            slide_part = self._slide_partname(pkg, slide_index)
+            if slide_part is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Slide {slide_index} not found in presentation '{presentation_id}'"
+                )
+
+            preview_path = self.previews_dir / f"{self._slide_hash(pkg, slide_part, width)}.png"
+            try:
+                os.utime(preview_path)
+                return preview_path
+            except FileNotFoundError:
+                pass
+
+            image = self._render(pkg, slide_part, width)
+
+        ok, encoded = cv2.imencode(".png", image)
+        if not ok:
+            raise Exception("Failed to encode preview image")
+
+        tmp_path = preview_path.with_name(f"{preview_path.stem}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(encoded.tobytes())
+        tmp_path.replace(preview_path)
+        self._evict(keep=preview_path)
+        return preview_path
+
+    def _evict(self, keep: Path):
+        """Remove the least recently used previews beyond the disk budget, never `keep`"""
+        entries = []
+        for path in self.previews_dir.glob("*.png"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def _slide_partname(self, pkg: PackageReader, slide_index: int) -> Optional[str]:
+        slide_parts = pkg.slide_partnames()
+        if not 0 <= slide_index < len(slide_parts):
+            return None
+        return slide_parts[slide_index]
+
+    def _slide_hash(self, pkg: PackageReader, slide_part: str, width: int) -> str:
+        digest = hashlib.sha256(f"{RENDERER_VERSION}:{width}:".encode())
+        sld_sz = pkg.xml("ppt/presentation.xml").find("p:sldSz", NS)
+        digest.update(f"{sld_sz.get('cx')}x{sld_sz.get('cy')}:".encode())
+        digest.update(pkg.read(slide_part))
+        rels_name = pkg.rels_name(slide_part)
+        if rels_name in pkg.zip.NameToInfo:
+            digest.update(pkg.read(rels_name))
+        for _, target in sorted(pkg.rels(slide_part).values()):
+            if target in pkg.zip.NameToInfo:
+                digest.update(f"{target}:{pkg.crc(target)}".encode())
+        return digest.hexdigest()
+
+    # --- Rendering -------------------------------------------------------
+
+    def _render(self, pkg: PackageReader, slide_part: str, width: int) -> np.ndarray:
+        sld_sz = pkg.xml("ppt/presentation.xml").find("p:sldSz", NS)
+        slide_cx, slide_cy = int(sld_sz.get("cx")), int(sld_sz.get("cy"))
+        scale = width / slide_cx
+        height = max(1, round(slide_cy * scale))
+
+        slide = pkg.xml(slide_part)
+        background = _srgb(slide, "p:cSld/p:bg/p:bgPr/a:solidFill/a:srgbClr") or (255, 255, 255)
+        canvas = np.full((height, width, 3), background, dtype=np.uint8)
+
+        layout_part = pkg.related(slide_part, RT_LAYOUT)
+        master_part = pkg.related(layout_part, RT_MASTER) if layout_part else None
+        context = {
+            "pkg": pkg,
+            "slide_part": slide_part,
+            "rels": pkg.rels(slide_part),
+            "inherited": [self._placeholder_xfrms(pkg, p) for p in (layout_part, master_part) if p],
+        }
+
+        identity = (0.0, 0.0, 1.0, 1.0)
+        self._render_tree(canvas, slide.find("p:cSld/p:spTree", NS), identity, scale, context)
+        return canvas
+
+    def _placeholder_xfrms(self, pkg: PackageReader, partname: str) -> Dict[str, Tuple[int, int, int, int]]:
+        """Placeholder geometry of a layout/master, keyed by idx and by type"""
+        xfrms = {}
+        for sp in pkg.xml(partname).iterfind(".//p:sp", NS):
+            ph = sp.find("p:nvSpPr/p:nvPr/p:ph", NS)
+            geometry = self._xfrm(sp.find("p:spPr/a:xfrm", NS))
+            if ph is None or geometry is None:
+                continue
+            xfrms.setdefault(f"idx:{ph.get('idx', '0')}", geometry)
+            xfrms.setdefault(f"type:{ph.get('type', 'body')}", geometry)
+        return xfrms
+
+    def _xfrm(self, xfrm) -> Optional[Tuple[int, int, int, int]]:
+        if xfrm is None:
+            return None
+        off, ext = xfrm.find("a:off", NS), xfrm.find("a:ext", NS)
+        if off is None or ext is None:
+            return None
+        return int(off.get("x")), int(off.get("y")), int(ext.get("cx")), int(ext.get("cy"))
+
+    def _geometry(self, shape, context) -> Optional[Tuple[int, int, int, int]]:
+        """Shape geometry in EMU, inherited from the layout/master for placeholders"""
+        tag = _tag(shape)
+        if tag == "graphicFrame":
+            geometry = self._xfrm(shape.find("p:xfrm", NS))
+        elif tag == "grpSp":
+            geometry = self._xfrm(shape.find("p:grpSpPr/a:xfrm", NS))
+        else:
+            geometry = self._xfrm(shape.find("p:spPr/a:xfrm", NS))
+        if geometry is not None:
+            return geometry
+
+        ph = shape.find("*/p:nvPr/p:ph", NS)
+        if ph is None:
+            return None
+        for xfrms in context["inherited"]:
+            for key in (f"idx:{ph.get('idx', '0')}", f"type:{ph.get('type', 'body')}"):
+                if key in xfrms:
+                    return xfrms[key]
+        return None
+
+    def _render_tree(self, canvas, tree, transform, scale, context):
+        for shape in tree:
+            tag = _tag(shape)
+            if tag not in ("sp", "pic", "graphicFrame", "grpSp", "cxnSp"):
+                continue
+            geometry = self._geometry(shape, context)
+            if geometry is None:
+                continue
+
+            ox, oy, sx, sy = transform
+            x, y, cx, cy = geometry
+            box = (ox + x * sx, oy + y * sy, cx * sx, cy * sy)
+
+            if tag == "grpSp":
+                self._render_group(canvas, shape, box, scale, context)
+                continue
+
+            px = tuple(int(round(v * scale)) for v in box)
+            if tag == "pic":
+                self._render_picture(canvas, shape, px, context)
+            elif tag == "graphicFrame":
+                self._render_frame(canvas, shape, px, scale * sy)
+            else:
+                self._render_shape(canvas, shape, px, scale * sy)
+
+    def _render_group(self, canvas, group, box, scale, context):
+        xfrm = group.find("p:grpSpPr/a:xfrm", NS)
+        ch_off, ch_ext = xfrm.find("a:chOff", NS), xfrm.find("a:chExt", NS)
+        x, y, cx, cy = box
+        if ch_off is None or ch_ext is None or not int(ch_ext.get("cx")) or not int(ch_ext.get("cy")):
+            child = (x, y, 1.0, 1.0)
+        else:
+            sx = cx / int(ch_ext.get("cx"))
+            sy = cy / int(ch_ext.get("cy"))
+            child = (x - int(ch_off.get("x")) * sx, y - int(ch_off.get("y")) * sy, sx, sy)
+        self._render_tree(canvas, group, child, scale, context)
+
+    def _render_shape(self, canvas, sp, px, text_scale):
+        x, y, w, h = px
+        fill = _srgb(sp, "p:spPr/a:solidFill/a:srgbClr")
+        if fill is not None:
+            cv2.rectangle(canvas, (x, y), (x + w, y + h), fill, thickness=-1)
+        line = _srgb(sp, "p:spPr/a:ln/a:solidFill/a:srgbClr") or (200, 200, 200)
+        cv2.rectangle(canvas, (x, y), (x + w, y + h), line, thickness=1)
+
+        txBody = sp.find("p:txBody", NS)
+        if txBody is not None:
+            self._render_text(canvas, txBody, px, text_scale)
+
+    def _render_picture(self, canvas, pic, px, context):
+        x, y, w, h = px
+        blip = pic.find("p:blipFill/a:blip", NS)
+        rel = context["rels"].get(blip.get(R_EMBED)) if blip is not None else None
+        image = None
+        if rel is not None and rel[1] in context["pkg"].zip.NameToInfo:
+            data = np.frombuffer(context["pkg"].read(rel[1]), dtype=np.uint8)
+            image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+        if image is None or w <= 0 or h <= 0:
+            cv2.rectangle(canvas, (x, y), (x + w, y + h), (180, 180, 180), thickness=1)
+            cv2.line(canvas, (x, y), (x + w, y + h), (180, 180, 180), 1)
+            cv2.line(canvas, (x + w, y), (x, y + h), (180, 180, 180), 1)
+            return
+
+        # Apply srcRect cropping (values in 1/1000 of a percent)
+        src_rect = pic.find("p:blipFill/a:srcRect", NS)
+        if src_rect is not None:
+            ih, iw = image.shape[:2]
+            left, top, right, bottom = (int(src_rect.get(k, 0)) / 100000 for k in ("l", "t", "r", "b"))
+            x0, x1 = int(iw * max(0.0, left)), int(iw * (1 - max(0.0, right)))
+            y0, y1 = int(ih * max(0.0, top)), int(ih * (1 - max(0.0, bottom)))
+            if x1 > x0 and y1 > y0:
+                image = image[y0:y1, x0:x1]
+
+        self._paste(canvas, cv2.resize(image, (w, h), interpolation=cv2.INTER_AREA), x, y)
+
+    def _paste(self, canvas, image, x, y):
+        ch, cw = canvas.shape[:2]
+        h, w = image.shape[:2]
+        x0, y0, x1, y1 = max(0, x), max(0, y), min(cw, x + w), min(ch, y + h)
+        if x1 > x0 and y1 > y0:
+            canvas[y0:y1, x0:x1] = image[y0 - y:y1 - y, x0 - x:x1 - x]
+
+    def _render_frame(self, canvas, frame, px, text_scale):
+        x, y, w, h = px
+        tbl = frame.find("a:graphic/a:graphicData/a:tbl", NS)
+        if tbl is None:
+            # Charts, diagrams and OLE objects are drawn as labeled boxes
+            cv2.rectangle(canvas, (x, y), (x + w, y + h), (160, 160, 160), thickness=1)
+            uri = frame.find("a:graphic/a:graphicData", NS)
+            label = (uri.get("uri", "").rstrip("/").rsplit("/", 1)[-1] if uri is not None else "") or "object"
+            cv2.putText(canvas, label, (x + 4, y + 16), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (120, 120, 120), 1, cv2.LINE_AA)
+            return
+
+        widths = [int(col.get("w", 0)) for col in tbl.iterfind("a:tblGrid/a:gridCol", NS)]
+        total_w = sum(widths) or 1
+        row_y = y
+        for tr in tbl.iterfind("a:tr", NS):
+            row_h = max(1, int(int(tr.get("h", 0)) * text_scale))
+            col_x = x
+            for tc, col_w in zip(tr.iterfind("a:tc", NS), widths):
+                cell_w = int(col_w * w / total_w)
+                cv2.rectangle(canvas, (col_x, row_y), (col_x + cell_w, row_y + row_h), (150, 150, 150), 1)
+                txBody = tc.find("a:txBody", NS)
+                if txBody is not None:
+                    self._render_text(canvas, txBody, (col_x, row_y, cell_w, row_h), text_scale)
+                col_x += cell_w
+            row_y += row_h
+            if row_y > canvas.shape[0]:
+                break
+
+    def _render_text(self, canvas, txBody, px, text_scale):
+        """Draw wrapped paragraphs with an approximate font size"""
+        x, y, w, h = px
+        pad = 4
+        cursor_y = y + pad
+        for p in txBody.iterfind("a:p", NS):
+            text = "".join(t.text or "" for t in p.iterfind(".//a:t", NS))
+            rPr = p.find(".//a:rPr", NS)
+            size_pt = int(rPr.get("sz")) / 100 if rPr is not None and rPr.get("sz") else DEFAULT_FONT_PT
+            color = (_srgb(rPr, "a:solidFill/a:srgbClr") if rPr is not None else None) or (40, 40, 40)
+            bold = rPr is not None and rPr.get("b") in ("1", "true")
+
+            line_px = max(6, size_pt * EMU_PER_PT * text_scale)
+            # Hershey fonts are ~22px tall at scale 1; leave room for line spacing
+            font_scale = line_px / 30
+            thickness = 2 if bold and line_px > 14 else 1
+
+            # Hershey fonts only cover ASCII
+            text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+            for line in self._wrap(text, font_scale, thickness, w - 2 * pad):
+                cursor_y += int(line_px)
+                if cursor_y > y + h + line_px:
+                    return
+                cv2.putText(canvas, line, (x + pad, cursor_y), cv2.FONT_HERSHEY_SIMPLEX,
+                            font_scale, color, thickness, cv2.LINE_AA)
+            if not text:
+                cursor_y += int(line_px)
+
+    def _wrap(self, text: str, font_scale: float, thickness: int, max_width: int):
+        line = ""
+        for word in text.split(" "):
+            candidate = f"{line} {word}" if line else word
+            (text_w, _), _ = cv2.getTextSize(candidate, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+            if text_w <= max_width or not line:
+                line = candidate
+            else:
+                yield line
+                line = word
+        if line:
+            yield line
@@ -0,0 +1,151 @@
+"""
+Profile service for on-demand request profiling
+"""
+import cProfile
+import io
+import pstats
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+
+class ProfileSession:
+    """Collects the profilers started while serving a single request"""
+
+    def __init__(self):
+        self.profilers: List[cProfile.Profile] = []
+
+    @contextmanager
+    def profile(self):
+        """Profile the enclosed block on the current thread"""
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self.profilers.append(profiler)
+
+    def stats(self) -> Optional[pstats.Stats]:
+        """Merge every collected profiler into a single Stats object"""
+        if not self.profilers:
+            return None
+        stats = pstats.Stats(self.profilers[0])
+        for profiler in self.profilers[1:]:
+            stats.add(profiler)
+        return stats
+
+
+# Session of the request being profiled (None when profiling is off)
+current_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+
+@contextmanager
+def profile_section():
+    """
+    Profile the enclosed block if the current request is being profiled.
+
+    Used around work that runs outside the event loop thread, where the
+    request-level profiler cannot see it. A no-op otherwise.
+    """
+    session = current_session.get()
+    if session is None:
+        yield
+        return
+    with session.profile():
+        yield
+
+
+class ProfileService:
+    """Service for storing and retrieving request profiles"""
+
+    def __init__(self, outputs_dir: Path, max_profiles: int = 20):
+        """
+        Initialize profile service
+
+        Args:
+            outputs_dir: Outputs directory of the file service (FileService.outputs_dir)
+            max_profiles: Maximum number of profiles kept on disk
+        """
+        self.profiles_dir = Path(outputs_dir) / "profiles"
+        self.max_profiles = max_profiles
+        self.profiles_dir.mkdir(parents=True, exist_ok=True)
+
+    def save_profile(self, session: ProfileSession) -> Optional[str]:
+        """
+        Store the merged stats of a session in pstats format
+
+        Args:
+            session: Finished profile session
+
+        Returns:
+            Profile ID, or None if nothing was profiled
+        """
+        stats = session.stats()
+        if stats is None:
+            return None
+
+        profile_id = str(uuid.uuid4())
+        stats.dump_stats(str(self.profiles_dir / f"{profile_id}.prof"))
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        """Delete the oldest profiles above the configured cap"""
+        profiles = sorted(self.profiles_dir.glob("*.prof"), key=lambda p: p.stat().st_mtime)
+        for file_path in profiles[:max(0, len(profiles) - self.max_profiles)]:
+            try:
+                file_path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def get_profile_path(self, profile_id: str) -> Path:
+        """
+        Get the path to a stored profile
+
+        Raises:
+            HTTPException: If profile not found
+        """
+        file_path = self.profiles_dir / f"{profile_id}.prof"
+        # The ID is used in a path, so only accept what save_profile generates
+        try:
+            uuid.UUID(profile_id)
+        except ValueError:
+            file_path = None
+
+        if file_path is None or not file_path.is_file():
+            raise HTTPException(
+                status_code=404,
+                detail=f"Profile with ID '{profile_id}' not found"
+            )
+        return file_path
+
+    def render_text(self, profile_id: str, limit: int = 50) -> str:
+        """Render a stored profile as a cumulative-time text report"""
+        stream = io.StringIO()
+        stats = pstats.Stats(str(self.get_profile_path(profile_id)), stream=stream)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def list_profiles(self) -> list[dict]:
+        """
+        List stored profiles, newest first
+
+        Returns:
+            List of dictionaries containing profile information
+        """
+        profiles = []
+        for file_path in self.profiles_dir.glob("*.prof"):
+            stat = file_path.stat()
+            profiles.append({
+                "profile_id": file_path.stem,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(stat.st_mtime)),
+                "size_bytes": stat.st_size
+            })
+        profiles.sort(key=lambda p: p["created_at"], reverse=True)
+        return profiles
@@ -0,0 +1,339 @@
+"""
+Storage backends for uploaded and generated files
+"""
+import glob
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+_STREAM_CHUNK = 1024 * 1024
+
+
+class StorageBackend:
+    """
+    Interface used by FileService for everything it stores.
+
+    Keys are relative POSIX paths like "uploads/templates/{id}.pptx" or
+    "outputs/{id}.pptx". python-pptx and OpenCV need real files, so every
+    backend maps a key to a local working path: the file itself for local
+    storage, a read-through cached copy for remote storage.
+    """
+
+    #: True when working paths ARE the stored files (no upload/download step)
+    is_local = False
+
+    def working_path(self, key: str) -> Path:
+        """Local path where a file for `key` can be written before put_file()"""
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Path:
+        """Local readable copy of `key`; raises FileNotFoundError if it does not exist"""
+        raise NotImplementedError
+
+    def put_file(self, key: str, path: Path):
+        """Store the local file `path` under `key`"""
+        raise NotImplementedError
+
+    def put_stream(self, key: str, stream) -> Path:
+        """Store a binary file object under `key`; returns its working path"""
+        raise NotImplementedError
+
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        """
+        Stream the content of `key`. The object is opened before returning,
+        so a missing key raises FileNotFoundError here, not while iterating.
+        """
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> bool:
+        """
+        Delete `key`; returns False if it is known not to have existed.
+        Object stores do not report that, so their deletes always return True.
+        """
+        raise NotImplementedError
+
+    def list(self, prefix: str) -> List[str]:
+        """Keys starting with `prefix`"""
+        raise NotImplementedError
+
+
+class LocalStorage(StorageBackend):
+    """Files under a base directory (the default, same layout as always)"""
+
+    is_local = True
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = Path(base_dir)
+
+    def working_path(self, key: str) -> Path:
+        return self.base_dir / key
+
+    def local_path(self, key: str) -> Path:
+        path = self.base_dir / key
+        if not path.is_file():
+            raise FileNotFoundError(key)
+        return path
+
+    def put_file(self, key: str, path: Path):
+        target = self.base_dir / key
+        if Path(path).resolve() != target.resolve():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(path, target)
+
+    def put_stream(self, key: str, stream) -> Path:
+        target = self.base_dir / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "wb") as buffer:
+            shutil.copyfileobj(stream, buffer)
+        return target
+
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        f = open(self.local_path(key), "rb")
+
+        def chunks():
+            with f:
+                for chunk in iter(lambda: f.read(_STREAM_CHUNK), b""):
+                    yield chunk
+        return chunks()
+
+    def exists(self, key: str) -> bool:
+        return (self.base_dir / key).is_file()
+
+    def delete(self, key: str) -> bool:
+        try:
+            (self.base_dir / key).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def list(self, prefix: str) -> List[str]:
+        folder, _, name_prefix = prefix.rpartition("/")
+        directory = self.base_dir / folder
+        if not directory.is_dir():
+            return []
+        return sorted(
+            f"{folder}/{path.name}" if folder else path.name
+            for path in directory.glob(glob.escape(name_prefix) + "*")
+            if path.is_file()
+        )
+
+
+# One boto3 client per endpoint/credentials, shared by every request: botocore
+# clients are thread-safe and keep a pool of HTTP connections.
+_s3_clients: Dict[Tuple, object] = {}
+_s3_clients_lock = threading.Lock()
+
+
+def _get_s3_client(endpoint_url: Optional[str], region: str, access_key: Optional[str],
+                   secret_key: Optional[str], max_pool_connections: int):
+    key = (endpoint_url, region, access_key, max_pool_connections)
+    with _s3_clients_lock:
+        if key not in _s3_clients:
+            try:
+                import boto3
+                from botocore.config import Config
+            except ImportError:
+                raise Exception("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+
+            _s3_clients[key] = boto3.session.Session().client(
+                "s3",
+                endpoint_url=endpoint_url or None,
+                region_name=region,
+                aws_access_key_id=access_key or None,
+                aws_secret_access_key=secret_key or None,
+                config=Config(
+                    max_pool_connections=max_pool_connections,
+                    retries={"max_attempts": 5, "mode": "adaptive"},
+                ),
+            )
+        return _s3_clients[key]
+
+
+def _is_missing(error) -> bool:
+    """True if a botocore ClientError means the object does not exist"""
+    return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+
+class S3Storage(StorageBackend):
+    """
+    S3-compatible object storage (AWS S3, MinIO, ...).
+
+    Reads go through a local disk cache: a cached copy is reused while its
+    ETag matches the object's (one HEAD request), and immutable keys such
+    as templates skip even that. Large files are uploaded and downloaded
+    with multipart transfers.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        cache_dir: Path,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: str = "us-east-1",
+        access_key: Optional[str] = None,
+        secret_key: Optional[str] = None,
+        max_pool_connections: int = 32,
+        multipart_threshold: int = 8 * 1024 * 1024,
+        multipart_chunksize: int = 8 * 1024 * 1024,
+        cache_max_bytes: int = 2 * 1024 * 1024 * 1024,
+        immutable_prefixes: Tuple[str, ...] = ("uploads/templates/",),
+    ):
+        self.client = _get_s3_client(endpoint_url, region, access_key, secret_key, max_pool_connections)
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.cache_dir = Path(cache_dir)
+        self.cache_max_bytes = cache_max_bytes
+        self.immutable_prefixes = immutable_prefixes
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=4,
+        )
+
+    def _object_key(self, key: str) -> str:
+        return self.prefix + key
+
+    def _etag_path(self, path: Path) -> Path:
+        return path.with_name(path.name + ".etag")
+
+    def working_path(self, key: str) -> Path:
+        path = self.cache_dir / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def local_path(self, key: str) -> Path:
+        path = self.working_path(key)
+        etag_path = self._etag_path(path)
+
+        if path.is_file() and key.startswith(self.immutable_prefixes):
+            os.utime(path)
+            return path
+
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except self.client.exceptions.ClientError as e:
+            if _is_missing(e):
+                raise FileNotFoundError(key)
+            raise
+
+        if path.is_file() and etag_path.is_file() and etag_path.read_text() == head["ETag"]:
+            os.utime(path)
+            return path
+
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.client.download_file(self.bucket, self._object_key(key), str(tmp_path), Config=self.transfer_config)
+            tmp_path.replace(path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        etag_path.write_text(head["ETag"])
+        self._evict()
+        return path
+
+    def put_file(self, key: str, path: Path):
+        self.client.upload_file(str(path), self.bucket, self._object_key(key), Config=self.transfer_config)
+        # The working copy now matches the object: remember its ETag so the next read skips the download
+        head = self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        cached = self.working_path(key)
+        if Path(path).resolve() == cached.resolve():
+            self._etag_path(cached).write_text(head["ETag"])
+            self._evict()
+
+    def put_stream(self, key: str, stream) -> Path:
+        path = self.working_path(key)
+        with open(path, "wb") as buffer:
+            shutil.copyfileobj(stream, buffer)
+        self.put_file(key, path)
+        return path
+
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))["Body"]
+        except self.client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key)
+
+        def chunks():
+            try:
+                for chunk in body.iter_chunks(_STREAM_CHUNK):
+                    yield chunk
+            finally:
+                body.close()
+        return chunks()
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except self.client.exceptions.ClientError as e:
+            # Denied, throttled or failed requests are errors, not "missing"
+            if _is_missing(e):
+                return False
+            raise
+
+    def delete(self, key: str) -> bool:
+        # DeleteObject succeeds whether or not the key exists: no HEAD to find out
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        cached = self.cache_dir / key
+        cached.unlink(missing_ok=True)
+        self._etag_path(cached).unlink(missing_ok=True)
+        return True
+
+    def list(self, prefix: str) -> List[str]:
+        keys = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._object_key(prefix)):
+            keys.extend(obj["Key"][len(self.prefix):] for obj in page.get("Contents", []))
+        return sorted(keys)
+
+    def _evict(self):
+        """
+        Keep the read-through cache under its disk budget (least recently used
+        first). Only stored objects (the ones with an .etag next to them) are
+        evicted, not the node-local files FileService keeps in the same tree.
+        """
+        entries = []
+        for etag_path in self.cache_dir.rglob("*.etag"):
+            path = etag_path.with_name(etag_path.name[:-len(".etag")])
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.cache_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self._etag_path(path).unlink(missing_ok=True)
+            total -= size
+
+
+def get_storage(base_dir: Path) -> StorageBackend:
+    """Storage backend selected by settings.STORAGE_BACKEND"""
+    from app.config import settings
+
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            cache_dir=Path(base_dir) / settings.STORAGE_CACHE_DIR,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key=settings.S3_ACCESS_KEY_ID,
+            secret_key=settings.S3_SECRET_ACCESS_KEY,
+            max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+            multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE,
+            cache_max_bytes=settings.STORAGE_CACHE_MAX_BYTES,
+        )
+    return LocalStorage(base_dir)
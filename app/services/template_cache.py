@@ -0,0 +1,305 @@
+"""
+Host-wide shared-memory cache of template packages and derived artifacts
+"""
+import hashlib
+import io
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+
+class MappedFile(io.RawIOBase):
+    """
+    Read-only file object over a shared mapping.
+
+    Each reader keeps its own position, so concurrent requests can read the
+    same mapping; read() copies only the bytes asked for.
+    """
+
+    def __init__(self, mapping: mmap.mmap, name: str):
+        self._mapping = mapping
+        self._position = 0
+        self.name = name
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._mapping)
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self._position = offset
+        return offset
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._mapping) if size is None or size < 0 else min(self._position + size, len(self._mapping))
+        data = self._mapping[self._position:end]
+        self._position = max(self._position, end)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+# Bump when an artifact builder changes, so artifacts left in the shared
+# directory by a previous deployment are not reused
+ARTIFACT_VERSION = "1"
+
+# Mappings of this process: identity -> (version, inode of the published
+# file, mmap). Entries whose file was replaced, evicted or unlinked are
+# dropped from here; the mmap is closed (its tmpfs pages released) once the
+# last reader holding it is gone.
+_mappings: Dict[str, Tuple[str, int, mmap.mmap]] = {}
+_mappings_lock = threading.Lock()
+
+# Seconds between sweeps of _mappings for files evicted by any process
+_SWEEP_INTERVAL = 30.0
+_last_sweep = 0.0
+
+
+class TemplateCache:
+    """
+    Template packages published read-only in a shared directory (tmpfs by
+    default) and mapped by every worker process of the host, so hot
+    templates are held in memory once per host instead of once per worker.
+
+    Entries are named after the source file's identity (device and inode,
+    so hard links such as the oplog template.pptx share them) and its
+    version (size and modification time). A new version is published under
+    a new name with an atomic rename and the old one unlinked: workers pick
+    up the new mapping on their next open, while reads in flight keep the
+    old pages. Derived artifacts (e.g. the variable scan) are stored next to
+    the package with the same version, so they are computed once per host.
+
+    A process drops its mapping of a file that was evicted or unlinked (by
+    any process) on its next open of that template, and in a periodic sweep
+    of all its mappings, so unlinked files do not stay pinned in memory.
+
+    Docker gives containers a 64 MB /dev/shm by default: templates that do
+    not fit are not published and are read from disk with plain reads, as
+    when the cache is disabled. The budget is capped at the size of the
+    shared filesystem.
+    """
+
+    def __init__(self, shm_dir: Path, max_bytes: int):
+        """
+        Initialize template cache
+
+        Args:
+            shm_dir: Shared directory for published templates
+            max_bytes: Size budget of published packages (0 disables the cache)
+        """
+        self.shm_dir = Path(shm_dir)
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _identity(self, path: Path) -> Tuple[str, str]:
+        stat = os.stat(path)
+        return f"{stat.st_dev:x}-{stat.st_ino:x}", f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+    def retire(self, path: Path):
+        """
+        Remove the shared copy (and artifacts) of a template about to be
+        deleted, and this process's mapping of it; other processes drop
+        theirs in their next sweep. Nothing is removed while other hard links
+        (operation-log presentations) still reference the file.
+
+        Args:
+            path: Template package path, before it is unlinked
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        if stat.st_nlink > 1:
+            return
+        identity = f"{stat.st_dev:x}-{stat.st_ino:x}"
+        with _mappings_lock:
+            _mappings.pop(identity, None)
+        shutil.rmtree(self.shm_dir / identity, ignore_errors=True)
+
+    def _published(self, path: Path, identity: str, version: str) -> Path:
+        """Shared copy of `path` at `version`, publishing it if needed"""
+        entry_dir = self.shm_dir / identity
+        target = entry_dir / f"{version}.pptx"
+        if target.is_file():
+            return target
+
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_dir / f"{version}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            shutil.copyfile(path, tmp_path)
+            os.chmod(tmp_path, 0o444)
+            tmp_path.replace(target)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        # Retire older versions (their artifacts too); mapped pages stay valid
+        for old in entry_dir.iterdir():
+            if not old.name.startswith(version + ".") and not old.name.endswith(".tmp"):
+                old.unlink(missing_ok=True)
+        self._evict()
+        return target
+
+    def open(self, path: Path):
+        """
+        File object reading `path` from the shared mapping
+
+        Falls back to a plain file when the cache is disabled.
+
+        Args:
+            path: Template package path
+
+        Returns:
+            Readable, seekable binary file object
+        """
+        if not self.enabled:
+            return open(path, "rb")
+
+        self._sweep()
+        identity, version = self._identity(path)
+        with _mappings_lock:
+            cached = _mappings.get(identity)
+        if cached and cached[0] == version:
+            target = self.shm_dir / identity / f"{version}.pptx"
+            if self._mapped_inode(target) == cached[1]:
+                os.utime(target)
+                return MappedFile(cached[2], str(path))
+            # Evicted (or evicted and republished by another process): remap
+            self._drop(identity, cached)
+
+        try:
+            target = self._published(path, identity, version)
+        except OSError:
+            # Shared directory full or not writable: read the template itself
+            return open(path, "rb")
+        with open(target, "rb") as f:
+            inode = os.fstat(f.fileno()).st_ino
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        os.utime(target)
+        with _mappings_lock:
+            _mappings[identity] = (version, inode, mapping)
+        return MappedFile(mapping, str(path))
+
+    def _mapped_inode(self, target: Path) -> Optional[int]:
+        try:
+            return os.stat(target).st_ino
+        except FileNotFoundError:
+            return None
+
+    def _drop(self, identity: str, entry: Tuple[str, int, mmap.mmap]):
+        """Forget a mapping; it is unmapped when the last reader releases it"""
+        with _mappings_lock:
+            if _mappings.get(identity) is entry:
+                del _mappings[identity]
+
+    def _sweep(self):
+        """Drop the mappings whose published file is gone, at most every _SWEEP_INTERVAL"""
+        global _last_sweep
+        now = time.monotonic()
+        if now - _last_sweep < _SWEEP_INTERVAL:
+            return
+        _last_sweep = now
+        with _mappings_lock:
+            entries = list(_mappings.items())
+        for identity, entry in entries:
+            if self._mapped_inode(self.shm_dir / identity / f"{entry[0]}.pptx") != entry[1]:
+                self._drop(identity, entry)
+
+    def artifact(self, path: Path, name: str, build: Callable[[], object]):
+        """
+        JSON artifact derived from the package at `path`, built once per version
+
+        Args:
+            path: Template package path
+            name: Artifact name
+            build: Returns the JSON-serializable artifact when it is missing
+
+        Returns:
+            The artifact
+        """
+        if not self.enabled:
+            return build()
+
+        identity, version = self._identity(path)
+        try:
+            self._published(path, identity, version)
+        except OSError:
+            return build()
+        artifact_path = self.shm_dir / identity / f"{version}.{name}.v{ARTIFACT_VERSION}.json"
+        try:
+            return json.loads(artifact_path.read_bytes())
+        except (OSError, ValueError):
+            pass
+
+        value = build()
+        tmp_path = artifact_path.with_name(f"{artifact_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp_path.write_text(json.dumps(value, separators=(",", ":")))
+            tmp_path.replace(artifact_path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+        return value
+
+    def _evict(self):
+        """Remove least recently opened templates beyond the size budget"""
+        entries = []
+        for package in self.shm_dir.glob("*/*.pptx"):
+            try:
+                stat = package.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, package))
+
+        # A budget larger than the shared filesystem (e.g. Docker's 64 MB
+        # /dev/shm) would never evict before the directory is full
+        budget = self.max_bytes
+        try:
+            fs = os.statvfs(self.shm_dir)
+            budget = min(budget, fs.f_blocks * fs.f_frsize)
+        except OSError:
+            pass
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, package in sorted(entries):
+            if total <= budget:
+                break
+            for stale in package.parent.glob(package.stem + ".*"):
+                stale.unlink(missing_ok=True)
+            total -= size
+
+
+def get_template_cache(file_service) -> TemplateCache:
+    """Template cache configured by settings (TEMPLATE_SHM_DIR, TEMPLATE_SHM_MAX_BYTES)"""
+    from app.config import settings
+
+    shm_dir: Optional[Path] = Path(settings.TEMPLATE_SHM_DIR) if settings.TEMPLATE_SHM_DIR else None
+    if shm_dir is None:
+        shm_root = Path("/dev/shm")
+        if shm_root.is_dir():
+            # One directory per storage root: entries are keyed by inode only,
+            # so services with different roots (tests, benchmarks) must not share it
+            root = hashlib.sha1(str(file_service.outputs_dir.resolve()).encode("utf-8")).hexdigest()[:12]
+            shm_dir = shm_root / f"pptx-api-{root}"
+        else:
+            shm_dir = file_service.outputs_dir / "shm"
+    return TemplateCache(shm_dir, settings.TEMPLATE_SHM_MAX_BYTES)
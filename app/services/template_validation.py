@@ -0,0 +1,127 @@
+"""
+Upload-time validation of template packages from the zip central directory
+"""
+import zipfile
+from typing import BinaryIO
+
+from fastapi import HTTPException, status
+from lxml import etree
+from pptx.opc.constants import CONTENT_TYPE as CT
+
+from app.config import settings
+from app.models.schemas import TemplateStats
+
+
+# Main part content types python-pptx opens
+_MAIN_CONTENT_TYPES = (CT.PML_PRESENTATION_MAIN, CT.PML_PRES_MACRO_MAIN)
+
+# [Content_Types].xml is a short list of types; anything bigger is not a real one
+_CONTENT_TYPES_MAX_BYTES = 4 * 1024 * 1024
+
+# Members smaller than this are not checked for their compression ratio
+# (tiny, highly repetitive XML parts legitimately compress very well)
+_RATIO_MIN_SIZE = 1024 * 1024
+
+_CT_NS = {"ct": "http://schemas.openxmlformats.org/package/2006/content-types"}
+
+_parser = etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=False)
+
+
+def _reject(detail: str, status_code: int = status.HTTP_400_BAD_REQUEST):
+    raise HTTPException(status_code=status_code, detail=detail)
+
+
+def inspect_template(file: BinaryIO) -> TemplateStats:
+    """
+    Validate an uploaded template and collect its statistics.
+
+    Only the zip central directory and [Content_Types].xml are read, so bad
+    uploads are rejected without inflating the package. The sizes in the
+    central directory are binding: zipfile stops inflating a member at its
+    declared size, so a member cannot expand past what is checked here.
+
+    Args:
+        file: Seekable binary file object with the upload (position is restored)
+
+    Returns:
+        TemplateStats of the package
+
+    Raises:
+        HTTPException: 400 for archives that are not valid PowerPoint
+            packages or look like zip bombs, 413 for oversize decks
+    """
+    start = file.tell()
+    try:
+        file.seek(0, 2)
+        package_bytes = file.tell() - start
+        file.seek(start)
+        if package_bytes > settings.TEMPLATE_MAX_BYTES:
+            _reject(
+                f"Template is too large ({package_bytes} bytes, maximum {settings.TEMPLATE_MAX_BYTES})",
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        try:
+            archive = zipfile.ZipFile(file)
+        except (zipfile.BadZipFile, zipfile.LargeZipFile, ValueError, EOFError) as e:
+            _reject(f"Invalid template: not a valid .pptx archive ({str(e)})")
+
+        with archive:
+            return _inspect_archive(archive, package_bytes)
+    finally:
+        file.seek(start)
+
+
+def _inspect_archive(archive: zipfile.ZipFile, package_bytes: int) -> TemplateStats:
+    members = [info for info in archive.infolist() if not info.is_dir()]
+    if len(members) > settings.TEMPLATE_MAX_PARTS:
+        _reject(f"Invalid template: too many parts ({len(members)}, maximum {settings.TEMPLATE_MAX_PARTS})")
+
+    uncompressed_bytes = 0
+    media_bytes = 0
+    for info in members:
+        if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            _reject(f"Invalid template: unsupported compression in part '{info.filename}'")
+        if info.flag_bits & 0x1:
+            _reject("Invalid template: encrypted packages are not supported")
+        if (info.file_size >= _RATIO_MIN_SIZE
+                and info.file_size > max(info.compress_size, 1) * settings.TEMPLATE_MAX_COMPRESSION_RATIO):
+            _reject(f"Invalid template: part '{info.filename}' has a suspicious compression ratio")
+        uncompressed_bytes += info.file_size
+        if info.filename.startswith("ppt/media/"):
+            media_bytes += info.file_size
+
+    if uncompressed_bytes > settings.TEMPLATE_MAX_UNCOMPRESSED_BYTES:
+        _reject(
+            f"Template is too large once uncompressed ({uncompressed_bytes} bytes, "
+            f"maximum {settings.TEMPLATE_MAX_UNCOMPRESSED_BYTES})",
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+    try:
+        content_types_info = archive.getinfo("[Content_Types].xml")
+    except KeyError:
+        _reject("Invalid template: missing [Content_Types].xml")
+    if content_types_info.file_size > _CONTENT_TYPES_MAX_BYTES:
+        _reject("Invalid template: [Content_Types].xml is too large")
+    try:
+        types = etree.fromstring(archive.read(content_types_info), _parser)
+    except (zipfile.BadZipFile, zipfile.LargeZipFile, etree.XMLSyntaxError, ValueError, EOFError) as e:
+        _reject(f"Invalid template: unreadable [Content_Types].xml ({str(e)})")
+
+    names = {info.filename for info in members}
+    overrides = {
+        override.get("PartName", "").lstrip("/"): override.get("ContentType")
+        for override in types.iterfind("ct:Override", _CT_NS)
+    }
+    if not any(ct in _MAIN_CONTENT_TYPES and name in names for name, ct in overrides.items()):
+        _reject("Invalid template: not a PowerPoint presentation (no presentation part)")
+
+    return TemplateStats(
+        slide_count=sum(1 for ct in overrides.values() if ct == CT.PML_SLIDE),
+        layout_count=sum(1 for ct in overrides.values() if ct == CT.PML_SLIDE_LAYOUT),
+        part_count=len(members),
+        media_bytes=media_bytes,
+        package_bytes=package_bytes,
+        uncompressed_bytes=uncompressed_bytes,
+    )
@@ -0,0 +1,202 @@
+"""
+Shrink-to-fit font sizing from cached glyph advance tables
+"""
+import os
+import threading
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import ImageFont
+
+from app.config import settings
+
+
+# Size (px) fonts are measured at; advances are stored in em units
+_REF_SIZE = 256
+
+# Code points with a precomputed advance (Basic Latin through Latin Extended-B);
+# other characters are measured on first use
+_TABLE_SIZE = 0x250
+
+# Font sizes are tried in steps of half a point
+_SIZE_STEP = 0.5
+
+_FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+
+# Metric-compatible substitutes (same advance widths) for common Office fonts
+_SUBSTITUTES = {
+    "arial": "liberation sans",
+    "helvetica": "liberation sans",
+    "times new roman": "liberation serif",
+    "courier new": "liberation mono",
+    "calibri": "carlito",
+    "cambria": "caladea",
+}
+
+
+class FontMetrics:
+    """Advance widths and line height of one font face, in em units"""
+
+    def __init__(self, font: ImageFont.FreeTypeFont):
+        self._font = font
+        ascent, descent = font.getmetrics()
+        self.line_height = (ascent + descent) / _REF_SIZE
+        self._table = np.array([font.getlength(chr(code)) for code in range(_TABLE_SIZE)]) / _REF_SIZE
+        self._extra: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def advances(self, text: str) -> np.ndarray:
+        """Advance width of every character of `text` (em)"""
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        widths = np.empty(len(codes))
+        in_table = codes < _TABLE_SIZE
+        widths[in_table] = self._table[codes[in_table]]
+        for index in np.flatnonzero(~in_table):
+            widths[index] = self._advance(int(codes[index]))
+        return widths
+
+    def _advance(self, code: int) -> float:
+        with self._lock:
+            if code not in self._extra:
+                self._extra[code] = self._font.getlength(chr(code)) / _REF_SIZE
+            return self._extra[code]
+
+
+@lru_cache(maxsize=1)
+def _installed_fonts() -> Dict[Tuple[str, bool, bool], str]:
+    """(family in lowercase, bold, italic) -> font file, for the fonts in TEXT_FIT_FONT_DIRS"""
+    fonts = {}
+    for directory in settings.TEXT_FIT_FONT_DIRS:
+        for root, _, files in os.walk(os.path.expanduser(directory)):
+            for filename in sorted(files):
+                if not filename.lower().endswith(_FONT_EXTENSIONS):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    family, style = ImageFont.truetype(path, _REF_SIZE).getname()
+                except OSError:
+                    continue
+                style = (style or "").lower()
+                key = ((family or "").lower(), "bold" in style, "italic" in style or "oblique" in style)
+                fonts.setdefault(key, path)
+    return fonts
+
+
+@lru_cache(maxsize=64)
+def get_font_metrics(family: Optional[str], bold: bool = False, italic: bool = False) -> FontMetrics:
+    """
+    Metrics of an installed font, loaded once per process.
+
+    Falls back to a metric-compatible substitute (e.g. Liberation Sans for
+    Arial), the regular style of the family, TEXT_FIT_FALLBACK_FONT and
+    finally Pillow's built-in font, so fitting works (approximately) on
+    hosts without the deck's fonts.
+
+    Args:
+        family: Font family name (None for the fallback font)
+        bold: Bold face
+        italic: Italic face
+    """
+    fonts = _installed_fonts()
+    substitute = _SUBSTITUTES.get((family or "").lower())
+    candidates = [
+        (family, bold, italic),
+        (substitute, bold, italic),
+        (family, False, False),
+        (substitute, False, False),
+        (settings.TEXT_FIT_FALLBACK_FONT, bold, italic),
+        (settings.TEXT_FIT_FALLBACK_FONT, False, False),
+    ]
+    for name, is_bold, is_italic in candidates:
+        path = fonts.get(((name or "").lower(), is_bold, is_italic))
+        if path:
+            return FontMetrics(ImageFont.truetype(path, _REF_SIZE))
+    return FontMetrics(ImageFont.load_default(_REF_SIZE))
+
+
+class _Paragraphs:
+    """Cumulative advances and space positions of each paragraph of a text"""
+
+    def __init__(self, metrics: FontMetrics, text: str):
+        self.items = []
+        for paragraph in text.replace("\v", "\n").split("\n"):
+            codes = np.frombuffer(paragraph.encode("utf-32-le"), dtype=np.uint32)
+            edges = np.concatenate(([0.0], np.cumsum(metrics.advances(paragraph))))
+            self.items.append((edges.tolist(), np.flatnonzero(codes == ord(" ")).tolist(), len(paragraph)))
+
+    def count_lines(self, width_em: float) -> int:
+        lines = 0
+        for edges, spaces, length in self.items:
+            start = 0
+            lines += 1
+            while True:
+                # First character (index) that does not fit on this line
+                end = bisect_right(edges, edges[start] + width_em) - 1
+                if end >= length:
+                    break
+                last_space = bisect_right(spaces, end) - 1
+                if last_space >= 0 and spaces[last_space] >= start:
+                    start = spaces[last_space] + 1
+                else:
+                    start = max(end, start + 1)
+                if start >= length:
+                    break
+                lines += 1
+        return lines
+
+
+def count_lines(metrics: FontMetrics, text: str, width_em: float) -> int:
+    """
+    Lines `text` wraps to in a box `width_em` wide (em of the font size).
+
+    Words wrap greedily at spaces, words longer than a line are broken, and
+    "\\n"/"\\v" are hard breaks. Advances are summed once per text (NumPy)
+    and each line is a binary search over them, so the cost grows with
+    lines, not characters.
+    """
+    return _Paragraphs(metrics, text).count_lines(width_em)
+
+
+def fit_font_size(
+    text: str,
+    width_pt: float,
+    height_pt: float,
+    max_size: float,
+    min_size: float,
+    family: Optional[str] = None,
+    bold: bool = False,
+    italic: bool = False,
+) -> float:
+    """
+    Largest font size (points) at which `text` fits a box, by binary search
+
+    Args:
+        text: Text to fit
+        width_pt: Box width in points (inside the text frame margins)
+        height_pt: Box height in points
+        max_size: Largest size to consider
+        min_size: Smallest size returned, even if the text does not fit
+
+    Returns:
+        Font size in points, a multiple of half a point
+    """
+    metrics = get_font_metrics(family, bold, italic)
+    paragraphs = _Paragraphs(metrics, text)
+    sizes = np.arange(min_size, max(max_size, min_size) + _SIZE_STEP / 2, _SIZE_STEP)
+
+    def fits(size: float) -> bool:
+        return paragraphs.count_lines(width_pt / size) * metrics.line_height * size <= height_pt
+
+    low, high = 0, len(sizes) - 1
+    if fits(sizes[high]):
+        return float(sizes[high])
+    # Invariant: sizes[high] does not fit; sizes[low] fits or is the minimum
+    while high - low > 1:
+        middle = (low + high) // 2
+        if fits(sizes[middle]):
+            low = middle
+        else:
+            high = middle
+    return float(sizes[low])
@@ -0,0 +1,345 @@
+"""
+Request tracing: W3C trace context propagation and OpenTelemetry-compatible spans
+"""
+import atexit
+import importlib
+import json
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# Spans are exported in batches from a background thread
+_BATCH_SIZE = 512
+_BATCH_INTERVAL = 1.0
+_QUEUE_SIZE = 8192
+
+
+class Span:
+    """One timed step of a request (the OpenTelemetry span model, minus events and links)"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "sampled",
+                 "start_ns", "end_ns", "attributes", "status", "status_message")
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: Optional[str], sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, object] = {}
+        self.status = "unset"
+        self.status_message = ""
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent header value identifying this span"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, object]):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def set_error(self, message: str):
+        self.status = "error"
+        self.status_message = message
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+            "status_message": self.status_message,
+            "pid": os.getpid(),
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span when tracing is disabled"""
+
+    traceparent = None
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def set_attributes(self, attributes: Dict[str, object]):
+        pass
+
+    def set_error(self, message: str):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+# Span the current request (or worker task) is in
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, parent span_id, sampled) from a W3C traceparent header, None if invalid"""
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if not match:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", traceparent: Optional[str] = None, **attributes):
+    """
+    Time the enclosed block as a span, child of the current span (or of the
+    remote parent in `traceparent`). A no-op when tracing is disabled.
+
+    Args:
+        name: Span name, e.g. "pptx.save"
+        kind: "server" for incoming requests, "internal" otherwise
+        traceparent: W3C traceparent of a remote parent (incoming request, worker task)
+        attributes: Initial attributes (None values are skipped)
+    """
+    processor = _get_processor()
+    if processor is None:
+        yield _NOOP_SPAN
+        return
+
+    remote = parse_traceparent(traceparent)
+    parent = current_span.get()
+    if remote:
+        trace_id, parent_id, sampled = remote
+    elif parent is not None:
+        trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+    else:
+        trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+        sampled = random.random() < processor.sample_ratio
+
+    current = Span(name, kind, trace_id, parent_id, sampled)
+    current.set_attributes(attributes)
+    token = current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set_error(f"{type(e).__name__}: {str(e)}")
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        current_span.reset(token)
+        if sampled:
+            processor.submit(current)
+
+
+def current_traceparent() -> Optional[str]:
+    """traceparent of the current span, to continue the trace in another process"""
+    current = current_span.get()
+    return current.traceparent if current is not None else None
+
+
+class SpanExporter:
+    """
+    Destination of finished spans. Subclass and name it in TRACING_EXPORTER
+    ("package.module:ClassName", constructed without arguments) to plug in
+    another backend.
+    """
+
+    def export(self, spans: List[Span]):
+        raise NotImplementedError
+
+
+class ConsoleExporter(SpanExporter):
+    """One JSON line per span on stderr"""
+
+    def export(self, spans: List[Span]):
+        for finished in spans:
+            sys.stderr.write(json.dumps(finished.to_dict(), default=str) + "\n")
+        sys.stderr.flush()
+
+
+class FileExporter(SpanExporter):
+    """One JSON line per span appended to a file (for air-gapped hosts)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def export(self, spans: List[Span]):
+        data = "".join(json.dumps(finished.to_dict(), default=str) + "\n" for finished in spans)
+        # One O_APPEND write per batch, so processes sharing the file do not interleave lines
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, data.encode("utf-8"))
+        finally:
+            os.close(fd)
+
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPExporter(SpanExporter):
+    """OTLP/HTTP with JSON encoding (OpenTelemetry Collector, Jaeger, Tempo...) without extra dependencies"""
+
+    _KINDS = {"internal": 1, "server": 2, "client": 3}
+
+    def __init__(self, endpoint: str, headers: Dict[str, str], service_name: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.headers = {"Content-Type": "application/json", **headers}
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def _payload(self, spans: List[Span]) -> Dict:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": self.service_name}},
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "pptx-api"},
+                "spans": [{
+                    "traceId": finished.trace_id,
+                    "spanId": finished.span_id,
+                    "parentSpanId": finished.parent_id or "",
+                    "name": finished.name,
+                    "kind": self._KINDS.get(finished.kind, 1),
+                    "startTimeUnixNano": str(finished.start_ns),
+                    "endTimeUnixNano": str(finished.end_ns),
+                    "attributes": [
+                        {"key": key, "value": _otlp_value(value)} for key, value in finished.attributes.items()
+                    ],
+                    "status": {"code": 2, "message": finished.status_message} if finished.status == "error" else {},
+                } for finished in spans],
+            }],
+        }]}
+
+    def export(self, spans: List[Span]):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(self._payload(spans)).encode("utf-8"), headers=self.headers, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class _BatchProcessor:
+    """Queues finished spans and exports them in batches from a daemon thread"""
+
+    def __init__(self, exporter: SpanExporter, sample_ratio: float):
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+        self._queue: "queue.Queue[Span]" = queue.Queue(_QUEUE_SIZE)
+        self._flush_requests: "queue.Queue[threading.Event]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, finished: Span):
+        try:
+            self._queue.put_nowait(finished)
+        except queue.Full:
+            pass  # Tracing must never slow requests down: drop
+
+    def flush(self, timeout: float = 5.0):
+        """Export everything queued so far (e.g. before a worker task returns)"""
+        done = threading.Event()
+        self._flush_requests.put(done)
+        done.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch = []
+            deadline = time.monotonic() + _BATCH_INTERVAL
+            while len(batch) < _BATCH_SIZE and self._flush_requests.empty():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=min(remaining, 0.05)))
+                except queue.Empty:
+                    continue
+            flushes = []
+            while not self._flush_requests.empty():
+                flushes.append(self._flush_requests.get())
+                while not self._queue.empty():
+                    batch.append(self._queue.get())
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                except Exception as e:
+                    sys.stderr.write(f"Span export failed: {str(e)}\n")
+            for done in flushes:
+                done.set()
+
+
+_processor: Optional[_BatchProcessor] = None
+_processor_pid: Optional[int] = None
+_processor_lock = threading.Lock()
+
+
+def _create_exporter(name: str) -> Optional[SpanExporter]:
+    from app.config import settings
+
+    if name == "none":
+        return None
+    if name == "console":
+        return ConsoleExporter()
+    if name == "file":
+        return FileExporter(settings.TRACING_FILE)
+    if name == "otlp":
+        headers = dict(
+            item.split("=", 1) for item in settings.TRACING_OTLP_HEADERS.split(",") if "=" in item
+        )
+        return OTLPExporter(settings.TRACING_OTLP_ENDPOINT, headers, settings.TRACING_SERVICE_NAME)
+    module_name, _, class_name = name.partition(":")
+    if not class_name:
+        raise Exception(f"Unknown TRACING_EXPORTER '{name}'")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def _get_processor() -> Optional[_BatchProcessor]:
+    """Span processor of this process (created on first use; None when tracing is off)"""
+    global _processor, _processor_pid
+    if _processor_pid == os.getpid():
+        return _processor
+    from app.config import settings
+
+    with _processor_lock:
+        if _processor_pid != os.getpid():
+            exporter = _create_exporter(settings.TRACING_EXPORTER)
+            _processor = _BatchProcessor(exporter, settings.TRACING_SAMPLE_RATIO) if exporter else None
+            _processor_pid = os.getpid()
+            if _processor is not None:
+                atexit.register(_processor.flush)
+        return _processor
+
+
+def flush():
+    """Export the spans still queued in this process"""
+    processor = _get_processor()
+    if processor is not None:
+        processor.flush()
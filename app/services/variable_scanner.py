@@ -0,0 +1,135 @@
+"""
+Variable scanner working directly on the XML parts of a .pptx package
+"""
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from lxml import etree
+
+from app.models.schemas import VariableInfo
+from app.services.package_reader import NS, RT_NOTES, PackageReader
+
+
+VAR_REGEX = re.compile(r"\{\{(.*?)\}\}")
+
+# Alt Text prefixes and the variable type they declare (no prefix means image)
+ALT_TEXT_TYPES = ("image", "video", "table", "chart")
+
+# Precompiled once: paragraphs and non-visual properties that may hold a
+# variable. The contains() filters run in libxml2, so parts without any
+# '{{' cost one tree walk and no Python per element.
+_PARAGRAPHS = etree.XPath("//a:p[contains(string(.), '{{')]", namespaces=NS)
+_ALT_TEXTS = etree.XPath(
+    "//p:cNvPr[contains(@descr, '{{') or contains(@title, '{{')]", namespaces=NS
+)
+_PARAGRAPH_TEXT = etree.XPath("string(.)")
+_SHAPE = etree.XPath(
+    "ancestor::*[self::p:sp or self::p:pic or self::p:graphicFrame or self::p:cxnSp][1]",
+    namespaces=NS
+)
+_GROUPS = etree.XPath("ancestor::p:grpSp/p:nvGrpSpPr/p:cNvPr/@name", namespaces=NS)
+_SHAPE_PROPS = etree.XPath("./*/p:cNvPr", namespaces=NS)
+_CELL = etree.XPath("ancestor::a:tc[1]", namespaces=NS)
+_CELL_COLUMN = etree.XPath("count(preceding-sibling::a:tc)", namespaces=NS)
+_CELL_ROW = etree.XPath("count(../preceding-sibling::a:tr)", namespaces=NS)
+
+
+def classify(match: str, alt_text: bool) -> Optional[Tuple[str, str]]:
+    """
+    Map the content of a {{...}} match to (type, name).
+
+    Returns None for markers that are not variables (like {{/each}}).
+    """
+    if alt_text:
+        for prefix in ALT_TEXT_TYPES:
+            if match.startswith(prefix + ":"):
+                return prefix, match[len(prefix) + 1:]
+        return "image", match
+    if match == "/each":
+        return None
+    if match.startswith("#each "):
+        return "repeat", match[len("#each "):].strip()
+    return "text", match
+
+
+class VariableScanner:
+    """Finds {{variables}} in slides, notes, layouts and masters of a package"""
+
+    def scan(self, path: Path, include_layouts: bool = True) -> List[VariableInfo]:
+        """
+        Scan a .pptx file for variables.
+
+        Every occurrence is reported with its part and location (shape,
+        group path, table cell or Alt Text); repeated occurrences in the
+        same place are reported once.
+
+        Args:
+            path: Path to the .pptx file
+            include_layouts: Also scan slide layouts and masters
+
+        Returns:
+            List of VariableInfo in slide order, then layouts and masters
+        """
+        variables: List[VariableInfo] = []
+        seen = set()
+
+        with PackageReader(path) as pkg:
+            parts: List[Tuple[str, str, Optional[int]]] = []
+            for slide_idx, slide_part in enumerate(pkg.slide_partnames()):
+                parts.append((slide_part, "slide", slide_idx))
+                notes_part = pkg.related(slide_part, RT_NOTES)
+                if notes_part:
+                    parts.append((notes_part, "notes", slide_idx))
+            if include_layouts:
+                parts.extend((name, "layout", None) for name in pkg.partnames("ppt/slideLayouts"))
+                parts.extend((name, "master", None) for name in pkg.partnames("ppt/slideMasters"))
+
+            for partname, part_type, slide_idx in parts:
+                for info in self._scan_part(pkg.xml(partname), partname, part_type, slide_idx):
+                    key = (info.type, info.name, info.part, info.shape_id, info.location, info.row, info.column)
+                    if key not in seen:
+                        seen.add(key)
+                        variables.append(info)
+
+        return variables
+
+    def _scan_part(self, root, partname: str, part_type: str, slide_idx: Optional[int]):
+        for paragraph in _PARAGRAPHS(root):
+            shape = _SHAPE(paragraph)
+            shape_info = self._shape_info(shape[0] if shape else None)
+            location, row, column = "text", None, None
+            cell = _CELL(paragraph)
+            if cell:
+                location = "table_cell"
+                row, column = int(_CELL_ROW(cell[0])), int(_CELL_COLUMN(cell[0]))
+
+            for match in VAR_REGEX.findall(_PARAGRAPH_TEXT(paragraph)):
+                classified = classify(match, alt_text=False)
+                if classified:
+                    yield VariableInfo(
+                        name=classified[1], type=classified[0], slide_index=slide_idx,
+                        part=partname, part_type=part_type, location=location, row=row, column=column,
+                        **shape_info
+                    )
+
+        for cNvPr in _ALT_TEXTS(root):
+            # descr wins over title, as in PPTXService._get_alt_text
+            alt_text = cNvPr.get("descr") or cNvPr.get("title") or ""
+            shape_info = self._shape_info(cNvPr.getparent().getparent())
+            for match in VAR_REGEX.findall(alt_text):
+                var_type, name = classify(match, alt_text=True)
+                yield VariableInfo(
+                    name=name, type=var_type, slide_index=slide_idx,
+                    part=partname, part_type=part_type, location="alt_text",
+                    **shape_info
+                )
+
+    def _shape_info(self, shape) -> Dict:
+        if shape is None:
+            return {"shape_id": None, "shape_name": None}
+        groups = _GROUPS(shape)
+        props = _SHAPE_PROPS(shape)
+        shape_id = int(props[0].get("id")) if props and props[0].get("id", "").isdigit() else None
+        name = props[0].get("name") if props else None
+        return {"shape_id": shape_id, "shape_name": "/".join([*groups, name or ""]) if groups else name}
@@ -0,0 +1,248 @@
+"""
+Suite de microbenchmarks offline para PPTXService y FileService.
+
+No necesita servidor ni archivos externos: genera templates sintéticos
+deterministas (ver synthetic_deck.py) en un directorio temporal y llama a los
+servicios directamente.
+
+Uso:
+    python scripts/benchmark.py --preset medium --output results.json
+    python scripts/benchmark.py --preset medium --compare baseline.json --threshold 0.15
+
+Con --compare el script termina con código 1 si algún benchmark es más lento
+que la baseline por encima del umbral (comparando medianas).
+"""
+import argparse
+import asyncio
+import io
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from fastapi import UploadFile
+
+# Añadir la raíz del proyecto al sys.path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.config import settings  # noqa: E402
+from app.services.file_service import FileService  # noqa: E402
+from app.services.pptx_service import PPTXService  # noqa: E402
+from app.services.variable_scanner import VariableScanner  # noqa: E402
+from synthetic_deck import (  # noqa: E402
+    IMAGE_VARIABLE, VIDEO_VARIABLE, DeckSpec, build_template, make_image, make_video, text_variable
+)
+
+PRESETS = {
+    "small": DeckSpec(slides=5, shapes_per_slide=4, placeholders=2, run_fragments=1, media_bytes=20_000),
+    "medium": DeckSpec(slides=40, shapes_per_slide=8, placeholders=3, run_fragments=3, media_bytes=100_000),
+    "large": DeckSpec(slides=200, shapes_per_slide=12, placeholders=4, run_fragments=4, media_bytes=250_000),
+}
+
+
+class Bench:
+    """Contexto compartido por los benchmarks: servicios y fixtures"""
+
+    def __init__(self, workdir: Path, spec: DeckSpec):
+        self.workdir = workdir
+        self.spec = spec
+        # Caché de templates dentro del directorio temporal: se borra con él
+        settings.TEMPLATE_SHM_DIR = str(workdir / "shm")
+        self.file_service = FileService(str(workdir))
+        self.pptx_service = PPTXService(self.file_service)
+
+        self.template_id = "bench-template"
+        self.template_path = self.file_service.templates_dir / f"{self.template_id}.pptx"
+        build_template(self.template_path, spec)
+
+        self.image_path = make_image(workdir / "insert.png", 200_000, spec.seed + 10_000)
+        self.video_path = make_video(workdir / "insert.mp4", frames=50, seed=spec.seed)
+        self.poster_path = self.file_service.extract_poster_frame(self.video_path)
+
+        self.base_presentation = "bench-base"
+        self.pptx_service.create_presentation(self.template_id, self.base_presentation)
+        self._counter = 0
+
+    def fresh_presentation(self) -> str:
+        """Copia de trabajo nueva (fuera del tiempo medido)"""
+        self._counter += 1
+        presentation_id = f"bench-{self._counter}"
+        shutil.copyfile(
+            self.file_service.get_presentation_path(self.base_presentation),
+            self.file_service.create_presentation_path(presentation_id)
+        )
+        return presentation_id
+
+
+def _upload(bench: Bench):
+    data = bench.template_path.read_bytes()
+    upload = UploadFile(file=io.BytesIO(data), filename="bench.pptx")
+    template_id, _, _ = asyncio.run(bench.file_service.save_template(upload))
+    return lambda: bench.file_service.delete_template(template_id)
+
+
+def _scan(bench: Bench):
+    # Directamente con el scanner: get_template_variables devuelve el resultado
+    # guardado en la caché de templates y solo mediría su lectura
+    VariableScanner().scan(bench.template_path)
+
+
+def _create(bench: Bench):
+    bench._counter += 1
+    bench.pptx_service.create_presentation(bench.template_id, f"bench-create-{bench._counter}")
+
+
+def _save(bench: Bench, prs) -> None:
+    # Por el mismo camino que el servicio (package_writer, tmp + rename)
+    bench.pptx_service._save(prs, bench.workdir / "save.pptx")
+
+
+def _text_fill(bench: Bench, presentation_id: str):
+    bench.pptx_service.insert_text(presentation_id, text_variable(0, 0), "Valor de prueba")
+
+
+def _image_insert(bench: Bench, presentation_id: str):
+    bench.pptx_service.insert_image(presentation_id, IMAGE_VARIABLE, str(bench.image_path))
+
+
+def _video_insert(bench: Bench, presentation_id: str):
+    bench.pptx_service.insert_video(presentation_id, VIDEO_VARIABLE, str(bench.video_path), str(bench.poster_path))
+
+
+def _measure(run: Callable[[], Optional[Callable]], setup: Optional[Callable] = None,
+             repeat: int = 5, warmup: int = 1) -> Dict:
+    """Ejecutar `run` varias veces; `setup` prepara argumentos fuera del tiempo medido"""
+    samples: List[float] = []
+    for i in range(warmup + repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        teardown = run(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+        if callable(teardown):
+            teardown()
+        if i >= warmup:
+            samples.append(elapsed)
+
+    samples.sort()
+    return {
+        "runs": len(samples),
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p90_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.9))], 3),
+        "max_ms": round(samples[-1], 3),
+        "stdev_ms": round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+    }
+
+
+def run_suite(spec: DeckSpec, repeat: int, warmup: int, only: Optional[List[str]] = None) -> Dict:
+    """Ejecutar todos los benchmarks y devolver los resultados en formato JSON"""
+    with tempfile.TemporaryDirectory() as tmp:
+        bench = Bench(Path(tmp), spec)
+        fresh = lambda: (bench.fresh_presentation(),)  # noqa: E731
+        loaded = lambda: (bench.pptx_service._load(  # noqa: E731
+            bench.file_service.get_presentation_path(bench.base_presentation), "presentation"
+        ),)
+
+        benchmarks = {
+            "upload": (lambda: _upload(bench), None),
+            "scan": (lambda: _scan(bench), None),
+            "create": (lambda: _create(bench), None),
+            "save": (lambda prs: _save(bench, prs), loaded),
+            "text_fill": (lambda pid: _text_fill(bench, pid), fresh),
+            "image_insert": (lambda pid: _image_insert(bench, pid), fresh),
+            "video_insert": (lambda pid: _video_insert(bench, pid), fresh),
+        }
+
+        results = {}
+        for name, (run, setup) in benchmarks.items():
+            if only and name not in only:
+                continue
+            results[name] = _measure(run, setup, repeat=repeat, warmup=warmup)
+            print(f"  {name:<14} median {results[name]['median_ms']:>10.2f} ms  "
+                  f"(min {results[name]['min_ms']:.2f}, p90 {results[name]['p90_ms']:.2f})")
+
+        template_bytes = bench.template_path.stat().st_size
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "spec": asdict(spec),
+            "template_bytes": template_bytes,
+            "repeat": repeat,
+            "warmup": warmup,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Devolver la lista de benchmarks que empeoraron más que `threshold`"""
+    regressions = []
+    if current["meta"]["spec"] != baseline["meta"]["spec"]:
+        print("⚠️ La baseline se generó con otra DeckSpec; la comparación puede no ser válida.")
+
+    print(f"\n{'benchmark':<14} {'baseline':>12} {'actual':>12} {'cambio':>9}")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base:
+            continue
+        change = (result["median_ms"] - base["median_ms"]) / base["median_ms"] if base["median_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  ❌ REGRESIÓN"
+        print(f"{name:<14} {base['median_ms']:>10.2f}ms {result['median_ms']:>10.2f}ms {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks de PPTXService/FileService")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--slides", type=int)
+    parser.add_argument("--shapes", type=int)
+    parser.add_argument("--placeholders", type=int)
+    parser.add_argument("--fragments", type=int)
+    parser.add_argument("--media-bytes", type=int)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--only", nargs="*", help="Ejecutar solo estos benchmarks")
+    parser.add_argument("--output", type=Path, help="Guardar resultados en JSON")
+    parser.add_argument("--compare", type=Path, help="JSON de baseline para detectar regresiones")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Empeoramiento tolerado (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    spec = PRESETS[args.preset]
+    overrides = {
+        "slides": args.slides, "shapes_per_slide": args.shapes, "placeholders": args.placeholders,
+        "run_fragments": args.fragments, "media_bytes": args.media_bytes, "seed": args.seed,
+    }
+    spec = DeckSpec(**{**asdict(spec), **{k: v for k, v in overrides.items() if v is not None}})
+
+    print(f"⏱️ Benchmarks PPTX ({args.preset}): {asdict(spec)}")
+    results = run_suite(spec, args.repeat, args.warmup, args.only)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResultados guardados en {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ Regresiones detectadas: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ Sin regresiones respecto a la baseline.")
+
+
+if __name__ == "__main__":
+    main()
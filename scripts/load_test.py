@@ -0,0 +1,401 @@
+"""
+Generador de carga por escenarios para la PPTX API (reemplaza a stress_test.py).
+
+Modos:
+  - open:   tasa de llegada constante (open-loop). Cada usuario virtual arranca
+            en su instante programado aunque el servidor vaya lento, y la
+            latencia del flujo se mide desde ese instante (sin coordinated omission).
+  - closed: concurrencia fija. N usuarios virtuales repiten el flujo en bucle.
+
+Fases: warmup (no se mide) → ramp (la tasa/concurrencia sube linealmente) → steady.
+
+Cada usuario virtual ejecuta: create → N textos → M imágenes → K videos → download → delete.
+
+Los fixtures (template, imagen y video) se generan localmente con
+synthetic_deck.py, así que basta con tener el servidor levantado:
+
+    python scripts/load_test.py --scenario scripts/scenarios/mixed.json --output load.json
+    python scripts/load_test.py --mode open --rate 5 --duration 60
+
+Requiere aiohttp: pip install -r requirements-dev.txt
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+from synthetic_deck import DeckSpec, build_template, make_image, make_video, text_variable, IMAGE_VARIABLE, VIDEO_VARIABLE
+
+BASE_URL = os.getenv("API_URL", "http://localhost:8000")
+API_TOKEN = os.getenv("API_TOKEN", "changeme_in_production")
+
+
+class Histogram:
+    """
+    Histograma log-lineal al estilo HDR.
+
+    Los valores (en microsegundos) se agrupan en buckets con precisión relativa
+    fija (2**-sub_bucket_bits), así que los percentiles altos son fiables sin
+    guardar todas las muestras y los histogramas se pueden combinar sumando.
+    """
+
+    def __init__(self, sub_bucket_bits: int = 7):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.counts: Counter = Counter()
+        self.total = 0
+        self.sum = 0
+        self.min: Optional[int] = None
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        magnitude = max(0, value.bit_length() - self.sub_bucket_bits)
+        return (magnitude << self.sub_bucket_bits) | (value >> magnitude)
+
+    def _value_at(self, index: int) -> int:
+        magnitude = index >> self.sub_bucket_bits
+        sub = index & ((1 << self.sub_bucket_bits) - 1)
+        # Punto medio del bucket
+        return (sub << magnitude) + ((1 << magnitude) >> 1)
+
+    def record(self, value_ms: float):
+        value = max(1, int(value_ms * 1000))
+        self.counts[self._index(value)] += 1
+        self.total += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, pct: float) -> float:
+        """Percentil en milisegundos"""
+        if not self.total:
+            return 0.0
+        target = max(1, math.ceil(self.total * pct / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._value_at(index), self.max) / 1000
+        return self.max / 1000
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.total,
+            "mean_ms": round(self.sum / self.total / 1000, 3) if self.total else 0.0,
+            "min_ms": round((self.min or 0) / 1000, 3),
+            **{f"p{str(p).replace('.', '_')}_ms": round(self.percentile(p), 3) for p in (50, 90, 95, 99, 99.9)},
+            "max_ms": round(self.max / 1000, 3),
+        }
+
+
+@dataclass
+class Workload:
+    """Pasos de un usuario virtual"""
+    texts: int = 3
+    images: int = 1
+    videos: int = 0
+    download: bool = True
+    cleanup: bool = True
+
+
+@dataclass
+class Scenario:
+    """Definición de un escenario de carga"""
+    name: str = "mixed"
+    mode: str = "open"               # open | closed
+    rate: float = 2.0                # Usuarios virtuales por segundo (open)
+    concurrency: int = 10            # Usuarios virtuales simultáneos (closed)
+    warmup_s: float = 5.0
+    ramp_s: float = 10.0
+    duration_s: float = 30.0         # Fase steady
+    max_in_flight: int = 500         # Límite de seguridad en modo open
+    timeout_s: float = 120.0
+    workload: Workload = field(default_factory=Workload)
+    template: DeckSpec = field(default_factory=lambda: DeckSpec(slides=10, media_bytes=50_000))
+
+    @classmethod
+    def load(cls, path: Path) -> "Scenario":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        workload = Workload(**data.pop("workload", {}))
+        template = DeckSpec(**data.pop("template", {}))
+        return cls(**data, workload=workload, template=template)
+
+
+class Recorder:
+    """Histogramas por paso, solo para iteraciones que empezaron tras el warmup"""
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self.statuses: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.completed = 0
+        self.dropped = 0
+
+    def record(self, step: str, latency_ms: float, status: int, error: Optional[str] = None):
+        self.histograms.setdefault(step, Histogram()).record(latency_ms)
+        self.statuses[f"{step}:{status}"] += 1
+        if error or status == 0 or status >= 400:
+            self.errors[f"{step}: {error or status}"] += 1
+
+
+class VirtualUser:
+    """Ejecuta el flujo create → text → image → video → download → delete"""
+
+    def __init__(self, session, scenario: Scenario, fixtures: Dict[str, Path], template_id: str):
+        self.session = session
+        self.scenario = scenario
+        self.fixtures = fixtures
+        self.template_id = template_id
+        self.headers = {"Authorization": f"Bearer {API_TOKEN}"}
+
+    async def _call(self, recorder: Optional[Recorder], step: str, method: str, path: str, **kwargs):
+        start = time.perf_counter()
+        status, body, error = 0, None, None
+        try:
+            async with self.session.request(method, f"{BASE_URL}{path}", headers=self.headers, **kwargs) as resp:
+                status = resp.status
+                body = await resp.read()
+        except Exception as e:
+            error = type(e).__name__
+        if recorder:
+            recorder.record(step, (time.perf_counter() - start) * 1000, status, error)
+        return status, body
+
+    def _media_form(self, field_name: str, path: Path):
+        import aiohttp
+        form = aiohttp.FormData()
+        form.add_field("variable_name", IMAGE_VARIABLE if field_name == "image" else VIDEO_VARIABLE)
+        form.add_field(field_name, path.read_bytes(), filename=path.name)
+        return form
+
+    async def run(self, recorder: Optional[Recorder]) -> bool:
+        workload = self.scenario.workload
+        status, body = await self._call(recorder, "create", "POST", "/api/v1/presentations/create",
+                                        json={"template_id": self.template_id})
+        if status != 201:
+            return False
+        presentation_id = json.loads(body)["presentation_id"]
+        base = f"/api/v1/presentations/{presentation_id}"
+        ok = True
+
+        for i in range(workload.texts):
+            variable = text_variable(i % max(1, self.scenario.template.slides), 0)
+            status, _ = await self._call(recorder, "text", "POST", f"{base}/text",
+                                         json={"variable_name": variable, "text": f"Carga {i}"})
+            ok &= status == 200
+        # La imagen/video de referencia desaparece tras el primer reemplazo, así que solo el primero debe ser 200
+        for i in range(workload.images):
+            status, _ = await self._call(recorder, "image" if i == 0 else "image_repeat", "POST", f"{base}/image",
+                                         data=self._media_form("image", self.fixtures["image"]))
+            ok &= status == 200 or i > 0
+        for i in range(workload.videos):
+            status, _ = await self._call(recorder, "video" if i == 0 else "video_repeat", "POST", f"{base}/video",
+                                         data=self._media_form("video", self.fixtures["video"]))
+            ok &= status == 200 or i > 0
+        if workload.download:
+            status, _ = await self._call(recorder, "download", "GET", f"{base}/download")
+            ok &= status == 200
+        if workload.cleanup:
+            await self._call(None, "delete", "DELETE", base)
+        return ok
+
+
+class LoadRunner:
+    """Programa usuarios virtuales según el modo del escenario"""
+
+    def __init__(self, scenario: Scenario, fixtures: Dict[str, Path], template_id: str):
+        self.scenario = scenario
+        self.fixtures = fixtures
+        self.template_id = template_id
+        self.recorder = Recorder()
+        self.in_flight = 0
+
+    def _arrival_times(self):
+        """
+        Instantes de llegada (relativos a t0): warmup al 10% de la tasa,
+        rampa lineal del 10% al 100% y después tasa constante
+        """
+        s = self.scenario
+        t = 0.0
+        end = s.warmup_s + s.ramp_s + s.duration_s
+        while t < end:
+            yield t
+            if t < s.warmup_s:
+                rate = s.rate * 0.1
+            elif t < s.warmup_s + s.ramp_s:
+                rate = s.rate * (0.1 + 0.9 * (t - s.warmup_s) / s.ramp_s)
+            else:
+                rate = s.rate
+            t += 1.0 / rate
+
+    async def _iteration(self, user: VirtualUser, scheduled: float, measured: bool):
+        self.in_flight += 1
+        try:
+            ok = await user.run(self.recorder if measured else None)
+            if measured:
+                # Latencia del flujo completo desde el instante programado
+                self.recorder.record("flow", (time.perf_counter() - scheduled) * 1000, 200 if ok else 500)
+                self.recorder.completed += 1
+        finally:
+            self.in_flight -= 1
+
+    async def run_open(self, session):
+        s = self.scenario
+        t0 = time.perf_counter()
+        tasks = []
+        user = VirtualUser(session, s, self.fixtures, self.template_id)
+        for offset in self._arrival_times():
+            delay = t0 + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.in_flight >= s.max_in_flight:
+                self.recorder.dropped += 1
+                continue
+            tasks.append(asyncio.create_task(self._iteration(user, t0 + offset, offset >= s.warmup_s)))
+        await asyncio.gather(*tasks)
+
+    async def run_closed(self, session):
+        s = self.scenario
+        t0 = time.perf_counter()
+        end = t0 + s.warmup_s + s.ramp_s + s.duration_s
+
+        async def worker(idx: int):
+            # El primer usuario calienta el servidor; el resto arranca escalonado durante la rampa
+            if idx:
+                await asyncio.sleep(s.warmup_s + s.ramp_s * idx / s.concurrency)
+            user = VirtualUser(session, s, self.fixtures, self.template_id)
+            while time.perf_counter() < end:
+                scheduled = time.perf_counter()
+                await self._iteration(user, scheduled, scheduled - t0 >= s.warmup_s)
+
+        await asyncio.gather(*(worker(i) for i in range(s.concurrency)))
+
+    async def run(self) -> Dict:
+        import aiohttp
+        s = self.scenario
+        connector = aiohttp.TCPConnector(limit=max(s.concurrency, s.max_in_flight))
+        timeout = aiohttp.ClientTimeout(total=s.timeout_s)
+        start = time.perf_counter()
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            if s.mode == "open":
+                await self.run_open(session)
+            else:
+                await self.run_closed(session)
+        elapsed = time.perf_counter() - start
+
+        measured_s = max(1e-9, elapsed - s.warmup_s)
+        return {
+            "scenario": asdict(s),
+            "target": BASE_URL,
+            "elapsed_s": round(elapsed, 3),
+            "completed_flows": self.recorder.completed,
+            "dropped_flows": self.recorder.dropped,
+            "flows_per_s": round(self.recorder.completed / measured_s, 3),
+            "steps": {name: h.summary() for name, h in sorted(self.recorder.histograms.items())},
+            "statuses": dict(self.recorder.statuses),
+            "errors": dict(self.recorder.errors.most_common(20)),
+        }
+
+
+async def upload_template(path: Path) -> str:
+    import aiohttp
+    form = aiohttp.FormData()
+    form.add_field("file", path.read_bytes(), filename="load_template.pptx")
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{BASE_URL}/api/v1/templates/upload", data=form,
+                                headers={"Authorization": f"Bearer {API_TOKEN}"}) as resp:
+            if resp.status != 201:
+                raise SystemExit(f"❌ No se pudo subir el template de prueba: {resp.status} {await resp.text()}")
+            return (await resp.json())["template_id"]
+
+
+async def delete_template(template_id: str):
+    import aiohttp
+    async with aiohttp.ClientSession() as session:
+        await session.delete(f"{BASE_URL}/api/v1/templates/{template_id}",
+                             headers={"Authorization": f"Bearer {API_TOKEN}"})
+
+
+def print_report(report: Dict):
+    print(f"\n📊 Resultados ({report['scenario']['mode']}-loop, {report['elapsed_s']}s)")
+    print(f"   Flujos completados: {report['completed_flows']} ({report['flows_per_s']}/s), descartados: {report['dropped_flows']}")
+    print(f"   {'paso':<14}{'n':>7}{'p50':>10}{'p90':>10}{'p99':>10}{'p99.9':>10}{'max':>10}  (ms)")
+    for name, st in report["steps"].items():
+        print(f"   {name:<14}{st['count']:>7}{st['p50_ms']:>10.1f}{st['p90_ms']:>10.1f}"
+              f"{st['p99_ms']:>10.1f}{st['p99_9_ms']:>10.1f}{st['max_ms']:>10.1f}")
+    if report["errors"]:
+        print("   ⚠️ Errores:")
+        for error, count in report["errors"].items():
+            print(f"      {count:>5} × {error}")
+
+
+def positive_float(value: str) -> float:
+    """Tipo de argparse para tasas: un float mayor que 0"""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' no es un número")
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"debe ser mayor que 0 (recibido {value})")
+    return number
+
+
+async def main():
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError:
+        print("❌ Error: Necesitas instalar aiohttp. Ejecuta: pip install -r requirements-dev.txt")
+        return
+
+    parser = argparse.ArgumentParser(description="Generador de carga por escenarios para la PPTX API")
+    parser.add_argument("--scenario", type=Path, help="Archivo JSON de escenario")
+    parser.add_argument("--mode", choices=["open", "closed"])
+    parser.add_argument("--rate", type=positive_float, help="Usuarios virtuales por segundo (open)")
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--warmup", type=float)
+    parser.add_argument("--ramp", type=float)
+    parser.add_argument("--duration", type=float)
+    parser.add_argument("--output", type=Path, help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    scenario = Scenario.load(args.scenario) if args.scenario else Scenario()
+    for attr, value in (("mode", args.mode), ("rate", args.rate), ("concurrency", args.concurrency),
+                        ("warmup_s", args.warmup), ("ramp_s", args.ramp), ("duration_s", args.duration)):
+        if value is not None:
+            setattr(scenario, attr, value)
+    if scenario.mode == "open" and not scenario.rate > 0:
+        parser.error(f"rate debe ser mayor que 0 en modo open (escenario: {scenario.rate})")
+
+    print(f"⚡ Load Test - PPTX API → {BASE_URL}")
+    print(f"   Escenario: {scenario.name} | modo {scenario.mode} | "
+          + (f"{scenario.rate} VU/s" if scenario.mode == "open" else f"{scenario.concurrency} VUs")
+          + f" | warmup {scenario.warmup_s}s, ramp {scenario.ramp_s}s, steady {scenario.duration_s}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        fixtures = {
+            "template": build_template(tmp_dir / "template.pptx", scenario.template),
+            "image": make_image(tmp_dir / "image.png", 100_000, scenario.template.seed),
+            "video": make_video(tmp_dir / "video.mp4", frames=25, seed=scenario.template.seed),
+        }
+        template_id = await upload_template(fixtures["template"])
+        try:
+            report = await LoadRunner(scenario, fixtures, template_id).run()
+        finally:
+            await delete_template(template_id)
+
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
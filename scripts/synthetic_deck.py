@@ -0,0 +1,143 @@
+"""
+Generador determinista de templates sintéticos para benchmarks y pruebas de carga.
+
+Todo el contenido sale de un RandomState con semilla fija: la misma DeckSpec
+produce siempre las mismas diapositivas, textos y píxeles.
+
+Uso:
+    python scripts/synthetic_deck.py out.pptx --slides 50 --shapes 8 --placeholders 3
+"""
+import argparse
+import math
+import tempfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import cv2
+import numpy as np
+from pptx import Presentation
+from pptx.util import Emu, Inches, Pt
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua ventas margen cliente"
+).split()
+
+IMAGE_VARIABLE = "logo"
+VIDEO_VARIABLE = "clip"
+
+
+@dataclass
+class DeckSpec:
+    """Parámetros del template sintético"""
+    slides: int = 10
+    shapes_per_slide: int = 6
+    placeholders: int = 2          # Cuadros con {{var}} por diapositiva
+    run_fragments: int = 1         # Runs en los que se parte cada {{var}}
+    media_bytes: int = 50_000      # Tamaño aproximado de la imagen por diapositiva (0 = sin imagen)
+    seed: int = 1234
+
+
+def text_variable(slide_idx: int, placeholder_idx: int) -> str:
+    """Nombre de la variable de texto en una posición dada"""
+    return f"var_{slide_idx}_{placeholder_idx}"
+
+
+def _fragment(text: str, parts: int) -> list[str]:
+    """Partir un texto en `parts` trozos (similar a lo que deja PowerPoint al editar)"""
+    parts = max(1, min(parts, len(text)))
+    step = math.ceil(len(text) / parts)
+    return [text[i:i + step] for i in range(0, len(text), step)]
+
+
+def make_image(path: Path, approx_bytes: int, seed: int) -> Path:
+    """PNG de ruido (incompresible) de aproximadamente `approx_bytes`"""
+    side = max(8, int(math.sqrt(approx_bytes / 3)))
+    rng = np.random.RandomState(seed)
+    pixels = rng.randint(0, 256, size=(side, side, 3), dtype=np.uint8)
+    cv2.imwrite(str(path), pixels)
+    return path
+
+
+def make_video(path: Path, frames: int = 30, width: int = 320, height: int = 180, seed: int = 1234) -> Path:
+    """MP4 (mp4v) determinista; el tamaño crece con `frames`"""
+    rng = np.random.RandomState(seed)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 25, (width, height))
+    try:
+        for _ in range(frames):
+            writer.write(rng.randint(0, 256, size=(height, width, 3), dtype=np.uint8))
+    finally:
+        writer.release()
+    return path
+
+
+def build_template(path: Path, spec: DeckSpec) -> Path:
+    """
+    Construir un template según `spec`.
+
+    La diapositiva 0 contiene además una imagen {{image:logo}} y una forma
+    {{video:clip}} para los benchmarks de inserción de medios.
+    """
+    rng = np.random.RandomState(spec.seed)
+    prs = Presentation()
+    blank = prs.slide_layouts[6]
+    slide_w, slide_h = prs.slide_width, prs.slide_height
+
+    cols = max(1, math.ceil(math.sqrt(spec.shapes_per_slide)))
+    rows = max(1, math.ceil(spec.shapes_per_slide / cols))
+    cell_w, cell_h = slide_w // cols, slide_h // rows
+
+    workdir = tempfile.TemporaryDirectory()
+    for slide_idx in range(spec.slides):
+        slide = prs.slides.add_slide(blank)
+
+        for shape_idx in range(spec.shapes_per_slide):
+            left = Emu((shape_idx % cols) * cell_w)
+            top = Emu((shape_idx // cols) * cell_h)
+            box = slide.shapes.add_textbox(left, top, Emu(cell_w), Emu(cell_h))
+            paragraph = box.text_frame.paragraphs[0]
+
+            if shape_idx < spec.placeholders:
+                pieces = ["Valor: "] + _fragment("{{" + text_variable(slide_idx, shape_idx) + "}}", spec.run_fragments)
+            else:
+                pieces = [" ".join(rng.choice(WORDS, size=8))]
+
+            for piece in pieces:
+                run = paragraph.add_run()
+                run.text = piece
+                run.font.size = Pt(14)
+
+        if spec.media_bytes > 0:
+            image_path = make_image(Path(workdir.name) / f"media_{slide_idx}.png", spec.media_bytes, spec.seed + slide_idx)
+            picture = slide.shapes.add_picture(str(image_path), Inches(0.2), Inches(0.2), Inches(1.5), Inches(1.5))
+            if slide_idx == 0:
+                picture._element.nvPicPr.cNvPr.set("descr", "{{image:" + IMAGE_VARIABLE + "}}")
+
+        if slide_idx == 0:
+            frame = slide.shapes.add_shape(1, Inches(5), Inches(4), Inches(4), Inches(2.25))
+            frame._element.nvSpPr.cNvPr.set("descr", "{{video:" + VIDEO_VARIABLE + "}}")
+
+    prs.save(str(path))
+    workdir.cleanup()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generar un template PPTX sintético")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--slides", type=int, default=DeckSpec.slides)
+    parser.add_argument("--shapes", type=int, default=DeckSpec.shapes_per_slide)
+    parser.add_argument("--placeholders", type=int, default=DeckSpec.placeholders)
+    parser.add_argument("--fragments", type=int, default=DeckSpec.run_fragments)
+    parser.add_argument("--media-bytes", type=int, default=DeckSpec.media_bytes)
+    parser.add_argument("--seed", type=int, default=DeckSpec.seed)
+    args = parser.parse_args()
+
+    spec = DeckSpec(args.slides, args.shapes, args.placeholders, args.fragments, args.media_bytes, args.seed)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    build_template(args.output, spec)
+    print(f"Template generado: {args.output} ({args.output.stat().st_size} bytes) {asdict(spec)}")
+
+
+if __name__ == "__main__":
+    main()
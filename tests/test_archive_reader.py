@@ -0,0 +1,140 @@
+"""
+archive_reader.iter_archive over zip and tar streams
+"""
+import io
+import os
+import struct
+import tarfile
+import zipfile
+
+import pytest
+
+from app.services.archive_reader import ArchiveError, iter_archive
+
+
+MB = 1024 * 1024
+
+
+class Trickle(io.RawIOBase):
+    """Forward-only stream returning short reads, like a request body"""
+
+    def __init__(self, data: bytes, step: int = 7919):
+        self._data = data
+        self._position = 0
+        self._step = step
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self._data)
+        end = self._position + min(size, self._step)
+        data = self._data[self._position:end]
+        self._position += len(data)
+        return data
+
+
+class Unseekable(io.RawIOBase):
+    """Write target that makes zipfile use data descriptors"""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        return self.buffer.write(data)
+
+
+def make_zip(members, compression=zipfile.ZIP_DEFLATED, descriptors=False) -> bytes:
+    target = Unseekable() if descriptors else io.BytesIO()
+    with zipfile.ZipFile(target, "w", compression=compression) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    return (target.buffer if descriptors else target).getvalue()
+
+
+def read_all(data: bytes, max_member_bytes: int = 64 * MB):
+    return [(name, size, member.read()) for name, size, member in iter_archive(Trickle(data), max_member_bytes)]
+
+
+MEMBERS = [
+    ("deck.pptx", os.urandom(300 * 1024)),
+    ("notes/readme.txt", b"hello " * 10000),
+    ("empty.txt", b""),
+]
+
+
+@pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_zip_members(compression):
+    members = read_all(make_zip(MEMBERS, compression))
+
+    assert [(name, data) for name, _, data in members] == MEMBERS
+    assert [size for _, size, _ in members] == [len(data) for _, data in MEMBERS]
+
+
+def test_zip_members_with_data_descriptors():
+    archive = make_zip(MEMBERS, descriptors=True)
+    assert struct.unpack_from("<H", archive, 6)[0] & 0x8
+
+    members = read_all(archive)
+
+    assert [(name, data) for name, _, data in members] == MEMBERS
+    # Sizes are only known once the member has been read
+    assert all(size is None for _, size, _ in members)
+
+
+def test_unread_members_are_skipped():
+    names = [name for name, _, _ in iter_archive(Trickle(make_zip(MEMBERS, descriptors=True)), 64 * MB)]
+
+    assert names == [name for name, _ in MEMBERS]
+
+
+def test_deflate_bomb_stops_at_the_member_limit():
+    archive = make_zip([("bomb.bin", bytes(64 * MB))], descriptors=True)
+    assert len(archive) < MB
+
+    with pytest.raises(ArchiveError, match="larger than"):
+        read_all(archive, max_member_bytes=MB)
+
+
+def test_crc_mismatch():
+    archive = bytearray(make_zip([("a.txt", b"payload")], zipfile.ZIP_STORED))
+    # CRC-32 field of the first local header
+    archive[14:18] = struct.pack("<I", 0xDEADBEEF)
+
+    with pytest.raises(ArchiveError, match="checksum"):
+        read_all(bytes(archive))
+
+
+@pytest.mark.parametrize("descriptors", [False, True])
+def test_truncated_stream(descriptors):
+    archive = make_zip(MEMBERS, descriptors=descriptors)
+
+    with pytest.raises(ArchiveError):
+        read_all(archive[:len(archive) // 2])
+
+
+def test_tar_gz():
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for name, data in MEMBERS:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+        directory = tarfile.TarInfo("folder")
+        directory.type = tarfile.DIRTYPE
+        tar.addfile(directory)
+
+    members = read_all(buffer.getvalue())
+
+    assert [(name, size, data) for name, size, data in members] == [
+        (name, len(data), data) for name, data in MEMBERS
+    ]
+
+
+def test_not_an_archive():
+    with pytest.raises(ArchiveError):
+        read_all(os.urandom(4096))
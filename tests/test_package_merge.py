@@ -0,0 +1,90 @@
+"""
+package_merge.merge_packages on decks built with python-pptx
+"""
+import io
+import os
+import zipfile
+
+from PIL import Image
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.util import Inches
+
+from app.services.package_merge import merge_packages
+
+
+def make_image(path, seed: int):
+    Image.frombytes("RGB", (64, 64), bytes((seed + i) % 256 for i in range(64 * 64 * 3))).save(path)
+    return path
+
+
+def make_deck(path, titles, image):
+    prs = Presentation()
+    for title in titles:
+        slide = prs.slides.add_slide(prs.slide_layouts[5])
+        slide.shapes.title.text = title
+        slide.shapes.add_picture(str(image), Inches(1), Inches(2))
+    prs.save(str(path))
+    return path
+
+
+def members(path, folder):
+    with zipfile.ZipFile(path) as zf:
+        return [name for name in zf.namelist() if name.startswith(folder)]
+
+
+def titles(prs):
+    return [slide.shapes.title.text for slide in prs.slides]
+
+
+def test_shared_master_and_image_are_written_once(tmp_path):
+    image = make_image(tmp_path / "logo.png", 1)
+    first = make_deck(tmp_path / "first.pptx", ["A1", "A2"], image)
+    second = make_deck(tmp_path / "second.pptx", ["B1"], image)
+    output = tmp_path / "merged.pptx"
+
+    report = merge_packages([first, second], output)
+
+    assert report.sources == 2
+    assert report.slides == 3
+    assert report.parts_deduplicated > 0
+    with zipfile.ZipFile(output) as zf:
+        assert zf.testzip() is None
+    assert len(members(output, "ppt/media/")) == 1
+    assert len(members(output, "ppt/slideMasters/slideMaster")) == 1
+    assert len(members(output, "ppt/slideLayouts/slideLayout")) == len(members(first, "ppt/slideLayouts/slideLayout"))
+
+    prs = Presentation(str(output))
+    assert titles(prs) == ["A1", "A2", "B1"]
+    # Every picture resolves to the single image part
+    pictures = [shape for slide in prs.slides for shape in slide.shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE]
+    assert len(pictures) == 3
+    assert len({picture.image.sha1 for picture in pictures}) == 1
+    # python-pptx can write it back
+    prs.save(io.BytesIO())
+
+
+def test_different_images_are_kept(tmp_path):
+    first = make_deck(tmp_path / "first.pptx", ["A1"], make_image(tmp_path / "a.png", 1))
+    second = make_deck(tmp_path / "second.pptx", ["B1"], make_image(tmp_path / "b.png", 2))
+    output = tmp_path / "merged.pptx"
+
+    merge_packages([first, second], output)
+
+    assert len(members(output, "ppt/media/")) == 2
+    assert titles(Presentation(str(output))) == ["A1", "B1"]
+
+
+def test_same_deck_twice(tmp_path):
+    deck = make_deck(tmp_path / "deck.pptx", ["A1", "A2"], make_image(tmp_path / "a.png", 1))
+    output = tmp_path / "merged.pptx"
+
+    report = merge_packages([deck, deck], output)
+
+    assert report.slides == 4
+    prs = Presentation(str(output))
+    assert titles(prs) == ["A1", "A2", "A1", "A2"]
+    slide_ids = [slide.slide_id for slide in prs.slides]
+    assert len(set(slide_ids)) == len(slide_ids)
+    assert len(members(output, "ppt/media/")) == 1
+    assert os.path.getsize(output) < 2 * os.path.getsize(deck)
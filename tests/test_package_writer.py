@@ -0,0 +1,96 @@
+"""
+Round trips through package_writer.save_presentation
+"""
+import hashlib
+import io
+import os
+import zipfile
+
+import pytest
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Inches
+
+from app.services.media_parts import add_movie, open_presentation
+from app.services.package_writer import save_presentation
+
+
+@pytest.fixture
+def media(tmp_path):
+    image = tmp_path / "noise.png"
+    # Incompressible and above the parallel-compression threshold
+    Image.frombytes("RGB", (256, 256), os.urandom(256 * 256 * 3)).save(image)
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(os.urandom(3 * 1024 * 1024))
+    return image, video
+
+
+def build_deck(image, video):
+    prs = Presentation()
+    for i in range(3):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {i}"
+        slide.placeholders[1].text = "lorem ipsum " * 200
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    slide.shapes.add_picture(str(image), 0, 0)
+    add_movie(slide.shapes, str(video), 0, 0, Inches(4), Inches(3), poster_frame_image=str(image), mime_type="video/mp4")
+    return prs
+
+
+def test_round_trip(tmp_path, media):
+    path = tmp_path / "deck.pptx"
+    save_presentation(build_deck(*media), str(path))
+
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        videos = [name for name in zf.namelist() if name.endswith(".mp4")]
+        assert len(videos) == 1
+        assert zf.read(videos[0]) == media[1].read_bytes()
+
+    prs = Presentation(str(path))
+    assert len(prs.slides) == 4
+    assert prs.slides[2].shapes.title.text == "Slide 2"
+
+
+def test_same_content_gives_identical_bytes(tmp_path, media):
+    first, second = tmp_path / "first.pptx", tmp_path / "second.pptx"
+    save_presentation(build_deck(*media), str(first))
+    save_presentation(build_deck(*media), str(second))
+
+    assert first.read_bytes() == second.read_bytes()
+
+    # Saving to a stream writes the same bytes as saving to a path
+    stream = io.BytesIO()
+    save_presentation(Presentation(str(first)), stream)
+    resaved = tmp_path / "resaved.pptx"
+    save_presentation(Presentation(str(first)), str(resaved))
+    assert stream.getvalue() == resaved.read_bytes()
+
+
+def test_media_kept_in_the_source_zip(tmp_path, media):
+    source, target = tmp_path / "source.pptx", tmp_path / "target.pptx"
+    save_presentation(build_deck(*media), str(source))
+
+    prs = open_presentation(str(source))
+    prs.slides[0].shapes.title.text = "Edited"
+    save_presentation(prs, str(target))
+
+    with zipfile.ZipFile(target) as zf:
+        assert zf.testzip() is None
+        video = next(name for name in zf.namelist() if name.endswith(".mp4"))
+        assert hashlib.sha1(zf.read(video)).hexdigest() == hashlib.sha1(media[1].read_bytes()).hexdigest()
+    assert Presentation(str(target)).slides[0].shapes.title.text == "Edited"
+
+
+def test_deflated_media(tmp_path, media, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "ZIP_STORED_EXTENSIONS", [])
+    path = tmp_path / "deck.pptx"
+    save_presentation(build_deck(*media), str(path))
+
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        video = next(info for info in zf.infolist() if info.filename.endswith(".mp4"))
+        assert video.compress_type == zipfile.ZIP_DEFLATED
+        assert zf.read(video) == media[1].read_bytes()
@@ -0,0 +1,138 @@
+"""
+S3Storage against moto's in-process S3
+"""
+import io
+import os
+
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from botocore.exceptions import ClientError  # noqa: E402
+
+from app.services import storage as storage_module  # noqa: E402
+from app.services.storage import S3Storage  # noqa: E402
+
+
+BUCKET = "pptx-test"
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        # Clients are cached per endpoint: start from a client created under the mock
+        storage_module._s3_clients.clear()
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+    storage_module._s3_clients.clear()
+
+
+def make_storage(tmp_path, **kwargs) -> S3Storage:
+    return S3Storage(bucket=BUCKET, cache_dir=tmp_path / "cache", prefix="node", **kwargs)
+
+
+def test_put_and_read_back(s3, tmp_path):
+    storage = make_storage(tmp_path)
+    path = storage.put_stream("outputs/a.pptx", io.BytesIO(b"deck"))
+
+    assert path.read_bytes() == b"deck"
+    assert s3.get_object(Bucket=BUCKET, Key="node/outputs/a.pptx")["Body"].read() == b"deck"
+    assert b"".join(storage.iter_chunks("outputs/a.pptx")) == b"deck"
+    assert storage.list("outputs/") == ["outputs/a.pptx"]
+
+
+def test_missing_keys(s3, tmp_path):
+    storage = make_storage(tmp_path)
+
+    assert not storage.exists("outputs/missing.pptx")
+    with pytest.raises(FileNotFoundError):
+        storage.local_path("outputs/missing.pptx")
+    with pytest.raises(FileNotFoundError):
+        storage.iter_chunks("outputs/missing.pptx")
+
+
+def test_exists_raises_on_errors_other_than_not_found(s3, tmp_path, monkeypatch):
+    storage = make_storage(tmp_path)
+
+    def denied(**kwargs):
+        raise ClientError({"Error": {"Code": "403", "Message": "Forbidden"}}, "HeadObject")
+
+    monkeypatch.setattr(storage.client, "head_object", denied)
+    with pytest.raises(ClientError):
+        storage.exists("outputs/a.pptx")
+
+
+def test_multipart_upload(s3, tmp_path):
+    storage = make_storage(tmp_path, multipart_threshold=5 * MB, multipart_chunksize=5 * MB)
+    source = tmp_path / "big.bin"
+    source.write_bytes(os.urandom(11 * MB))
+
+    storage.put_file("outputs/big.bin", source)
+
+    head = s3.head_object(Bucket=BUCKET, Key="node/outputs/big.bin")
+    assert head["ContentLength"] == 11 * MB
+    # Multipart ETags end with the number of parts
+    assert head["ETag"].strip('"').endswith("-3")
+    assert storage.local_path("outputs/big.bin").read_bytes() == source.read_bytes()
+
+
+def test_cache_revalidated_by_etag(s3, tmp_path, monkeypatch):
+    storage = make_storage(tmp_path)
+    storage.put_stream("outputs/a.pptx", io.BytesIO(b"v1"))
+
+    downloads = []
+    download_file = storage.client.download_file
+    monkeypatch.setattr(storage.client, "download_file", lambda *a, **k: downloads.append(a) or download_file(*a, **k))
+
+    # Unchanged object: the working copy is reused
+    assert storage.local_path("outputs/a.pptx").read_bytes() == b"v1"
+    assert downloads == []
+
+    # Changed by another node: the ETag differs and the copy is refreshed
+    s3.put_object(Bucket=BUCKET, Key="node/outputs/a.pptx", Body=b"v2")
+    assert storage.local_path("outputs/a.pptx").read_bytes() == b"v2"
+    assert len(downloads) == 1
+
+
+def test_immutable_keys_skip_revalidation(s3, tmp_path, monkeypatch):
+    storage = make_storage(tmp_path)
+    storage.put_stream("uploads/templates/t.pptx", io.BytesIO(b"template"))
+
+    def unexpected(**kwargs):
+        raise AssertionError("immutable keys are served from the cache")
+
+    monkeypatch.setattr(storage.client, "head_object", unexpected)
+    assert storage.local_path("uploads/templates/t.pptx").read_bytes() == b"template"
+
+
+def test_cache_evicts_least_recently_used(s3, tmp_path):
+    storage = make_storage(tmp_path, cache_max_bytes=2 * MB)
+    for name in ("a", "b", "c"):
+        s3.put_object(Bucket=BUCKET, Key=f"node/outputs/{name}.bin", Body=os.urandom(MB))
+
+    a = storage.local_path("outputs/a.bin")
+    b = storage.local_path("outputs/b.bin")
+    os.utime(a, (1, 1))
+    os.utime(b, (2, 2))
+    c = storage.local_path("outputs/c.bin")
+
+    assert not a.exists()
+    assert b.exists() and c.exists()
+    # An evicted key is downloaded again on the next read
+    assert storage.local_path("outputs/a.bin").stat().st_size == MB
+
+
+def test_delete_is_idempotent_and_drops_the_cached_copy(s3, tmp_path):
+    storage = make_storage(tmp_path)
+    path = storage.put_stream("outputs/a.pptx", io.BytesIO(b"deck"))
+
+    assert storage.delete("outputs/a.pptx")
+    assert not path.exists()
+    assert not storage.exists("outputs/a.pptx")
+    assert storage.delete("outputs/a.pptx")